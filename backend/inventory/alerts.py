@@ -0,0 +1,81 @@
+"""
+Reorder points and low stock alerts.
+
+A product's reorder point is its own reorder_point, else its category's
+default_reorder_point, else LOW_STOCK_THRESHOLD; stock below it is low.
+Write paths call evaluate_stock_alerts() with the products whose quantity
+or reorder point they changed. Only those are re-checked, and every low
+product keeps one StockAlert row, so the dashboard reads the open alerts
+instead of scanning the catalog.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+
+from .models import Product, StockAlert
+from .notifications import notify
+
+
+def with_reorder_point(queryset):
+    """Annotate products with ``effective_reorder_point``."""
+    return queryset.annotate(effective_reorder_point=Coalesce(
+        'reorder_point', 'category__default_reorder_point', Value(settings.LOW_STOCK_THRESHOLD)
+    ))
+
+
+def below_reorder_point(queryset):
+    """The products of ``queryset`` whose stock is below their reorder point."""
+    return with_reorder_point(queryset).filter(quantity__lt=F('effective_reorder_point'))
+
+
+def evaluate_stock_alerts(product_ids, announce=True):
+    """
+    Open, refresh or close the alerts of ``product_ids``, inside the caller's
+    transaction. With ``announce``, each newly opened alert sends a low_stock event.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+    low = {
+        pk: (user_id, name, quantity, reorder_point)
+        for pk, user_id, name, quantity, reorder_point in with_reorder_point(Product.objects.filter(pk__in=product_ids))
+        .values_list('id', 'user_id', 'name', 'quantity', 'effective_reorder_point')
+        if quantity < reorder_point
+    }
+    with transaction.atomic():
+        StockAlert.objects.filter(product_id__in=product_ids - low.keys()).delete()
+        if not low:
+            return
+        opened = low.keys() - set(StockAlert.objects.filter(product_id__in=low).values_list('product_id', flat=True))
+        # opened_at is left alone on alerts that stay open
+        StockAlert.objects.bulk_create(
+            [
+                StockAlert(product_id=pk, user_id=user_id, quantity=quantity, reorder_point=reorder_point)
+                for pk, (user_id, _, quantity, reorder_point) in low.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['quantity', 'reorder_point'],
+        )
+    if announce:
+        for pk in sorted(opened):
+            user_id, name, quantity, reorder_point = low[pk]
+            notify(user_id, 'low_stock', {'product': pk, 'name': name, 'quantity': quantity, 'reorder_point': reorder_point})
+
+
+def rebuild_stock_alerts(user_ids=None, batch_size=1000):
+    """Re-evaluate every product of ``user_ids`` (all users by default). Returns the open alert count."""
+    products = Product.objects.all()
+    alerts = StockAlert.objects.all()
+    if user_ids is not None:
+        products = products.filter(user_id__in=user_ids)
+        alerts = alerts.filter(user_id__in=user_ids)
+    batch = []
+    for pk in products.values_list('id', flat=True).iterator():
+        batch.append(pk)
+        if len(batch) >= batch_size:
+            evaluate_stock_alerts(batch, announce=False)
+            batch = []
+    evaluate_stock_alerts(batch, announce=False)
+    return alerts.count()
@@ -0,0 +1,173 @@
+# Async versions of the dashboard endpoints for ASGI deployments.
+#
+# DRF views are synchronous, so these are plain Django async views that run
+# the configured DRF authentication classes themselves and return JSON in
+# the same shape as inventory.exceptions.custom_exception_handler.
+import asyncio
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions, status
+from rest_framework.settings import api_settings
+
+from .authentication import stream_ticket_user
+from .concurrency import run_in_worker
+from .conditional import precondition, set_validators
+from .dashboard import aget_dashboard_stats, inventory_summary_rows, parse_chart_params, stock_chart
+from .notifications import get_broker
+from .routers import ause_replica, replica_reads
+
+
+def _json(data, status_code=status.HTTP_200_OK):
+    return JsonResponse(data, status=status_code, safe=False, json_dumps_params={'separators': (',', ':')})
+
+
+def _error(message, status_code):
+    return _json({
+        'error': True,
+        'status_code': status_code,
+        'message': message,
+        'detail': None,
+        'errors': {},
+    }, status_code)
+
+
+def _authenticate(request):
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = authentication_class().authenticate(request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+def _authenticate_stream_ticket(request):
+    # EventSource can't send headers, so streams also take a ?ticket= from
+    # POST /api/notifications/ticket/. Never the access token: URLs end up in logs.
+    user = _authenticate(request)
+    if user is None and request.GET.get('ticket'):
+        user = stream_ticket_user(request.GET['ticket'])
+    return user
+
+
+def async_authenticated(view, authenticate=_authenticate):
+    """Authenticate the request with the DRF authentication classes before calling ``view``."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            user = await run_in_worker(authenticate, request)
+        except exceptions.AuthenticationFailed as exc:
+            return _error(str(exc.detail), status.HTTP_401_UNAUTHORIZED)
+        if user is None or not user.is_authenticated:
+            return _error('Authentication credentials were not provided.', status.HTTP_401_UNAUTHORIZED)
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def async_conditional(view):
+    """ETag/Last-Modified and 304 responses, like conditional.conditional for the DRF views."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        etag, last_modified, not_modified = await run_in_worker(precondition, request, request.user.pk)
+        if not_modified is not None:
+            return not_modified
+        response = await view(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_validators(response, etag, last_modified)
+        return response
+    return wrapper
+
+
+def async_read_from_replica(view):
+    """Replica reads for an async view, like routers.read_from_replica. Worker threads inherit the context."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        with replica_reads(request.user.pk, use=await ause_replica(request.user.pk)):
+            return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@require_GET
+@async_authenticated
+@async_conditional
+@async_read_from_replica
+async def dashboard_stats(request):
+    try:
+        return _json(await aget_dashboard_stats(request.user))
+    except Exception as e:
+        return _json({'error': str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@require_GET
+@async_authenticated
+@async_conditional
+@async_read_from_replica
+async def inventory_summary(request):
+    try:
+        return _json(await run_in_worker(inventory_summary_rows, request.user))
+    except Exception as e:
+        return _json({'error': str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@require_GET
+@async_authenticated
+@async_conditional
+@async_read_from_replica
+async def stock_chart_data(request):
+    try:
+        try:
+            params = parse_chart_params(request.GET)
+        except ValueError as e:
+            return _json({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+        return _json(await run_in_worker(stock_chart, request.user, **params))
+    except Exception as e:
+        return _json({'error': str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _sse(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'], separators=(',', ':'))}\n\n"
+
+
+async def _event_stream(subscription):
+    broker = get_broker()
+    try:
+        # reconnect after 5s if the connection drops
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), settings.NOTIFICATION_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # a comment line keeps proxies from closing an idle stream
+                yield ': keepalive\n\n'
+                continue
+            yield _sse(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def stream_authenticated(view):
+    """async_authenticated that also accepts a short-lived stream ticket as ?ticket=."""
+    return async_authenticated(view, authenticate=_authenticate_stream_ticket)
+
+
+@require_GET
+@stream_authenticated
+async def notification_stream(request):
+    """
+    Server-sent events for the user's stock, low_stock, order and import
+    events. An idle stream is one parked coroutine, so serve it with ASGI.
+    """
+    if not isinstance(request, ASGIRequest):
+        # WSGI drains an async iterator before sending anything, the request
+        # would never answer. Refuse, and the client polls instead.
+        return _error('The notification stream needs the ASGI server.', status.HTTP_503_SERVICE_UNAVAILABLE)
+    subscription = get_broker().subscribe(request.user.pk)
+    response = StreamingHttpResponse(_event_stream(subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,132 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    """
+    Bounded in-process LRU of User rows keyed by id, each entry expiring
+    ``ttl`` seconds after it was loaded. Saving or deleting a user drops its
+    entry (see signals.py); the TTL bounds how long other processes, and
+    QuerySet.update() calls that skip signals, can serve a stale row.
+    Keys are str(user id) since the token claim may hold the id as a string.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        user_id = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            user = entry[1]
+        # callers may set attributes on request.user, don't share the instance
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        if self.maxsize <= 0:
+            return
+        user_id = str(user_id)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, copy.copy(user))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+user_cache = UserCache(settings.AUTH_USER_CACHE_SIZE, settings.AUTH_USER_CACHE_TTL)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user from user_cache, so a
+    warm request authenticates without touching the database. The active
+    and token revocation checks still run against the cached row.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+            return user
+
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if jwt_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            jwt_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
+
+
+# Salt of stream tickets, so no other signed value can pass for one
+STREAM_TICKET_SALT = 'inventory.notification-stream'
+
+
+def issue_stream_ticket(user):
+    """
+    A signed ticket that opens the user's notification stream for
+    STREAM_TICKET_SECONDS. EventSource can't send an Authorization header,
+    and the ticket goes in the URL instead of the access token.
+    """
+    return signing.dumps(str(user.pk), salt=STREAM_TICKET_SALT)
+
+
+def stream_ticket_user(ticket):
+    """The active user a stream ticket was issued to; raise AuthenticationFailed otherwise."""
+    try:
+        user_id = signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=settings.STREAM_TICKET_SECONDS)
+    except signing.BadSignature:
+        # SignatureExpired is a BadSignature too
+        raise AuthenticationFailed(_('Stream ticket is invalid or has expired'), code='invalid_ticket')
+    user = user_cache.get(user_id)
+    if user is None:
+        user = User.objects.filter(pk=user_id).first()
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        user_cache.set(user_id, user)
+    if not user.is_active:
+        raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+    return user
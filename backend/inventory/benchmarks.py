@@ -0,0 +1,374 @@
+"""
+Endpoint benchmark suite.
+
+Every route in inventory/urls.py is exercised through the Django test client
+against whatever data is in the database (see the generate_demo_data
+command). For each route it reports p50/p95 latency, the number of SQL
+queries and the peak Python memory of one request. Requests that write run
+inside a transaction that is rolled back, so the data set stays the same.
+
+contention_benchmark() measures SQLite itself under concurrent order writes
+and dashboard reads, comparing the stock configuration with the production
+profile in settings (SQLITE_PRAGMAS, BEGIN IMMEDIATE, persistent connections).
+"""
+import itertools
+import os
+import random
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import closing
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .lean import lean_columns, lean_lookups, lean_rows
+from .models import Category, InventoryLog, Order, Product
+from .renderers import FastJSONRenderer
+from .serializers import InventoryLogSerializer, OrderSerializer, ProductSerializer
+
+
+# Streams that stay open until the client leaves, so there is no latency to time
+OPEN_ENDED_ROUTES = {'notification_stream'}
+
+
+def route_names():
+    """Names of all routes in inventory/urls.py, router routes included."""
+    from . import urls
+
+    names = set()
+    for pattern in urls.urlpatterns:
+        children = pattern.url_patterns if isinstance(pattern, URLResolver) else [pattern]
+        names.update(child.name for child in children if child.name)
+    return names
+
+
+def _cases(user, password):
+    product = Product.objects.filter(user=user).order_by('id').first()
+    order = Order.objects.filter(user=user).order_by('id').first()
+    pending = Order.objects.filter(user=user, status='Pending').order_by('id').first() or order
+    log = InventoryLog.objects.filter(product__user=user).order_by('id').first()
+    category = Category.objects.filter(user=user).order_by('id').first()
+    if not (product and order and log and category):
+        raise ValueError(f'{user} needs at least one product, order, log entry and category')
+
+    usernames = (f'bench-register-{n}' for n in itertools.count())
+    refresh = str(RefreshToken.for_user(user))
+    import_body = 'name,sku,quantity,price\nBench import,BENCH-IMPORT-1,5,1.00\n'
+
+    # (route name, method, path, body, content type, writes)
+    return [
+        ('register', 'post', '/api/register/',
+         lambda: {'username': next(usernames), 'email': 'bench@example.com', 'password': 'Bench123'}, None, True),
+        ('login', 'post', '/api/login/', {'username': user.username, 'password': password}, None, False),
+        ('token_refresh', 'post', '/api/token/refresh/', {'refresh': refresh}, None, False),
+        ('token_verify', 'post', '/api/token/verify/', {'token': refresh}, None, False),
+        ('dashboard_stats', 'get', '/api/dashboard/stats/', None, None, False),
+        ('inventory_summary', 'get', '/api/dashboard/inventory-summary/', None, None, False),
+        ('stock_chart_data', 'get', '/api/dashboard/stock-chart/', None, None, False),
+        ('sales_leaderboard', 'get', '/api/dashboard/leaderboard/?window=all', None, None, False),
+        ('dashboard_stats_async', 'get', '/api/dashboard/async/stats/', None, None, False),
+        ('inventory_summary_async', 'get', '/api/dashboard/async/inventory-summary/', None, None, False),
+        ('stock_chart_data_async', 'get', '/api/dashboard/async/stock-chart/', None, None, False),
+        ('export_inventory_summary', 'get', '/api/dashboard/inventory-summary/export/', None, None, False),
+        ('export_orders', 'get', '/api/orders/export/', None, None, False),
+        ('export_inventory_logs', 'get', '/api/inventory/export/', None, None, False),
+        ('notification_ticket', 'post', '/api/notifications/ticket/', {}, None, False),
+        ('metrics', 'get', '/api/metrics/', None, None, False),
+        ('api-root', 'get', '/api/', None, None, False),
+        ('product-list', 'get', '/api/products/', None, None, False),
+        ('product-list', 'get', '/api/products/?search=product 1', None, None, False),
+        ('product-list', 'post', '/api/products/',
+         {'name': 'Bench product', 'sku': 'BENCH-1', 'quantity': 5, 'price': '1.00'}, None, True),
+        ('product-detail', 'get', f'/api/products/{product.pk}/', None, None, False),
+        ('product-detail', 'patch', f'/api/products/{product.pk}/', {'quantity': product.quantity + 1}, None, True),
+        ('product-changes', 'get', '/api/products/changes/', None, None, False),
+        ('product-import-products', 'post', '/api/products/import/', import_body, 'text/csv', True),
+        ('order-list', 'get', '/api/orders/', None, None, False),
+        ('order-list', 'post', '/api/orders/', {'product': product.pk, 'quantity': 1, 'status': 'Pending'}, None, True),
+        ('order-detail', 'get', f'/api/orders/{order.pk}/', None, None, False),
+        ('order-transition', 'post', '/api/orders/transition/',
+         {'ids': [pending.pk], 'from_status': 'Pending', 'status': 'Shipped'}, None, True),
+        ('order-changes', 'get', '/api/orders/changes/', None, None, False),
+        ('order-bulk', 'post', '/api/orders/bulk/',
+         {'orders': [{'product': product.pk, 'quantity': 1}] * 10}, None, True),
+        ('inventory-list', 'get', '/api/inventory/', None, None, False),
+        ('inventory-changes', 'get', '/api/inventory/changes/', None, None, False),
+        ('inventory-history', 'get', '/api/inventory/history/', None, None, False),
+        ('inventory-detail', 'get', f'/api/inventory/{log.pk}/', None, None, False),
+        ('category-list', 'get', '/api/categories/', None, None, False),
+        ('category-detail', 'get', f'/api/categories/{category.pk}/', None, None, False),
+    ]
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def run_benchmark(user, password, iterations=20, cold_cache=False):
+    """Benchmark every route for ``user`` and return a JSON-serialisable report."""
+    token = RefreshToken.for_user(user).access_token
+    client = Client(headers={'Authorization': f'Bearer {token}'})
+    # /api/metrics/ wants a staff user or the scrape token, it is scraped with a throwaway one
+    metrics_token = secrets.token_urlsafe()
+
+    def send(method, path, body, content_type):
+        data = body() if callable(body) else body
+        if cold_cache:
+            caches['default'].clear()
+        if path == '/api/metrics/':
+            with override_settings(METRICS_AUTH_TOKEN=metrics_token):
+                response = client.get(path, headers={'Authorization': f'Bearer {metrics_token}'})
+        elif data is None:
+            response = getattr(client, method)(path)
+        elif content_type:
+            response = getattr(client, method)(path, data, content_type=content_type)
+        else:
+            response = getattr(client, method)(path, data, content_type='application/json')
+        size = sum(len(chunk) for chunk in response.streaming_content) if response.streaming else len(response.content)
+        return response.status_code, size
+
+    def call(method, path, body, content_type, writes):
+        if not writes:
+            return send(method, path, body, content_type)
+        with transaction.atomic():
+            result = send(method, path, body, content_type)
+            transaction.set_rollback(True)
+        return result
+
+    results = {}
+    for name, method, path, body, content_type, writes in _cases(user, password):
+        args = (method, path, body, content_type, writes)
+        call(*args)  # warm up
+
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            status_code, size = call(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            call(*args)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        query = path.partition('?')[2]
+        results[f'{method.upper()} {name}' + (f' ?{query}' if query else '')] = {
+            'path': path,
+            'status': status_code,
+            'response_bytes': size,
+            # queries run on the caller's connection; async routes query from worker threads
+            'queries': len(queries),
+            'peak_memory_kib': round(peak / 1024, 1),
+            'p50_ms': round(_percentile(timings, 50), 3),
+            'p95_ms': round(_percentile(timings, 95), 3),
+        }
+
+    return {
+        'meta': {
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'user': user.username,
+            'iterations': iterations,
+            'cold_cache': cold_cache,
+            'products': Product.objects.filter(user=user).count(),
+            'orders': Order.objects.filter(user=user).count(),
+            'inventory_logs': InventoryLog.objects.filter(product__user=user).count(),
+        },
+        'missing_routes': sorted(route_names() - OPEN_ENDED_ROUTES - {case[0] for case in _cases(user, password)}),
+        'skipped_routes': sorted(OPEN_ENDED_ROUTES),
+        'results': results,
+    }
+
+
+def _time(func, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, timings
+
+
+def serializer_benchmark(user, iterations=5, rows=1000):
+    """
+    Compare rendering ``rows`` records through the ModelSerializers and
+    JSONRenderer with the lean values() path and FastJSONRenderer.
+    """
+    querysets = {
+        'products': (ProductSerializer, Product.objects.filter(user=user).select_related('category')),
+        'orders': (OrderSerializer, Order.objects.filter(user=user).select_related('product', 'product__category')),
+        'inventory_logs': (InventoryLogSerializer, InventoryLog.objects.filter(product__user=user).select_related('product')),
+    }
+    results = {}
+    for name, (serializer_class, queryset) in querysets.items():
+        queryset = queryset.order_by('-id')
+        columns = lean_columns(serializer_class())
+        lookups = lean_lookups(columns)
+
+        def serializer_path():
+            return JSONRenderer().render(serializer_class(queryset[:rows], many=True).data)
+
+        def lean_path():
+            return FastJSONRenderer().render(lean_rows(queryset.values(*lookups)[:rows], columns))
+
+        expected, serializer_timings = _time(serializer_path, iterations)
+        actual, lean_timings = _time(lean_path, iterations)
+        serializer_p50 = _percentile(serializer_timings, 50)
+        lean_p50 = _percentile(lean_timings, 50)
+        results[name] = {
+            'rows': min(rows, queryset.count()),
+            'identical_output': expected == actual,
+            'serializer_p50_ms': round(serializer_p50, 3),
+            'lean_p50_ms': round(lean_p50, 3),
+            'speedup': round(serializer_p50 / lean_p50, 2) if lean_p50 else None,
+        }
+    return results
+
+
+# Stock Django SQLite settings (rollback journal, deferred BEGIN, a new
+# connection per request) against the production profile in settings.py
+CONTENTION_PROFILES = {
+    'baseline': {'pragmas': {}, 'begin': 'BEGIN', 'persistent': False},
+    'production': {'pragmas': settings.SQLITE_PRAGMAS, 'begin': 'BEGIN IMMEDIATE', 'persistent': True},
+}
+
+_CONTENTION_SCHEMA = """
+    CREATE TABLE product (id INTEGER PRIMARY KEY, user_id INTEGER, quantity INTEGER);
+    CREATE TABLE "order" (id INTEGER PRIMARY KEY, product_id INTEGER, quantity INTEGER, status TEXT, date TEXT);
+    CREATE TABLE log (id INTEGER PRIMARY KEY, product_id INTEGER, change_type TEXT, quantity INTEGER, timestamp TEXT);
+    CREATE INDEX product_user ON product (user_id, quantity);
+    CREATE INDEX order_product ON "order" (product_id);
+"""
+
+
+def _contention_connect(path, profile):
+    # isolation_level=None: transactions are started explicitly with profile['begin']
+    connection = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+    for name, value in profile['pragmas'].items():
+        connection.execute(f'PRAGMA {name}={value}')
+    return connection
+
+
+def _place_order(connection, profile, product_id, users):
+    # the shape of OrderViewSet.perform_create: read the product, then write
+    connection.execute(profile['begin'])
+    try:
+        connection.execute('SELECT quantity FROM product WHERE id = ?', (product_id,)).fetchone()
+        connection.execute('UPDATE product SET quantity = quantity - 1 WHERE id = ? AND quantity >= 1', (product_id,))
+        connection.execute(
+            'INSERT INTO "order" (product_id, quantity, status, date) VALUES (?, 1, \'Pending\', datetime())', (product_id,)
+        )
+        connection.execute(
+            'INSERT INTO log (product_id, change_type, quantity, timestamp) VALUES (?, \'Sold\', 1, datetime())', (product_id,)
+        )
+        connection.execute('COMMIT')
+    except sqlite3.Error:
+        connection.execute('ROLLBACK')
+        raise
+
+
+def _read_dashboard(connection, profile, product_id, users):
+    user_id = product_id % users
+    connection.execute(
+        'SELECT SUM(quantity), COUNT(*) FROM product WHERE user_id = ?', (user_id,)
+    ).fetchone()
+    connection.execute(
+        'SELECT o.id, o.quantity FROM "order" o JOIN product p ON p.id = o.product_id '
+        'WHERE p.user_id = ? ORDER BY o.id DESC LIMIT 50', (user_id,)
+    ).fetchall()
+
+
+def _contention_run(path, profile, writers, readers, seconds, products, users):
+    deadline = time.perf_counter() + seconds
+    results = {'write': ([], [0]), 'read': ([], [0])}
+
+    def worker(kind, operation, seed):
+        rng = random.Random(seed)
+        timings, errors = results[kind]
+        connection = _contention_connect(path, profile) if profile['persistent'] else None
+        while time.perf_counter() < deadline:
+            product_id = rng.randint(1, products)
+            started = time.perf_counter()
+            try:
+                if profile['persistent']:
+                    operation(connection, profile, product_id, users)
+                else:
+                    # CONN_MAX_AGE = 0: connect for every request
+                    with closing(_contention_connect(path, profile)) as per_request:
+                        operation(per_request, profile, product_id, users)
+            except sqlite3.OperationalError:
+                # "database is locked": the request would have failed
+                errors[0] += 1
+                continue
+            timings.append((time.perf_counter() - started) * 1000)
+        if connection is not None:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=worker, args=('write', _place_order, n)) for n in range(writers)
+    ] + [
+        threading.Thread(target=worker, args=('read', _read_dashboard, writers + n)) for n in range(readers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = {}
+    for kind, (timings, errors) in results.items():
+        report[kind] = {
+            'ops': len(timings),
+            'ops_per_second': round(len(timings) / seconds, 1),
+            'errors': errors[0],
+            'p50_ms': round(_percentile(timings, 50), 3) if timings else None,
+            'p95_ms': round(_percentile(timings, 95), 3) if timings else None,
+            'p99_ms': round(_percentile(timings, 99), 3) if timings else None,
+        }
+    return report
+
+
+def contention_benchmark(writers=4, readers=8, seconds=5.0, products=1000, users=10, profiles=None):
+    """
+    Run ``writers`` order-writing and ``readers`` dashboard-reading threads
+    for ``seconds`` against a fresh SQLite file per profile, and report
+    throughput, lock errors and latency percentiles for each.
+    """
+    report = {
+        'meta': {
+            'sqlite': sqlite3.sqlite_version,
+            'writers': writers,
+            'readers': readers,
+            'seconds': seconds,
+            'products': products,
+        },
+        'profiles': {},
+    }
+    for name in profiles or CONTENTION_PROFILES:
+        profile = CONTENTION_PROFILES[name]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'contention.sqlite3')
+            setup = _contention_connect(path, profile)
+            setup.executescript(_CONTENTION_SCHEMA)
+            setup.execute('BEGIN')
+            setup.executemany(
+                'INSERT INTO product (id, user_id, quantity) VALUES (?, ?, ?)',
+                ((pk, pk % users, 1_000_000) for pk in range(1, products + 1)),
+            )
+            setup.execute('COMMIT')
+            setup.close()
+            report['profiles'][name] = _contention_run(path, profile, writers, readers, seconds, products, users)
+    return report
@@ -0,0 +1,166 @@
+"""
+Incremental change feed for products, orders and inventory log entries.
+
+``GET /api/<collection>/changes/?since=<cursor>`` returns the rows created or
+updated after the cursor, ordered by (updated_at, id), and the ids deleted
+since then from the Tombstone table. Each response carries the cursor for the
+next call. Rows younger than CHANGE_FEED_SETTLE_SECONDS are held back until
+the next call, so a transaction that stamped its rows just before another
+one committed can't be skipped. A cursor older than TOMBSTONE_RETENTION_DAYS
+may have missed pruned deletions and is refused, the client resyncs in full.
+
+Deleting a product writes one tombstone, not one per order and log entry
+it takes with it, so the delete stays a small write however long the
+product's history. The order and log feeds list those product ids under
+``deleted_products``, and clients drop their rows of those products.
+
+Name fields copied from related rows (product_name, category_name) are as of
+the row's last change; clients keep them current by joining on the ids.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .models import Tombstone
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def record_deletions(user_id, kind, ids):
+    """Write tombstones for ``ids`` of ``kind``, inside the deleting transaction."""
+    Tombstone.objects.bulk_create([Tombstone(user_id=user_id, kind=kind, object_id=pk) for pk in ids])
+
+
+def record_product_deletion(product):
+    # its orders and log entries go with it, their feeds report the product id
+    record_deletions(product.user_id, 'product', [product.pk])
+
+
+def prune_tombstones(now=None):
+    cutoff = (now or timezone.now()) - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS)
+    return Tombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
+
+
+def encode_cursor(issued_at, rows, deleted):
+    payload = [issued_at.isoformat(), *_position(rows), *_position(deleted)]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+
+def _position(position):
+    changed_at, pk = position
+    return [changed_at.isoformat() if changed_at else None, pk]
+
+
+def decode_cursor(cursor):
+    """Return ((changed_at, id) for rows, (deleted_at, id) for tombstones); raise ValueError or CursorExpired."""
+    if not cursor:
+        return (None, 0), (None, 0)
+    try:
+        issued_at, row_at, row_id, deleted_at, deleted_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        issued_at = datetime.fromisoformat(issued_at)
+        row_at = datetime.fromisoformat(row_at) if row_at else None
+        deleted_at = datetime.fromisoformat(deleted_at) if deleted_at else None
+        row_id, deleted_id = int(row_id), int(deleted_id)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('since must be a cursor returned by a previous changes response')
+    if issued_at < timezone.now() - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS):
+        raise CursorExpired('cursor has expired, fetch the full collection again')
+    return (row_at, row_id), (deleted_at, deleted_id)
+
+
+def _after(queryset, field, position):
+    changed_at, pk = position
+    if changed_at is None:
+        return queryset
+    return queryset.filter(Q(**{f'{field}__gt': changed_at}) | Q(**{field: changed_at, 'id__gt': pk}))
+
+
+def changes_since(queryset, field, user_id, kind, positions, limit, serialize, product_rows=False):
+    """
+    One page of the change feed after ``positions`` (from decode_cursor).
+    ``queryset`` is the user's collection and ``field`` its modification
+    timestamp, ``serialize`` turns the page (model instances) into rows.
+    With ``product_rows`` the collection's rows belong to a product, and
+    deleted products are listed under ``deleted_products``.
+    """
+    kinds = [kind, 'product'] if product_rows else [kind]
+    rows_from, deleted_from = positions
+    now = timezone.now()
+    settled = now - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS)
+
+    changed = list(
+        _after(queryset, field, rows_from).filter(**{f'{field}__lte': settled}).order_by(field, 'id')[:limit + 1]
+    )
+    deleted = list(
+        _after(Tombstone.objects.filter(user_id=user_id, kind__in=kinds), 'deleted_at', deleted_from)
+        .filter(deleted_at__lte=settled)
+        .order_by('deleted_at', 'id')
+        .values_list('deleted_at', 'id', 'kind', 'object_id')[:limit + 1]
+    )
+    has_more = len(changed) > limit or len(deleted) > limit
+    changed, deleted = changed[:limit], deleted[:limit]
+
+    if changed:
+        rows_from = (getattr(changed[-1], field), changed[-1].pk)
+    if deleted:
+        deleted_from = deleted[-1][:2]
+    page = {
+        'results': serialize(changed),
+        'deleted': [object_id for _, _, deleted_kind, object_id in deleted if deleted_kind == kind],
+        'cursor': encode_cursor(now, rows_from, deleted_from),
+        'has_more': has_more,
+    }
+    if product_rows:
+        page['deleted_products'] = [object_id for _, _, deleted_kind, object_id in deleted if deleted_kind == 'product']
+    return page
+
+
+class ChangeFeedMixin:
+    """
+    Adds the ``changes`` list route to a ModelViewSet. ``change_field`` names
+    the modification timestamp and ``change_kind`` the Tombstone kind.
+    ``change_product_rows`` marks collections deleted along with their product.
+    """
+    change_field = 'updated_at'
+    change_kind = None
+    change_product_rows = False
+
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request):
+        try:
+            try:
+                limit = int(request.query_params.get('limit', settings.CHANGE_FEED_MAX_ROWS))
+            except ValueError:
+                limit = 0
+            if not 0 < limit <= settings.CHANGE_FEED_MAX_ROWS:
+                return Response(
+                    {'error': f'limit must be between 1 and {settings.CHANGE_FEED_MAX_ROWS}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            try:
+                positions = decode_cursor(request.query_params.get('since'))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            except CursorExpired as e:
+                return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+            return Response(changes_since(
+                self.get_queryset(),
+                self.change_field,
+                request.user.pk,
+                self.change_kind,
+                positions,
+                limit,
+                lambda rows: self.get_serializer(rows, many=True).data,
+                product_rows=self.change_product_rows,
+            ))
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,229 @@
+"""
+Rolling compaction of the inventory log.
+
+Raw InventoryLog rows older than the retention window are summed into
+InventoryLogRollup (one row per product and day) and moved out of the hot
+table, into ArchivedInventoryLog or a gzipped NDJSON file. daily_history()
+reads both tables, so callers see one continuous per-day history, and
+compacted_entries() lists the rollups in the shape of raw log rows, so the
+log list and export go on past the retention window.
+"""
+import gzip
+import json
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .counters import bump_data_version
+from .models import ArchivedInventoryLog, InventoryLog, InventoryLogRollup
+
+ARCHIVE_MODES = ('table', 'file', 'none')
+ROLLUP_FIELDS = {'Added': 'added', 'Removed': 'removed', 'Sold': 'sold'}
+TOTALS = ('added', 'removed', 'sold')
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def compaction_cutoff(retention_days):
+    # Whole days only, so a day is either fully raw or fully rolled up
+    return _start_of(timezone.localdate() - timedelta(days=retention_days))
+
+
+def _fold_rollups(rows):
+    # (product_id, day) -> totals for a batch of raw log values
+    rollups = defaultdict(lambda: {'added': 0, 'removed': 0, 'sold': 0, 'entries': 0})
+    for row in rows:
+        totals = rollups[(row['product_id'], timezone.localdate(row['timestamp']))]
+        totals[ROLLUP_FIELDS[row['change_type']]] += row['quantity']
+        totals['entries'] += 1
+    return rollups
+
+
+def _save_rollups(rollups):
+    existing = set(
+        InventoryLogRollup.objects.filter(
+            product_id__in={product_id for product_id, _ in rollups},
+            date__in={day for _, day in rollups},
+        ).values_list('product_id', 'date')
+    )
+    new = []
+    for (product_id, day), totals in rollups.items():
+        if (product_id, day) in existing:
+            InventoryLogRollup.objects.filter(product_id=product_id, date=day).update(
+                **{name: F(name) + value for name, value in totals.items()}
+            )
+        else:
+            new.append(InventoryLogRollup(product_id=product_id, date=day, **totals))
+    InventoryLogRollup.objects.bulk_create(new)
+
+
+def _write_archive_file(archive, rows):
+    for row in rows:
+        archive.write(json.dumps({**row, 'timestamp': row['timestamp'].isoformat()}, separators=(',', ':')))
+        archive.write('\n')
+    # written out before the batch is deleted, so a crash can only duplicate rows
+    archive.flush()
+
+
+def compact_inventory_logs(before, archive='table', archive_path=None, batch_size=5000):
+    """
+    Roll InventoryLog rows with a timestamp before ``before`` into daily
+    rollups and archive them, one transaction per batch of ``batch_size``.
+    With ``archive='file'`` the rows are appended to the gzipped NDJSON file
+    at ``archive_path``. Returns the number of log and rollup rows touched.
+    """
+    if archive not in ARCHIVE_MODES:
+        raise ValueError(f"archive must be one of {', '.join(ARCHIVE_MODES)}")
+    if archive == 'file' and not archive_path:
+        raise ValueError('archive_path is required to archive to a file')
+
+    report = {'compacted': 0, 'rollup_days': 0}
+    archive_file = gzip.open(archive_path, 'at', encoding='utf-8') if archive == 'file' else None
+    try:
+        last_id = 0
+        while True:
+            rows = list(
+                InventoryLog.objects.filter(timestamp__lt=before, id__gt=last_id)
+                .order_by('id')
+                .values('id', 'product_id', 'product__user_id', 'change_type', 'quantity', 'timestamp')[:batch_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            user_ids = {row.pop('product__user_id') for row in rows} - {None}
+            rollups = _fold_rollups(rows)
+            if archive_file is not None:
+                _write_archive_file(archive_file, rows)
+            with transaction.atomic():
+                _save_rollups(rollups)
+                if archive == 'table':
+                    ArchivedInventoryLog.objects.bulk_create(
+                        [ArchivedInventoryLog(**row) for row in rows], ignore_conflicts=True
+                    )
+                InventoryLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+                # the log list changes even though the history doesn't
+                for user_id in user_ids:
+                    bump_data_version(user_id)
+            report['compacted'] += len(rows)
+            report['rollup_days'] += len(rollups)
+    finally:
+        if archive_file is not None:
+            archive_file.close()
+    return report
+
+
+def compacted_entries(user, product_id=None, after=None, descending=True):
+    """
+    Yield the rollups of ``user``'s compacted days as values() rows of the
+    raw log: one per product, day and change type with a non-zero total,
+    with no id and the start of the day as timestamp. ``after`` is the
+    compacted_position() of the last entry already served.
+    """
+    rollups = InventoryLogRollup.objects.filter(product__user=user)
+    if product_id is not None:
+        rollups = rollups.filter(product_id=product_id)
+    if after is not None:
+        day, after_product, _ = after
+        if descending:
+            rollups = rollups.filter(Q(date__lt=day) | Q(date=day, product_id__lte=after_product))
+        else:
+            rollups = rollups.filter(Q(date__gt=day) | Q(date=day, product_id__gte=after_product))
+    ordering = ('-date', '-product_id') if descending else ('date', 'product_id')
+    rows = rollups.order_by(*ordering).values('date', 'product_id', 'product__name', 'product__sku', *TOTALS)
+    change_types = list(ROLLUP_FIELDS)
+    for row in rows.iterator():
+        for index, change_type in enumerate(change_types):
+            quantity = row[ROLLUP_FIELDS[change_type]]
+            if not quantity:
+                continue
+            if after is not None and (row['date'], row['product_id']) == after[:2] and index <= change_types.index(after[2]):
+                continue
+            yield {
+                'id': None,
+                'product': row['product_id'],
+                'product__name': row['product__name'],
+                'product__sku': row['product__sku'],
+                'change_type': change_type,
+                'quantity': quantity,
+                'timestamp': _start_of(row['date']),
+                'updated_at': None,
+            }
+
+
+def compacted_position(entry):
+    """A compacted entry's place in the listing, as a query parameter value."""
+    return f"{timezone.localdate(entry['timestamp']).isoformat()}.{entry['product']}.{entry['change_type']}"
+
+
+def parse_compacted_position(value):
+    """Return (date, product_id, change_type) for compacted_entries(after=...), raising ValueError."""
+    try:
+        day, product_id, change_type = value.split('.')
+        position = (date.fromisoformat(day), int(product_id), change_type)
+    except ValueError:
+        raise ValueError('compacted must be a position from a previous inventory list response')
+    if change_type not in ROLLUP_FIELDS:
+        raise ValueError('compacted must be a position from a previous inventory list response')
+    return position
+
+
+def daily_history(user, product_id=None, start=None, end=None):
+    """
+    Per product and day added/removed/sold totals for ``user``, merging the
+    rollups of compacted days with the raw log rows of recent ones.
+    """
+    logs = InventoryLog.objects.filter(product__user=user)
+    rollups = InventoryLogRollup.objects.filter(product__user=user)
+    if product_id:
+        logs = logs.filter(product_id=product_id)
+        rollups = rollups.filter(product_id=product_id)
+    # timestamp ranges rather than a filter on TruncDate keep the index usable
+    if start:
+        logs = logs.filter(timestamp__gte=_start_of(start))
+        rollups = rollups.filter(date__gte=start)
+    if end:
+        logs = logs.filter(timestamp__lt=_start_of(end + timedelta(days=1)))
+        rollups = rollups.filter(date__lte=end)
+
+    days = defaultdict(lambda: dict.fromkeys(TOTALS, 0))
+    names = {}
+
+    def add(day, row):
+        names[row['product_id']] = (row['product__name'], row['product__sku'])
+        totals = days[(day, row['product_id'])]
+        for name in TOTALS:
+            totals[name] += row[name] or 0
+
+    raw = logs.annotate(day=TruncDate('timestamp')).values('day', 'product_id', 'product__name', 'product__sku')
+    for row in raw.annotate(
+        **{name: Sum('quantity', filter=Q(change_type=change_type)) for change_type, name in ROLLUP_FIELDS.items()}
+    ):
+        add(row['day'], row)
+    for row in rollups.values('date', 'product_id', 'product__name', 'product__sku', *TOTALS):
+        add(row['date'], row)
+
+    return [
+        {
+            'date': day.strftime('%Y-%m-%d'),
+            'product': product,
+            'product_name': names[product][0],
+            'product_sku': names[product][1],
+            **totals,
+        }
+        for (day, product), totals in sorted(days.items(), reverse=True)
+    ]
+
+
+def rollup_deltas(user_ids=None):
+    """Yield (product_id, user_id, day, stock delta) for every rollup row."""
+    rollups = InventoryLogRollup.objects.filter(product__user__isnull=False)
+    if user_ids is not None:
+        rollups = rollups.filter(product__user_id__in=user_ids)
+    for row in rollups.values('product_id', 'product__user_id', 'date', *TOTALS).iterator():
+        yield row['product_id'], row['product__user_id'], row['date'], row['added'] - row['removed'] - row['sold']
@@ -0,0 +1,23 @@
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def _with_connection_cleanup(func):
+    def run(*args, **kwargs):
+        # Worker threads don't see request_started/finished, so mirror what
+        # those signals do for the thread's own database connections
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return run
+
+
+async def run_in_worker(func, *args, **kwargs):
+    """
+    Run blocking ORM code on a thread pool worker with its own database
+    connection. Unlike the default thread_sensitive=True, several calls
+    awaited together with asyncio.gather() really run concurrently.
+    """
+    return await sync_to_async(_with_connection_cleanup(func), thread_sensitive=False)(*args, **kwargs)
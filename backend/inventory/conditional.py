@@ -0,0 +1,110 @@
+"""
+Conditional GET for the read endpoints.
+
+Every write path bumps TenantStats.data_version (see counters.apply_deltas),
+so a response can be tagged with the user's version before any of its
+queries run. The version is read from the stats row on every request (one
+primary key lookup) rather than cached, so every process sees a write as soon
+as it commits. A request whose If-None-Match (or If-Modified-Since) still
+matches gets a 304 after that single query. With
+VERSIONED_RESPONSE_CACHE_TIMEOUT set, response data is also cached under the
+ETag, which changes with every write and so never needs invalidating.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .counters import rebuild_stats
+from .models import TenantStats
+
+
+def data_version(user_id):
+    """Return (data_version, updated_at) for the user, creating the stats row if needed."""
+    # Not cached: a per-process cache would keep answering 304 in every
+    # process but the one that handled the write
+    row = TenantStats.objects.filter(user_id=user_id).values_list('data_version', 'updated_at').first()
+    if row is None:
+        stats = rebuild_stats(user_id)
+        row = (stats.data_version, stats.updated_at)
+    return row
+
+
+def make_etag(request, user_id, version):
+    # The version only says the data is unchanged. The URL, the negotiated
+    # format and today's date (for views whose default range ends today)
+    # pick the representation.
+    key = '\n'.join([
+        str(user_id),
+        str(version),
+        timezone.localdate().isoformat(),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ])
+    return 'W/"{}-{}"'.format(version, hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()[:16])
+
+
+def set_validators(response, etag, last_modified):
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    # per-user data: browsers may keep it but must revalidate every time
+    response.headers['Cache-Control'] = 'private, no-cache'
+
+
+def precondition(request, user_id):
+    """Return (etag, last_modified, 304 response or None) for a GET request."""
+    version, updated_at = data_version(user_id)
+    etag = make_etag(request, user_id, version)
+    last_modified = int(updated_at.timestamp())
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        set_validators(not_modified, etag, last_modified)
+    return etag, last_modified, not_modified
+
+
+def conditional_response(request, build):
+    """Answer a GET with 304 when the client's copy is current, otherwise call ``build()``."""
+    if request.method not in ('GET', 'HEAD'):
+        return build()
+    etag, last_modified, not_modified = precondition(request, request.user.pk)
+    if not_modified is not None:
+        return not_modified
+
+    timeout = settings.VERSIONED_RESPONSE_CACHE_TIMEOUT
+    cache = caches[settings.DASHBOARD_CACHE_ALIAS]
+    key = f'versioned-response:{etag}'
+    data = cache.get(key) if timeout else None
+    if data is not None:
+        response = Response(data)
+    else:
+        response = build()
+        if timeout and response.status_code == 200 and isinstance(response, Response):
+            cache.set(key, response.data, timeout)
+    if response.status_code == 200:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def conditional(view):
+    """Decorator for @api_view functions, applied below the DRF decorators."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return conditional_response(request, lambda: view(request, *args, **kwargs))
+    return wrapper
+
+
+class ConditionalReadMixin:
+    """ETag/Last-Modified and 304 responses for a viewset's list and retrieve."""
+
+    def list(self, request, *args, **kwargs):
+        build = super().list
+        return conditional_response(request, lambda: build(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        build = super().retrieve
+        return conditional_response(request, lambda: build(request, *args, **kwargs))
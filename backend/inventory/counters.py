@@ -0,0 +1,83 @@
+from collections import Counter
+
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Order, Product, TenantStats
+from .routers import stick_to_primary
+
+COUNTERS = ('total_stock', 'product_count', 'pending_orders', 'out_of_stock_count')
+
+
+def quantity_deltas(old, new):
+    """
+    Counter deltas for one product whose quantity goes from ``old`` to ``new``.
+    None stands for a product that doesn't exist (before create, after delete).
+    """
+    return Counter({
+        'total_stock': (new or 0) - (old or 0),
+        'product_count': int(new is not None) - int(old is not None),
+        'out_of_stock_count': int(new == 0) - int(old == 0),
+    })
+
+
+def pending_delta(old_status, new_status):
+    return Counter({'pending_orders': int(new_status == 'Pending') - int(old_status == 'Pending')})
+
+
+def compute_stats(user_ids=None):
+    """Aggregate the counters from the product and order tables, keyed by user id."""
+    products = Product.objects.filter(user__isnull=False)
+    pending = Order.objects.filter(user__isnull=False, status='Pending')
+    if user_ids is not None:
+        products = products.filter(user_id__in=user_ids)
+        pending = pending.filter(user_id__in=user_ids)
+
+    stats = {}
+    for row in products.values('user_id').annotate(
+        stock=Sum('quantity'),
+        count=Count('id'),
+        out_of_stock=Count('id', filter=Q(quantity=0)),
+    ).order_by():
+        stats[row['user_id']] = dict.fromkeys(COUNTERS, 0) | {
+            'total_stock': row['stock'] or 0,
+            'product_count': row['count'],
+            'out_of_stock_count': row['out_of_stock'],
+        }
+    for row in pending.values('user_id').annotate(count=Count('id')).order_by():
+        stats.setdefault(row['user_id'], dict.fromkeys(COUNTERS, 0))['pending_orders'] = row['count']
+    return stats
+
+
+def rebuild_stats(user_id):
+    values = compute_stats([user_id]).get(user_id, dict.fromkeys(COUNTERS, 0))
+    stats, _ = TenantStats.objects.update_or_create(user_id=user_id, defaults=values)
+    return stats
+
+
+def apply_deltas(user_id, deltas):
+    """
+    Add ``deltas`` to the user's counters and bump their data_version in a
+    single UPDATE. Call it inside the transaction that made the change so
+    the counters commit with it.
+    """
+    changes = {name: F(name) + value for name, value in deltas.items() if value}
+    stats = TenantStats.objects.filter(user_id=user_id)
+    if not stats.update(data_version=F('data_version') + 1, updated_at=timezone.now(), **changes):
+        # No row yet: computing it from scratch already includes this change
+        rebuild_stats(user_id)
+        stats.update(data_version=F('data_version') + 1)
+    # the user reads their own write from the primary until the replica has it
+    stick_to_primary(user_id)
+
+
+def bump_data_version(user_id):
+    """Mark the user's data as changed by a write that leaves the counters alone."""
+    apply_deltas(user_id, {})
+
+
+def get_stats(user):
+    try:
+        return TenantStats.objects.get(user=user)
+    except TenantStats.DoesNotExist:
+        return rebuild_stats(user.pk)
@@ -0,0 +1,195 @@
+import asyncio
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .concurrency import run_in_worker
+from .counters import get_stats
+from .models import Product, ProductStockSnapshot, StockAlert, StockSnapshot
+from .sales import leaderboard_rows
+from .snapshots import BUCKETS, choose_bucket, stock_series
+
+
+def headline_counters(user):
+    # O(1) read of the denormalized per-user counters
+    stats = get_stats(user)
+    return {
+        'total_stock': stats.total_stock,
+        'total_products': stats.product_count,
+        'pending_orders_count': stats.pending_orders,
+        'out_of_stock_count': stats.out_of_stock_count,
+    }
+
+
+def low_stock_products(user):
+    # open alerts, maintained by the write paths (see alerts.py)
+    alerts = StockAlert.objects.filter(user=user).order_by('quantity', 'product_id')
+    return {'low_stock_products': [
+        {'name': name, 'stock': quantity, 'reorder_point': reorder_point}
+        for name, quantity, reorder_point in alerts.values_list('product__name', 'quantity', 'reorder_point')
+    ]}
+
+
+def top_selling_products(user):
+    # units sold over all time, from the daily sales totals
+    return {'top_selling_products': [
+        {'product': item['name'] or 'N/A', 'units_sold': item['units_sold']}
+        for item in leaderboard_rows(user, 'all', 5)
+    ]}
+
+
+# Independent pieces of the dashboard payload, each a dict of payload keys
+DASHBOARD_PARTS = (
+    headline_counters,
+    low_stock_products,
+    top_selling_products,
+)
+
+
+def _merge(parts):
+    data = {}
+    for part in parts:
+        data.update(part)
+    return data
+
+
+def build_dashboard_stats(user):
+    return _merge(part(user) for part in DASHBOARD_PARTS)
+
+
+async def abuild_dashboard_stats(user):
+    # The parts are independent, so run them side by side on worker threads
+    return _merge(await asyncio.gather(*(run_in_worker(part, user) for part in DASHBOARD_PARTS)))
+
+
+def inventory_summary_rows(user):
+    products = Product.objects.filter(user=user).order_by('name').values_list('name', 'sku', 'quantity')
+    return [
+        {
+            'product_name': name,
+            'sku': sku,
+            # stock shows current product quantity (from Product model, updated after orders)
+            'in_stock': quantity,
+            # OutStock shows Out of Stock if quantity is 0, else blank
+            'out_stock': 'Out of Stock' if quantity == 0 else '',
+        }
+        for name, sku, quantity in products
+    ]
+
+
+def _parse_date_param(value):
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
+
+
+def parse_date_range(params):
+    """Validate optional start/end YYYY-MM-DD query parameters, raising ValueError with a message."""
+    try:
+        start = _parse_date_param(params.get('start'))
+        end = _parse_date_param(params.get('end'))
+    except ValueError:
+        raise ValueError('start and end must be valid YYYY-MM-DD dates')
+    if start and end and start > end:
+        raise ValueError('start must not be after end')
+    return start, end
+
+
+def parse_product_param(params):
+    """Validate the optional product id query parameter, raising ValueError with a message."""
+    value = params.get('product')
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError('product must be a product id')
+
+
+def parse_chart_params(params):
+    """Validate the stock chart query parameters, raising ValueError with a message."""
+    start, end = parse_date_range(params)
+    bucket = params.get('bucket') or None
+    if bucket and bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    return {'start': start, 'end': end, 'bucket': bucket, 'product_id': parse_product_param(params)}
+
+
+def stock_chart(user, start=None, end=None, bucket=None, product_id=None):
+    # read the precomputed daily snapshots instead of replaying the inventory log
+    if product_id:
+        snapshots = ProductStockSnapshot.objects.filter(product_id=product_id, product__user=user)
+    else:
+        snapshots = StockSnapshot.objects.filter(user=user)
+
+    if not bucket:
+        first = start or snapshots.order_by('date').values_list('date', flat=True).first()
+        bucket = choose_bucket(first, end or timezone.localdate(), settings.STOCK_CHART_MAX_POINTS)
+
+    dates, stock_levels = stock_series(snapshots, start, end, bucket)
+    return {
+        'dates': dates,
+        'stock_levels': stock_levels,
+        'bucket': bucket,
+    }
+
+
+# Per-user cache of the dashboard payload. Every product/order write path
+# calls invalidate_dashboard() so a cached payload is never stale for long.
+
+_counters = {'hits': 0, 'misses': 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def dashboard_cache():
+    return caches[settings.DASHBOARD_CACHE_ALIAS]
+
+
+def _cache_key(user_id):
+    return f'dashboard:stats:{user_id}'
+
+
+def get_dashboard_stats(user):
+    cache = dashboard_cache()
+    key = _cache_key(user.pk)
+    data = cache.get(key)
+    if data is not None:
+        _count('hits')
+        return data
+    _count('misses')
+    data = build_dashboard_stats(user)
+    cache.set(key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
+async def aget_dashboard_stats(user):
+    cache = dashboard_cache()
+    key = _cache_key(user.pk)
+    data = await cache.aget(key)
+    if data is not None:
+        _count('hits')
+        return data
+    _count('misses')
+    data = await abuild_dashboard_stats(user)
+    await cache.aset(key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_dashboard(user_id):
+    dashboard_cache().delete(_cache_key(user_id))
+
+
+def dashboard_cache_stats():
+    with _counters_lock:
+        return dict(_counters)
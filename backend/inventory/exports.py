@@ -0,0 +1,68 @@
+import csv
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Rows joined into each chunk handed to the server
+ROWS_PER_CHUNK = 500
+
+
+class _Echo:
+    # File-like object for csv.writer that hands back each line instead of storing it
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _lines(header, rows, file_format):
+    if file_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow([_plain(value) for value in row])
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(header, (_plain(value) for value in row)))) + '\n'
+
+
+def _chunks(header, rows, file_format):
+    lines = _lines(header, rows, file_format)
+    # Send the first line on its own so the client gets a byte right away
+    first = next(lines, None)
+    if first is not None:
+        yield first
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= ROWS_PER_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def export_response(filename, header, rows, file_format):
+    """
+    Stream ``rows`` (an iterable of tuples matching ``header``) as a CSV or
+    NDJSON attachment without building the whole document in memory.
+    """
+    response = StreamingHttpResponse(
+        _chunks(header, rows, file_format),
+        content_type=EXPORT_FORMATS[file_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
@@ -0,0 +1,242 @@
+import codecs
+import csv
+import json
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.fields import SkipField, empty
+
+from .alerts import evaluate_stock_alerts
+from .counters import apply_deltas, quantity_deltas
+from .models import Category, InventoryLog, Product
+from .serializers import ProductSerializer
+from .snapshots import record_logs
+
+FORMATS = ('csv', 'ndjson')
+IMPORT_FIELDS = ('name', 'sku', 'quantity', 'price', 'description', 'reorder_point')
+MAX_REPORTED_ERRORS = 100
+
+
+def _decode(line, line_number):
+    # each line on its own, so a stray byte only costs the line it is on
+    if line_number == 1:
+        line = line.removeprefix(codecs.BOM_UTF8)
+    try:
+        return line.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+
+
+def _csv_lines(byte_lines, undecodable):
+    # the csv reader gets a blank line in place of one that isn't UTF-8
+    for line_number, line in enumerate(byte_lines, start=1):
+        text = _decode(line, line_number)
+        if text is None:
+            undecodable.append(line_number)
+            text = '\n'
+        yield text
+
+
+def _iter_csv(byte_lines):
+    undecodable = []
+    reader = csv.DictReader(_csv_lines(byte_lines, undecodable))
+    try:
+        readable = reader.fieldnames is not None and not undecodable
+    except csv.Error:
+        readable = False
+    if not readable:
+        # no usable header row, so no row can be read either
+        if reader.line_num:
+            yield reader.line_num, None
+        return
+
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error:
+            row = None
+        # lines skipped as undecodable on the way to this row
+        for line_number in undecodable:
+            yield line_number, None
+        undecodable.clear()
+        yield reader.line_num, row
+    for line_number in undecodable:
+        yield line_number, None
+
+
+def iter_rows(byte_lines, file_format):
+    """
+    Yield (line_number, row) pairs from an iterable of raw byte lines, so an
+    upload is parsed while it is read instead of being loaded in one piece.
+    A line that isn't UTF-8 or can't be parsed is yielded as None, and the
+    rest of the file is still read. A CSV whose header row is unreadable
+    yields that line as None and nothing else.
+    """
+    if file_format == 'csv':
+        yield from _iter_csv(byte_lines)
+        return
+
+    for line_number, line in enumerate(byte_lines, start=1):
+        line = _decode(line, line_number)
+        if line is None:
+            yield line_number, None
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def _clean_row(serializer, row):
+    # Run the ProductSerializer field validation without its per-row SKU query
+    values = {}
+    errors = {}
+    for name in IMPORT_FIELDS:
+        raw = row.get(name, empty)
+        if raw in ('', None) and name in ('quantity', 'description', 'reorder_point'):
+            raw = empty
+        try:
+            value = serializer.fields[name].run_validation(raw)
+            validate = getattr(serializer, f'validate_{name}', None)
+            values[name] = validate(value) if validate else value
+        except SkipField:
+            pass
+        except serializers.ValidationError as exc:
+            errors[name] = exc.detail
+    if not errors:
+        values['sku'] = values['sku'].strip()
+        values['name'] = values['name'].strip()
+        if values['sku'] == '':
+            errors['sku'] = 'SKU is required'
+
+    category = row.get('category')
+    if category not in (None, ''):
+        values['category'] = str(category).strip()
+    return values, errors
+
+
+def _resolve_categories(user, names, categories):
+    # Fill the name -> Category cache, creating missing categories in one go
+    missing = set(names) - categories.keys()
+    if not missing:
+        return
+    for category in Category.objects.filter(user=user, name__in=missing):
+        categories[category.name] = category
+    missing -= categories.keys()
+    if missing:
+        Category.objects.bulk_create(
+            [Category(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        for category in Category.objects.filter(user=user, name__in=missing):
+            categories[category.name] = category
+
+
+def _import_chunk(user, chunk, upsert, categories, report):
+    skus = [values['sku'] for _, values in chunk]
+    existing = {product.sku: product for product in Product.objects.filter(user=user, sku__in=skus)}
+    _resolve_categories(user, {values['category'] for _, values in chunk if 'category' in values}, categories)
+
+    new_products = []
+    updated_products = []
+    deltas = Counter()
+    updated_fields = set()
+    logs = []
+    for line_number, values in chunk:
+        if 'category' in values:
+            values['category'] = categories[values['category']]
+        product = existing.get(values['sku'])
+        if product is None:
+            new_products.append(Product(user=user, **values))
+            continue
+        if not upsert:
+            _report_error(report, line_number, {'sku': 'SKU must be unique for your account.'})
+            continue
+
+        old_quantity = product.quantity
+        for field, value in values.items():
+            setattr(product, field, value)
+        updated_fields.update(values)
+        updated_products.append(product)
+        deltas.update(quantity_deltas(old_quantity, product.quantity))
+        if product.quantity != old_quantity:
+            change = product.quantity - old_quantity
+            logs.append(InventoryLog(
+                product=product,
+                change_type='Added' if change > 0 else 'Removed',
+                quantity=abs(change),
+            ))
+
+    with transaction.atomic():
+        Product.objects.bulk_create(new_products)
+        if updated_products:
+            # bulk_update doesn't apply auto_now
+            now = timezone.now()
+            for product in updated_products:
+                product.updated_at = now
+            Product.objects.bulk_update(updated_products, sorted(updated_fields | {'updated_at'}))
+        logs.extend(
+            InventoryLog(product=product, change_type='Added', quantity=max(product.quantity, 0))
+            for product in new_products
+        )
+        InventoryLog.objects.bulk_create(logs)
+        record_logs(logs)
+        for product in new_products:
+            deltas.update(quantity_deltas(None, product.quantity))
+        apply_deltas(user.pk, deltas)
+        # the import sends one event for the whole file, not one per low product
+        evaluate_stock_alerts((product.pk for product in new_products + updated_products), announce=False)
+
+    report['created'] += len(new_products)
+    report['updated'] += len(updated_products)
+
+
+def _report_error(report, line_number, errors):
+    report['failed'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'line': line_number, 'errors': errors})
+
+
+def import_products(user, rows, upsert=False, chunk_size=1000):
+    """
+    Import products for ``user`` from (line_number, row) pairs.
+
+    Rows are validated one by one and written in chunks: SKU uniqueness is
+    checked with a single IN query per chunk, and products plus their initial
+    inventory log entries are inserted with bulk_create. With ``upsert``,
+    rows whose SKU already exists update that product instead of failing.
+    """
+    report = {'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+    serializer = ProductSerializer()
+    categories = {}
+    chunk = []
+    chunk_skus = set()
+
+    for line_number, row in rows:
+        if row is None:
+            _report_error(report, line_number, {'non_field_errors': 'Row could not be parsed'})
+            continue
+        values, errors = _clean_row(serializer, row)
+        if errors:
+            _report_error(report, line_number, errors)
+            continue
+        # A repeated SKU starts a new chunk so it sees the earlier row as existing
+        if len(chunk) >= chunk_size or values['sku'] in chunk_skus:
+            _import_chunk(user, chunk, upsert, categories, report)
+            chunk = []
+            chunk_skus = set()
+        chunk.append((line_number, values))
+        chunk_skus.add(values['sku'])
+
+    if chunk:
+        _import_chunk(user, chunk, upsert, categories, report)
+    report['errors'].sort(key=lambda error: error['line'])
+    return report
@@ -0,0 +1,270 @@
+"""
+Database-backed background jobs for the secondary writes of the order and
+product paths: inventory log rows (and the stock snapshots they feed), the
+daily sales totals and the low stock alert checks.
+
+enqueue_secondary_writes() inserts the jobs in the writer's transaction, so
+they exist exactly when the write committed, with a single INSERT.
+``python manage.py run_jobs`` claims queued jobs in batches on a thread pool,
+runs each kind's handler once per batch and deletes the jobs in the same
+transaction. If a batch fails its jobs are run one at a time, so a bad
+payload doesn't hold back the rest. A failing job is retried with
+exponential backoff and after JOB_MAX_ATTEMPTS stays in the dead state, with
+its last error, until ``run_jobs --requeue-dead``.
+
+With JOBS_EAGER (the default) the handlers run right away inside the
+caller's transaction instead, as the write paths did before. Queued jobs
+clear the dashboard cache from the worker process, so check_job_settings()
+refuses to start without a cache shared between processes.
+"""
+import json
+import threading
+import traceback
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .alerts import evaluate_stock_alerts
+from .counters import bump_data_version
+from .dashboard import invalidate_dashboard
+from .models import InventoryLog, Job, Product
+from .sales import record_sales
+from .snapshots import record_logs
+
+HANDLERS = {}
+
+
+def job_handler(kind):
+    """Register ``func(payloads)`` as the handler of ``kind`` jobs; it gets a batch of payloads."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def check_job_settings():
+    """Raise ImproperlyConfigured if queued jobs couldn't invalidate the web processes' dashboard cache."""
+    if settings.JOBS_EAGER:
+        return
+    if isinstance(caches[settings.DASHBOARD_CACHE_ALIAS], LocMemCache):
+        raise ImproperlyConfigured(
+            'JOBS_EAGER = False needs a shared cache backend (e.g. Redis or Memcached) for '
+            'DASHBOARD_CACHE_ALIAS: run_jobs clears cached dashboards in its own process only'
+        )
+
+
+def enqueue_secondary_writes(user_id, logs=(), sales=(), stock_checks=()):
+    """
+    Queue the secondary writes of one change to ``user_id``'s data:
+    ``logs`` as (product_id, change_type, quantity), ``sales`` as
+    sales.order_sale() lines and ``stock_checks`` as product ids.
+    """
+    payloads = []
+    logs = [[product_id, change_type, quantity] for product_id, change_type, quantity in logs]
+    if logs:
+        # the business time is now, not when the worker gets to them
+        payloads.append(('inventory_logs', {'logs': logs, 'timestamp': timezone.now().isoformat()}))
+    sales = [
+        [product_id, owner_id, day.isoformat(), units, str(revenue), orders]
+        for product_id, owner_id, day, units, revenue, orders in sales
+    ]
+    if sales:
+        payloads.append(('sales', {'sales': sales}))
+    stock_checks = sorted(set(stock_checks))
+    if stock_checks:
+        payloads.append(('stock_alerts', {'products': stock_checks}))
+    enqueue(payloads, user_id)
+
+
+def enqueue(payloads, user_id=None):
+    """Queue (kind, payload) pairs in the caller's transaction, or run them now with JOBS_EAGER."""
+    if settings.JOBS_EAGER:
+        for kind, payload in payloads:
+            # the handler gets the payload the queue would have given it
+            HANDLERS[kind]([json.loads(json.dumps(payload))])
+        return
+    Job.objects.bulk_create([Job(kind=kind, payload=payload, user_id=user_id) for kind, payload in payloads])
+
+
+def claim_jobs(limit, now=None):
+    """Lease up to ``limit`` runnable jobs to the caller, oldest first."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        runnable = Job.objects.filter(
+            Q(state='queued', run_after__lte=now)
+            # leased by a worker that died
+            | Q(state='running', locked_until__lt=now)
+        )
+        ids = list(runnable.select_for_update(skip_locked=True).order_by('id').values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        Job.objects.filter(pk__in=ids).update(
+            state='running',
+            locked_until=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+            attempts=F('attempts') + 1,
+        )
+        return list(Job.objects.filter(pk__in=ids).order_by('id'))
+
+
+class LeaseLost(Exception):
+    pass
+
+
+def _run_batch(kind, jobs):
+    handler = HANDLERS.get(kind)
+    if handler is None:
+        raise LookupError(f'No handler for {kind} jobs')
+    users = sorted({job.user_id for job in jobs if job.user_id is not None})
+    with transaction.atomic():
+        # deleting first also checks the lease, so a job is never applied twice
+        owned = Job.objects.filter(pk__in=[job.pk for job in jobs], state='running', locked_until=jobs[0].locked_until)
+        if owned.delete()[0] != len(jobs):
+            raise LeaseLost(f'{kind} jobs were claimed again by another worker')
+        handler([job.payload for job in jobs])
+        # their data changed behind the responses cached under the old version
+        for user_id in users:
+            bump_data_version(user_id)
+    for user_id in users:
+        invalidate_dashboard(user_id)
+
+
+def _fail(job, error):
+    if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+        changes = {'state': 'dead'}
+    else:
+        delay = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+        changes = {'state': 'queued', 'run_after': timezone.now() + timedelta(seconds=delay)}
+    Job.objects.filter(pk=job.pk, state='running', locked_until=job.locked_until).update(
+        locked_until=None,
+        last_error=''.join(traceback.format_exception(error)),
+        **changes,
+    )
+
+
+def run_jobs(jobs):
+    """Run claimed jobs, one handler call per kind. Returns Counter(done=, failed=)."""
+    totals = Counter()
+    batches = defaultdict(list)
+    for job in jobs:
+        batches[job.kind].append(job)
+    for kind, batch in batches.items():
+        try:
+            _run_batch(kind, batch)
+            totals['done'] += len(batch)
+        except LeaseLost:
+            pass
+        except Exception as e:
+            if len(batch) == 1:
+                _fail(batch[0], e)
+                totals['failed'] += 1
+            else:
+                totals.update(_run_singly(kind, batch))
+    return totals
+
+
+def _run_singly(kind, batch):
+    # one bad payload shouldn't fail the whole batch
+    totals = Counter()
+    for job in batch:
+        try:
+            _run_batch(kind, [job])
+            totals['done'] += 1
+        except LeaseLost:
+            pass
+        except Exception as e:
+            _fail(job, e)
+            totals['failed'] += 1
+    return totals
+
+
+def work(threads=1, batch_size=None, poll_seconds=None, once=False, stop=None):
+    """
+    Run jobs on ``threads`` threads until ``stop`` is set, or with ``once``
+    until no job is runnable. Returns Counter(done=, failed=).
+    """
+    batch_size = batch_size or settings.JOB_BATCH_SIZE
+    poll_seconds = settings.JOB_POLL_SECONDS if poll_seconds is None else poll_seconds
+    stop = stop or threading.Event()
+    totals = Counter()
+    lock = threading.Lock()
+
+    def loop():
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                jobs = claim_jobs(batch_size)
+                if not jobs:
+                    if once:
+                        return
+                    stop.wait(poll_seconds)
+                    continue
+                result = run_jobs(jobs)
+                with lock:
+                    totals.update(result)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(loop) for _ in range(threads)]
+        try:
+            for future in futures:
+                future.result()
+        except KeyboardInterrupt:
+            # let the threads finish their current batch
+            stop.set()
+            raise
+    return totals
+
+
+def requeue_dead(now=None):
+    """Give every dead job a fresh set of attempts. Returns how many were requeued."""
+    return Job.objects.filter(state='dead').update(
+        state='queued', attempts=0, run_after=now or timezone.now(), last_error=''
+    )
+
+
+def _live_products(product_ids):
+    # a product deleted after the job was queued took its logs and totals with it
+    return set(Product.objects.filter(pk__in=set(product_ids)).values_list('id', flat=True))
+
+
+@job_handler('inventory_logs')
+def write_inventory_logs(payloads):
+    live = _live_products(row[0] for payload in payloads for row in payload['logs'])
+    logs = [
+        InventoryLog(
+            product_id=product_id, change_type=change_type, quantity=quantity,
+            timestamp=datetime.fromisoformat(payload['timestamp']),
+        )
+        for payload in payloads
+        for product_id, change_type, quantity in payload['logs']
+        if product_id in live
+    ]
+    # updated_at is the time of this insert, the change feed follows it
+    InventoryLog.objects.bulk_create(logs)
+    record_logs(logs)
+
+
+@job_handler('sales')
+def write_sales(payloads):
+    rows = [row for payload in payloads for row in payload['sales']]
+    live = _live_products(row[0] for row in rows)
+    record_sales(
+        (product_id, owner_id, date.fromisoformat(day), units, Decimal(revenue), orders)
+        for product_id, owner_id, day, units, revenue, orders in rows
+        if product_id in live
+    )
+
+
+@job_handler('stock_alerts')
+def check_stock_alerts(payloads):
+    evaluate_stock_alerts(product_id for payload in payloads for product_id in payload['products'])
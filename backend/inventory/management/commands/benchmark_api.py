@@ -0,0 +1,42 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.benchmarks import run_benchmark, serializer_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Time every API route against the current data (see generate_demo_data) and print a JSON report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default='bench_0', help='Username to run the requests as')
+        parser.add_argument('--password', default='benchmark', help="The user's password, used by the login route")
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request')
+        parser.add_argument('--serializers', action='store_true',
+                            help='Also compare the serializer and lean list rendering paths')
+        parser.add_argument('--output', help='Write the report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+        user = User.objects.filter(username=options['user']).first()
+        if user is None:
+            raise CommandError(f"User {options['user']!r} does not exist, run generate_demo_data first")
+        try:
+            report = run_benchmark(user, options['password'], options['iterations'], options['cold'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['serializers']:
+            report['serializers'] = serializer_benchmark(user, options['iterations'])
+
+        for name in report['missing_routes']:
+            self.stderr.write(f'No benchmark case for route {name!r}')
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(report['results'])} results to {options['output']}"))
+        else:
+            self.stdout.write(output)
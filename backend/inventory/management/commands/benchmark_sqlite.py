@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.benchmarks import CONTENTION_PROFILES, contention_benchmark
+
+
+class Command(BaseCommand):
+    help = ('Compare SQLite write/read contention with the stock settings and the production '
+            'profile (WAL, busy timeout, BEGIN IMMEDIATE, persistent connections)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Threads placing orders')
+        parser.add_argument('--readers', type=int, default=8, help='Threads reading dashboard totals')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--profile', action='append', dest='profiles', choices=sorted(CONTENTION_PROFILES),
+                            help='Only run this profile (repeatable)')
+        parser.add_argument('--output', help='Write the report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        if options['writers'] < 0 or options['readers'] < 0 or options['writers'] + options['readers'] == 0:
+            raise CommandError('Need at least one writer or reader thread')
+        if options['seconds'] <= 0 or options['products'] < 1:
+            raise CommandError('--seconds and --products must be positive')
+        report = contention_benchmark(
+            writers=options['writers'],
+            readers=options['readers'],
+            seconds=options['seconds'],
+            products=options['products'],
+            profiles=options['profiles'],
+        )
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(report['profiles'])} profiles to {options['output']}"))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.compaction import ARCHIVE_MODES, compact_inventory_logs, compaction_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Roll inventory log rows older than the retention window into daily rollups and archive them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=settings.INVENTORY_LOG_RETENTION_DAYS,
+                            help='Keep this many days of raw log rows')
+        parser.add_argument('--archive', choices=ARCHIVE_MODES, default='table',
+                            help='Where compacted raw rows go: the archive table, a gzipped NDJSON file, or nowhere')
+        parser.add_argument('--archive-file', help='File to append to with --archive file')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['retention_days'] < 0:
+            raise CommandError('--retention-days must not be negative')
+        before = compaction_cutoff(options['retention_days'])
+        try:
+            report = compact_inventory_logs(
+                before,
+                archive=options['archive'],
+                archive_path=options['archive_file'],
+                batch_size=options['batch_size'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {report['compacted']} log rows from before {before:%Y-%m-%d} "
+            f"into {report['rollup_days']} product-day rollups"
+        ))
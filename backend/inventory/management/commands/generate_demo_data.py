@@ -0,0 +1,138 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from inventory.alerts import rebuild_stock_alerts
+from inventory.counters import rebuild_stats
+from inventory.models import Category, InventoryLog, Order, Product
+from inventory.sales import rebuild_sales
+from inventory.snapshots import rebuild_snapshots
+
+
+@contextmanager
+def _explicit_dates(*fields):
+    # Let bulk_create keep the spread-out dates we set instead of auto_now_add
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in zip(fields, saved):
+            field.auto_now_add = auto_now_add
+
+
+def _insert(model, objs, batch_size):
+    # bulk_create in slices so a generator of millions of rows never sits in memory at once
+    objs = iter(objs)
+    while batch := list(islice(objs, batch_size)):
+        model.objects.bulk_create(batch)
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic tenants (users, categories, products, orders, logs) for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1)
+        parser.add_argument('--categories', type=int, default=5, help='Categories per user')
+        parser.add_argument('--products', type=int, default=100, help='Products per user')
+        parser.add_argument('--orders', type=int, default=500, help='Orders per user')
+        parser.add_argument('--logs', type=int, default=1000, help='Extra inventory log rows per user')
+        parser.add_argument('--days', type=int, default=365, help='Spread orders and logs over this many days')
+        parser.add_argument('--prefix', default='bench', help='Username prefix, users are <prefix>_<n>')
+        parser.add_argument('--password', default='benchmark')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['products'] < 1:
+            raise CommandError('--users and --products must be at least 1')
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        prefix = options['prefix']
+        usernames = [f'{prefix}_{n}' for n in range(options['users'])]
+        if User.objects.filter(username__in=usernames).exists():
+            raise CommandError(f'Users with prefix {prefix!r} already exist, pick another --prefix')
+
+        now = timezone.now()
+        span = timedelta(days=options['days'])
+
+        def when():
+            return now - span * rng.random()
+
+        with transaction.atomic():
+            password = make_password(options['password'])
+            users = User.objects.bulk_create(
+                [User(username=name, email=f'{name}@example.com', password=password) for name in usernames]
+            )
+            for user in users:
+                categories = Category.objects.bulk_create(
+                    [Category(user=user, name=f'Category {n}') for n in range(options['categories'])]
+                )
+                products = Product.objects.bulk_create(
+                    [
+                        Product(
+                            user=user,
+                            name=f'Product {n}',
+                            sku=f'SKU-{n:07d}',
+                            quantity=rng.randint(0, 200),
+                            price=Decimal(rng.randint(100, 100000)) / 100,
+                            description=f'Synthetic product {n}',
+                            category=rng.choice(categories) if categories else None,
+                        )
+                        for n in range(options['products'])
+                    ],
+                    batch_size=batch_size,
+                )
+
+                with _explicit_dates(Order._meta.get_field('date'), InventoryLog._meta.get_field('timestamp')):
+                    _insert(
+                        Order,
+                        (
+                            Order(
+                                user=user,
+                                product=product,
+                                quantity=rng.randint(1, 5),
+                                status=rng.choice(Order.STATUS_CHOICES)[0],
+                                unit_price=product.price,
+                                date=when(),
+                            )
+                            for product in (rng.choice(products) for _ in range(options['orders']))
+                        ),
+                        batch_size,
+                    )
+                    _insert(
+                        InventoryLog,
+                        (
+                            InventoryLog(
+                                product=rng.choice(products),
+                                change_type=rng.choice(InventoryLog.CHANGE_TYPES)[0],
+                                quantity=rng.randint(1, 20),
+                                timestamp=when(),
+                            )
+                            for _ in range(options['logs'])
+                        ),
+                        batch_size,
+                    )
+
+            # derived tables are maintained by the write paths, bulk_create bypasses them
+            user_ids = [user.pk for user in users]
+            rebuild_snapshots(user_ids)
+            rebuild_sales(user_ids)
+            rebuild_stock_alerts(user_ids)
+            for user_id in user_ids:
+                rebuild_stats(user_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(users)} users ({', '.join(usernames[:3])}{'...' if len(users) > 3 else ''}) "
+            f"with {options['products']} products, {options['orders']} orders and "
+            f"{options['logs']} log rows each"
+        ))
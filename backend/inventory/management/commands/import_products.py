@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.importers import FORMATS, import_products, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Import products for a user from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import')
+        parser.add_argument('--user', required=True, help='Username that will own the products')
+        parser.add_argument('--format', choices=FORMATS, dest='file_format',
+                            help='File format (defaults to the file extension)')
+        parser.add_argument('--upsert', action='store_true',
+                            help='Update products whose SKU already exists')
+        parser.add_argument('--chunk-size', type=int, default=settings.PRODUCT_IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist")
+
+        path = options['path']
+        file_format = options['file_format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        try:
+            with open(path, 'rb') as handle:
+                report = import_products(
+                    user,
+                    iter_rows(handle, file_format),
+                    upsert=options['upsert'],
+                    chunk_size=options['chunk_size'],
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']}, updated {report['updated']}, failed {report['failed']}"
+        ))
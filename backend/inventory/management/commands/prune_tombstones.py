@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from inventory.changes import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete change feed tombstones older than TOMBSTONE_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        pruned = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(
+            f'Pruned {pruned} change feed tombstones older than {settings.TOMBSTONE_RETENTION_DAYS} days'
+        ))
@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.sales import rebuild_sales
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-product daily sales totals from the orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames',
+                            help='Only rebuild sales totals for this username (repeatable)')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            user_ids = list(User.objects.filter(username__in=options['usernames']).values_list('id', flat=True))
+            if len(user_ids) != len(set(options['usernames'])):
+                raise CommandError('Unknown username in --user')
+
+        rows = rebuild_sales(user_ids)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {rows} product sales rows'))
@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.alerts import rebuild_stock_alerts
+
+
+class Command(BaseCommand):
+    help = 'Re-check every product against its reorder point and rewrite the open low stock alerts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames',
+                            help='Only re-check this username (repeatable)')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            user_ids = list(User.objects.filter(username__in=options['usernames']).values_list('id', flat=True))
+            if len(user_ids) != len(set(options['usernames'])):
+                raise CommandError('Unknown username in --user')
+
+        alerts = rebuild_stock_alerts(user_ids)
+        self.stdout.write(self.style.SUCCESS(f'{alerts} products are below their reorder point'))
@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.snapshots import rebuild_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily stock snapshot tables from the inventory log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames',
+                            help='Only rebuild snapshots for this username (repeatable)')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            user_ids = list(User.objects.filter(username__in=options['usernames']).values_list('id', flat=True))
+            if len(user_ids) != len(set(options['usernames'])):
+                raise CommandError('Unknown username in --user')
+
+        user_rows, product_rows = rebuild_snapshots(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {user_rows} user and {product_rows} product snapshot rows'
+        ))
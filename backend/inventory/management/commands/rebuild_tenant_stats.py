@@ -0,0 +1,46 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.counters import COUNTERS, bump_data_version, compute_stats
+from inventory.models import TenantStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild (or with --verify, check) the per-user inventory counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Only compare the stored counters with the live tables')
+        parser.add_argument('--user', action='append', dest='usernames',
+                            help='Only process this username (repeatable)')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        user_ids = list(users.values_list('id', flat=True))
+
+        expected = compute_stats(user_ids)
+        stored = {stats.user_id: stats for stats in TenantStats.objects.filter(user_id__in=user_ids)}
+        zero = dict.fromkeys(COUNTERS, 0)
+
+        drifted = []
+        for user_id in user_ids:
+            values = expected.get(user_id, zero)
+            stats = stored.get(user_id)
+            if stats is None or any(getattr(stats, name) != values[name] for name in COUNTERS):
+                drifted.append(user_id)
+                if options['verify']:
+                    current = {name: getattr(stats, name) for name in COUNTERS} if stats else None
+                    self.stderr.write(f'user {user_id}: stored {current}, expected {values}')
+                else:
+                    TenantStats.objects.update_or_create(user_id=user_id, defaults=values)
+                    # the dashboard numbers changed, so cached copies are stale
+                    bump_data_version(user_id)
+
+        if options['verify']:
+            if drifted:
+                raise CommandError(f'{len(drifted)} of {len(user_ids)} users have drifted counters')
+            self.stdout.write(self.style.SUCCESS(f'Counters for {len(user_ids)} users are consistent'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt counters for {len(drifted)} of {len(user_ids)} users'))
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.jobs import requeue_dead, work
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (inventory logs, sales totals, stock alerts) on a thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=settings.JOB_WORKER_THREADS,
+                            help='Worker threads (default JOB_WORKER_THREADS)')
+        parser.add_argument('--batch-size', type=int, default=settings.JOB_BATCH_SIZE,
+                            help='Jobs claimed per batch (default JOB_BATCH_SIZE)')
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_SECONDS,
+                            help='Seconds to wait when the queue is empty (default JOB_POLL_SECONDS)')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no job is runnable instead of polling')
+        parser.add_argument('--requeue-dead', action='store_true',
+                            help='Give dead jobs a fresh set of attempts before starting')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--threads and --batch-size must be at least 1')
+
+        if options['requeue_dead']:
+            self.stdout.write(f'Requeued {requeue_dead()} dead jobs')
+        try:
+            totals = work(
+                threads=options['threads'],
+                batch_size=options['batch_size'],
+                poll_seconds=options['poll_interval'],
+                once=options['once'],
+            )
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(self.style.SUCCESS(f"{totals['done']} jobs done, {totals['failed']} failed"))
@@ -0,0 +1,235 @@
+"""
+In-process request metrics, exposed in Prometheus text format at /api/metrics/.
+
+MetricsMiddleware times every request and tallies the SQL it runs through a
+database execute wrapper. Totals are kept per URL name rather than per raw
+path, so /api/products/1/ and /api/products/2/ share the product-detail
+series. The registry lives in the worker process, so with several workers
+each one is scraped on its own.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+
+from .authentication import user_cache
+from .dashboard import dashboard_cache_stats
+
+# Upper bounds in seconds, as in the Prometheus client libraries
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# SQL tally of the request being handled. sync_to_async copies context
+# variables, so queries run on worker threads by the async views are counted too.
+_current_queries = ContextVar('inventory_metrics_queries', default=None)
+
+
+class _QueryTally:
+    __slots__ = ('count', 'seconds', 'lock')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.count += 1
+            self.seconds += seconds
+
+
+def count_queries(execute, sql, params, many, context):
+    tally = _current_queries.get()
+    if tally is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        tally.add(time.perf_counter() - started)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    # connection_created fires again on every reconnect of the same wrapper
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+connection_created.connect(install_query_counter, dispatch_uid='inventory_metrics_query_counter')
+
+
+class _Histogram:
+    __slots__ = ('counts', 'total', 'observations')
+
+    def __init__(self, size):
+        self.counts = [0] * (size + 1)  # the last slot is +Inf
+        self.total = 0.0
+        self.observations = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = {}
+            self._durations = {}
+            self._queries = {}
+            self._query_seconds = {}
+            self._response_bytes = {}
+
+    def observe(self, route, method, status_code, seconds, queries, query_seconds, response_bytes):
+        key = (route, method)
+        with self._lock:
+            request_key = (route, method, str(status_code))
+            self._requests[request_key] = self._requests.get(request_key, 0) + 1
+            self._add(self._durations, key, DURATION_BUCKETS, seconds)
+            self._add(self._queries, key, QUERY_COUNT_BUCKETS, queries)
+            self._query_seconds[key] = self._query_seconds.get(key, 0.0) + query_seconds
+            if response_bytes is not None:
+                self._response_bytes[key] = self._response_bytes.get(key, 0) + response_bytes
+
+    @staticmethod
+    def _add(histograms, key, buckets, value):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = _Histogram(len(buckets))
+        histogram.counts[bisect_left(buckets, value)] += 1
+        histogram.total += value
+        histogram.observations += 1
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            requests = dict(self._requests)
+            durations = {key: _copy(h) for key, h in self._durations.items()}
+            queries = {key: _copy(h) for key, h in self._queries.items()}
+            query_seconds = dict(self._query_seconds)
+            response_bytes = dict(self._response_bytes)
+
+        lines = []
+        _counter(lines, 'inventory_http_requests_total', 'Requests handled, by route, method and status.',
+                 {_labels(route=r, method=m, status=s): value for (r, m, s), value in requests.items()})
+        _histogram(lines, 'inventory_http_request_duration_seconds', 'Request latency in seconds.',
+                   durations, DURATION_BUCKETS)
+        _histogram(lines, 'inventory_db_queries_per_request', 'SQL queries run per request.',
+                   queries, QUERY_COUNT_BUCKETS)
+        _counter(lines, 'inventory_db_query_duration_seconds_total', 'Time spent executing SQL, in seconds.',
+                 {_labels(route=r, method=m): value for (r, m), value in query_seconds.items()})
+        _counter(lines, 'inventory_http_response_bytes_total', 'Response body bytes (streamed bodies excluded).',
+                 {_labels(route=r, method=m): value for (r, m), value in response_bytes.items()})
+
+        cache = dashboard_cache_stats()
+        _counter(lines, 'inventory_dashboard_cache_hits_total', 'Dashboard stats served from the cache.',
+                 {'': cache['hits']})
+        _counter(lines, 'inventory_dashboard_cache_misses_total', 'Dashboard stats rebuilt from the database.',
+                 {'': cache['misses']})
+
+        users = user_cache.stats()
+        _counter(lines, 'inventory_auth_user_cache_hits_total', 'Authenticated users resolved from the cache.',
+                 {'': users['hits']})
+        _counter(lines, 'inventory_auth_user_cache_misses_total', 'Authenticated users loaded from the database.',
+                 {'': users['misses']})
+        return '\n'.join(lines) + '\n'
+
+
+def _copy(histogram):
+    copy = _Histogram(len(histogram.counts) - 1)
+    copy.counts = list(histogram.counts)
+    copy.total = histogram.total
+    copy.observations = histogram.observations
+    return copy
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _sample(name, labels, value):
+    return f'{name}{{{labels}}} {value}' if labels else f'{name} {value}'
+
+
+def _counter(lines, name, help_text, samples):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} counter')
+    for labels, value in sorted(samples.items()):
+        lines.append(_sample(name, labels, value))
+
+
+def _histogram(lines, name, help_text, histograms, buckets):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for (route, method), histogram in sorted(histograms.items()):
+        labels = _labels(route=route, method=method)
+        cumulative = 0
+        for bound, count in zip(buckets + ('+Inf',), histogram.counts):
+            cumulative += count
+            lines.append(_sample(f'{name}_bucket', f'{labels},le="{bound}"', cumulative))
+        lines.append(_sample(f'{name}_sum', labels, histogram.total))
+        lines.append(_sample(f'{name}_count', labels, histogram.observations))
+
+
+registry = MetricsRegistry()
+
+
+def _route(request):
+    # URL names rather than patterns: router patterns are regexes
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unmatched'
+
+
+class MetricsMiddleware:
+    """Record latency, SQL count/time and response size of every request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tally = _QueryTally()
+        token = _current_queries.set(tally)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_queries.reset(token)
+        self._record(request, response, time.perf_counter() - started, tally)
+        return response
+
+    async def __acall__(self, request):
+        tally = _QueryTally()
+        token = _current_queries.set(tally)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_queries.reset(token)
+        self._record(request, response, time.perf_counter() - started, tally)
+        return response
+
+    @staticmethod
+    def _record(request, response, seconds, tally):
+        registry.observe(
+            _route(request),
+            request.method,
+            response.status_code,
+            seconds,
+            tally.count,
+            tally.seconds,
+            None if response.streaming else len(response.content),
+        )
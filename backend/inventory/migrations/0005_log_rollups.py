@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_tenant_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedInventoryLog',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('change_type', models.CharField(choices=[('Added', 'Added'), ('Removed', 'Removed'), ('Sold', 'Sold')], max_length=20)),
+                ('quantity', models.IntegerField()),
+                ('timestamp', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_logs', to='inventory.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='InventoryLogRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('added', models.IntegerField(default=0)),
+                ('removed', models.IntegerField(default=0)),
+                ('sold', models.IntegerField(default=0)),
+                ('entries', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='log_rollups', to='inventory.product')),
+            ],
+            options={
+                'unique_together': {('product', 'date')},
+            },
+        ),
+    ]
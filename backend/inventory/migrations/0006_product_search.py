@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:27
+
+import django.db.models.deletion
+import inventory.models
+from django.db import OperationalError, migrations, models, transaction
+
+FTS_TABLE = 'inventory_product_fts'
+
+CREATE_FTS = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, sku, description,
+        content='inventory_product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # name matches weigh most, then SKU, then description
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES('rank', 'bm25(10.0, 5.0, 1.0)')",
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, sku, description)
+        VALUES (new.id, new.name, new.sku, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.description);
+    END
+    """,
+    # only the indexed columns, so stock updates don't rewrite the index
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF name, sku, description ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, sku, description)
+        VALUES (new.id, new.name, new.sku, new.description);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')",
+]
+
+DROP_FTS = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def create_fts(apps, schema_editor):
+    # Other backends, and SQLite builds without FTS5, use the LIKE fallback
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute(CREATE_FTS[0])
+    except OperationalError:
+        return
+    for statement in CREATE_FTS[1:]:
+        schema_editor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_FTS:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_log_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchIndex',
+            fields=[
+                ('product', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='inventory.product')),
+                ('document', inventory.models.FullTextMatchField(db_column='inventory_product_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'inventory_product_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
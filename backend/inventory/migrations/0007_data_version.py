@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_product_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tenantstats',
+            name='data_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+FTS_TABLE = 'inventory_product_fts'
+
+# A frozen copy of the search triggers as of this migration: later changes
+# to inventory.search must not change what it does.
+FTS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, sku, description)
+        VALUES (new.id, new.name, new.sku, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF name, sku, description ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, sku, description)
+        VALUES (new.id, new.name, new.sku, new.description);
+    END
+    """,
+]
+
+
+def restore_fts_triggers(apps, schema_editor):
+    # SQLite dropped the triggers when it rebuilt inventory_product
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite' or FTS_TABLE not in connection.introspection.table_names():
+        return
+    for name in ('insert', 'delete', 'update'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{name}')
+    for statement in FTS_TRIGGERS:
+        schema_editor.execute(statement)
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+
+
+def backfill_updated_at(apps, schema_editor):
+    # existing rows were last changed when they were created, as far as we know
+    apps.get_model('inventory', 'Product').objects.update(updated_at=models.F('date_added'))
+    apps.get_model('inventory', 'Order').objects.update(updated_at=models.F('date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_data_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'product'), ('order', 'order'), ('log', 'log')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='order_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='product_user_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['user', 'kind', 'deleted_at', 'id'], name='tombstone_user_kind_idx'),
+        ),
+        # rebuilding inventory_product for updated_at dropped the search triggers
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_sales(apps, schema_editor):
+    Order = apps.get_model('inventory', 'Order')
+    Product = apps.get_model('inventory', 'Product')
+    ProductSalesDaily = apps.get_model('inventory', 'ProductSalesDaily')
+    # existing orders are valued at their product's current price
+    Order.objects.update(unit_price=models.Subquery(
+        Product.objects.filter(pk=models.OuterRef('product_id')).values('price')[:1]
+    ))
+    daily = (
+        Order.objects.annotate(day=TruncDate('date'))
+        .values('product_id', 'product__user_id', 'day')
+        .annotate(
+            units=models.Sum('quantity'),
+            revenue=models.Sum(models.F('quantity') * models.F('unit_price')),
+            orders=models.Count('id'),
+        )
+    )
+    ProductSalesDaily.objects.bulk_create(
+        [
+            ProductSalesDaily(
+                product_id=row['product_id'], user_id=row['product__user_id'], date=row['day'],
+                units=row['units'], revenue=row['revenue'], orders=row['orders'],
+            )
+            for row in daily.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_change_feed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='ProductSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('units', models.BigIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('orders', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_daily', to='inventory.product')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sales_daily', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'date'], name='sales_user_date_idx')],
+                'unique_together': {('product', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_sales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+FTS_TABLE = 'inventory_product_fts'
+
+# A frozen copy of the search triggers as of this migration: later changes
+# to inventory.search must not change what it does.
+FTS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, sku, description)
+        VALUES (new.id, new.name, new.sku, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF name, sku, description ON inventory_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, sku, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, sku, description)
+        VALUES (new.id, new.name, new.sku, new.description);
+    END
+    """,
+]
+
+
+def restore_fts_triggers(apps, schema_editor):
+    # SQLite dropped the triggers when it rebuilt inventory_product
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite' or FTS_TABLE not in connection.introspection.table_names():
+        return
+    for name in ('insert', 'delete', 'update'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{name}')
+    for statement in FTS_TRIGGERS:
+        schema_editor.execute(statement)
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
+
+
+def backfill_alerts(apps, schema_editor):
+    # no reorder points are set yet, so every product uses LOW_STOCK_THRESHOLD
+    Product = apps.get_model('inventory', 'Product')
+    StockAlert = apps.get_model('inventory', 'StockAlert')
+    low = Product.objects.filter(quantity__lt=settings.LOW_STOCK_THRESHOLD).values_list('id', 'user_id', 'quantity')
+    StockAlert.objects.bulk_create(
+        [
+            StockAlert(product_id=pk, user_id=user_id, quantity=quantity, reorder_point=settings.LOW_STOCK_THRESHOLD)
+            for pk, user_id, quantity in low.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_sales_daily'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='default_reorder_point',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reorder_point',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('reorder_point', models.IntegerField()),
+                ('opened_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stock_alert', to='inventory.product')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_alerts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'quantity'], name='stockalert_user_quantity_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_alerts, migrations.RunPython.noop),
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+    ]
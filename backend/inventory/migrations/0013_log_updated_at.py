@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_updated_at(apps, schema_editor):
+    # existing entries were last changed when they were written, as far as we know
+    apps.get_model('inventory', 'InventoryLog').objects.update(updated_at=models.F('timestamp'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_log_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorylog',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='inventorylog',
+            index=models.Index(fields=['updated_at', 'id'], name='log_updated_idx'),
+        ),
+    ]
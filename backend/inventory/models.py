@@ -1,13 +1,19 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 #Category Model (Name, User)
 class Category(models.Model):
     name = models.CharField(max_length=200)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    # reorder point of its products that don't set their own (None: LOW_STOCK_THRESHOLD)
+    default_reorder_point = models.PositiveIntegerField(null=True, blank=True)
 
     class Meta:
         unique_together = [['name', 'user']]
+        indexes = [
+            models.Index(fields=['user', 'name'], name='category_user_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -19,12 +25,26 @@ class Product(models.Model):
     quantity = models.IntegerField(default=0)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField(blank=True)
+    # stock below this opens a StockAlert; None falls back to the category default
+    reorder_point = models.PositiveIntegerField(null=True, blank=True)
     date_added = models.DateTimeField(auto_now_add=True)
+    # set on every save; QuerySet.update() callers set it themselves
+    updated_at = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     category = models.ForeignKey('Category', on_delete=models.SET_NULL, null=True, blank=True, related_name='products')
 
     class Meta:
         unique_together = [['sku', 'user']]
+        indexes = [
+            # low stock scan and stock totals
+            models.Index(fields=['user', 'quantity'], name='product_user_quantity_idx'),
+            # inventory summary ordering
+            models.Index(fields=['user', 'name'], name='product_user_name_idx'),
+            # list pagination ordering
+            models.Index(fields=['user', 'date_added', 'id'], name='product_user_added_idx'),
+            # change feed
+            models.Index(fields=['user', 'updated_at', 'id'], name='product_user_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -37,13 +57,32 @@ class Order(models.Model):
         ('Shipped', 'Shipped'),
         ('Completed', 'Completed'),
     ]
+    # statuses an order may move to, checked by the bulk transition endpoint
+    STATUS_TRANSITIONS = {
+        'Pending': ('Shipped', 'Completed'),
+        'Shipped': ('Completed',),
+        'Completed': (),
+    }
 
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.IntegerField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    # the product's price when the order was placed, for the sales totals
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # pending orders count
+            models.Index(fields=['user', 'status'], name='order_user_status_idx'),
+            # list pagination ordering
+            models.Index(fields=['user', 'date', 'id'], name='order_user_date_idx'),
+            # change feed
+            models.Index(fields=['user', 'updated_at', 'id'], name='order_user_updated_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.id} - {self.product.name}"
 
@@ -60,7 +99,222 @@ class InventoryLog(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     change_type = models.CharField(max_length=20, choices=CHANGE_TYPES)
     quantity = models.IntegerField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # a default rather than auto_now_add, so queued entries keep the time of the write
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
+    # set on every save; the change feed follows this, not timestamp
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # per product history in timestamp order
+            models.Index(fields=['product', 'timestamp', 'id'], name='log_product_timestamp_idx'),
+            # change feed
+            models.Index(fields=['updated_at', 'id'], name='log_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.change_type} {self.quantity} of {self.product.name}"
+
+# Daily stock snapshots, kept up to date whenever an InventoryLog row is written
+# so the stock chart never has to replay the full log.
+
+class StockSnapshot(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_snapshots')
+    date = models.DateField()
+    stock_level = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [['user', 'date']]
+
+    def __str__(self):
+        return f"{self.user} {self.date}: {self.stock_level}"
+
+
+class ProductStockSnapshot(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    date = models.DateField()
+    stock_level = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [['product', 'date']]
+
+    def __str__(self):
+        return f"{self.product.name} {self.date}: {self.stock_level}"
+
+
+# Units and revenue sold per product and day (the order's date), kept in
+# step by the order write paths so the sales leaderboard never reads orders.
+
+class ProductSalesDaily(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_daily')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='sales_daily')
+    date = models.DateField()
+    units = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [['product', 'date']]
+        indexes = [
+            # leaderboard window scan
+            models.Index(fields=['user', 'date'], name='sales_user_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} {self.date}: {self.units} sold"
+
+
+# A product whose stock is below its reorder point. Rows are opened, refreshed
+# and deleted by alerts.evaluate_stock_alerts from the write paths that change
+# a product's quantity or reorder point, so the dashboard reads the open
+# alerts instead of scanning the catalog.
+
+class StockAlert(models.Model):
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='stock_alert')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='stock_alerts')
+    quantity = models.IntegerField()
+    reorder_point = models.IntegerField()
+    opened_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # dashboard low stock list, emptiest first
+            models.Index(fields=['user', 'quantity'], name='stockalert_user_quantity_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name}: {self.quantity} below {self.reorder_point}"
+
+
+# Headline numbers per user, kept in step with every product/order write
+# using F() deltas so the dashboard reads them in O(1).
+
+class TenantStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='tenant_stats')
+    total_stock = models.BigIntegerField(default=0)
+    product_count = models.IntegerField(default=0)
+    pending_orders = models.IntegerField(default=0)
+    out_of_stock_count = models.IntegerField(default=0)
+    # bumped by every write to the user's data, drives ETag/Last-Modified
+    data_version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.user}"
+
+
+# Full-text index over product name, SKU and description. The FTS5 virtual
+# table and the triggers that keep it in sync are created by migration 0006 on
+# SQLite only, which is why the model is unmanaged (see inventory/search.py).
+
+class FullTextMatchField(models.TextField):
+    """The FTS5 column named after its table, used as the left side of MATCH."""
+
+
+@FullTextMatchField.register_lookup
+class FullTextMatch(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class ProductSearchIndex(models.Model):
+    product = models.OneToOneField(
+        Product, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='search_index',
+    )
+    document = FullTextMatchField(db_column='inventory_product_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'inventory_product_fts'
+
+
+# Inventory logs older than the retention window are folded into per-product
+# daily totals by the compact_inventory_logs command, which keeps the raw
+# InventoryLog table small. The raw rows are kept in ArchivedInventoryLog
+# (or a compressed file).
+
+class InventoryLogRollup(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='log_rollups')
+    date = models.DateField()
+    added = models.IntegerField(default=0)
+    removed = models.IntegerField(default=0)
+    sold = models.IntegerField(default=0)
+    entries = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [['product', 'date']]
+
+    def __str__(self):
+        return f"{self.product.name} {self.date}: +{self.added} -{self.removed} sold {self.sold}"
+
+
+class ArchivedInventoryLog(models.Model):
+    # keeps the id the row had in InventoryLog
+    id = models.BigIntegerField(primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='archived_logs')
+    change_type = models.CharField(max_length=20, choices=InventoryLog.CHANGE_TYPES)
+    quantity = models.IntegerField()
+    timestamp = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.change_type} {self.quantity} of {self.product.name} (archived)"
+
+
+# A deleted product, order or log entry, kept so the change feed can report
+# deletions. Pruned after TOMBSTONE_RETENTION_DAYS.
+class Tombstone(models.Model):
+    KINDS = [
+        ('product', 'product'),
+        ('order', 'order'),
+        ('log', 'log'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tombstones')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'kind', 'deleted_at', 'id'], name='tombstone_user_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted"
+
+
+# Secondary work queued by the write paths (see inventory/jobs.py). A job is
+# deleted once it has run; one that keeps failing is left in the dead state.
+class Job(models.Model):
+    STATES = [
+        ('queued', 'queued'),
+        ('running', 'running'),
+        ('dead', 'dead'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    state = models.CharField(max_length=20, choices=STATES, default='queued')
+    attempts = models.IntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    # lease of the worker running it; a job still running after that is claimed again
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # claim order
+            models.Index(fields=['state', 'run_after', 'id'], name='job_state_run_after_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.change_type} {self.quantity} of {self.product.name}"
\ No newline at end of file
+        return f"{self.kind} job {self.pk} ({self.state})"
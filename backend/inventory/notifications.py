@@ -0,0 +1,115 @@
+"""
+Per-user event notifications for the dashboard stream (/api/notifications/stream/).
+
+Write paths call the notify helpers inside their transaction; the event is
+handed to the broker once the transaction commits. The broker is chosen by
+NOTIFICATION_BROKER. InProcessBroker fans events out to the streams open in
+this process, which is enough for a single ASGI worker. With several workers,
+plug in a class with the same publish/subscribe/unsubscribe methods backed by
+a local broker (Redis pub/sub, PostgreSQL LISTEN/NOTIFY).
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """One open stream: a bounded queue owned by the event loop that serves it."""
+
+    def __init__(self, user_id, maxsize):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def put(self, event):
+        # runs on self.loop; a client too slow to keep up loses its oldest events
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker:
+    """Fan-out to the subscriptions of this process. Safe to publish from any thread."""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """Call from the event loop that will read the subscription."""
+        subscription = Subscription(user_id, settings.NOTIFICATION_QUEUE_SIZE)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # the loop has shut down, the stream is gone
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.NOTIFICATION_BROKER)()
+    return _broker
+
+
+def notify(user_id, event_type, data):
+    """Publish ``data`` as an ``event_type`` event to the user's streams after commit."""
+    event = {'type': event_type, 'data': data}
+    transaction.on_commit(lambda: get_broker().publish(user_id, event))
+
+
+def notify_stock(user_id, product, old_quantity):
+    """
+    Stock event for a product whose quantity went from ``old_quantity`` to
+    product.quantity. low_stock events come from alerts.evaluate_stock_alerts.
+    """
+    new_quantity = product.quantity
+    if new_quantity == old_quantity:
+        return
+    notify(user_id, 'stock', {'product': product.pk, 'name': product.name, 'quantity': new_quantity, 'previous': old_quantity})
+
+
+def notify_order(user_id, action, order, product_name):
+    notify(user_id, 'order', {
+        'action': action,
+        'id': order.pk,
+        'product': order.product_id,
+        'product_name': product_name,
+        'quantity': order.quantity,
+        'status': order.status,
+    })
@@ -0,0 +1,23 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class InventoryCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the list endpoints. Each viewset sets
+    ``cursor_ordering`` to an indexed, stable ordering ending in a unique column,
+    or defines get_cursor_ordering() when it depends on the request.
+    """
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE') or 50
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'MAX_PAGE_SIZE', 500)
+    ordering = ('-id',)
+
+    def get_ordering(self, request, queryset, view):
+        return cursor_ordering(view, self.ordering)
+
+
+def cursor_ordering(view, default=()):
+    if hasattr(view, 'get_cursor_ordering'):
+        return view.get_cursor_ordering()
+    return getattr(view, 'cursor_ordering', default)
@@ -0,0 +1,98 @@
+"""
+Read replica routing.
+
+Dashboard, reporting and list reads run inside ``replica_reads(user_id)``
+(or the read_from_replica/ReplicaReadMixin wrappers); ReplicaRouter sends
+the queries made there to REPLICA_DATABASE_ALIAS. Everything else, all
+writes included, stays on default.
+
+A replica lags the primary, so every write (counters.apply_deltas) marks
+the user as sticky for REPLICA_STICKINESS_SECONDS: until it runs out their
+reads stay on the primary and they see their own changes. The ETag of a
+conditional response is always computed on the primary, keep the window
+longer than the replica's lag or a client may cache a stale body under the
+new ETag until the next write.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_alias():
+    alias = settings.REPLICA_DATABASE_ALIAS
+    return alias if alias and alias in settings.DATABASES else None
+
+
+def sticky_key(user_id):
+    return f'replica-sticky:{user_id}'
+
+
+def stick_to_primary(user_id):
+    """Keep the user's reads on the primary for the stickiness window, counted from commit."""
+    if replica_alias() is None:
+        return
+    cache = caches[settings.DASHBOARD_CACHE_ALIAS]
+    key = sticky_key(user_id)
+    cache.set(key, True, settings.REPLICA_STICKINESS_SECONDS)
+    transaction.on_commit(lambda: cache.set(key, True, settings.REPLICA_STICKINESS_SECONDS))
+
+
+def use_replica(user_id):
+    return replica_alias() is not None and not caches[settings.DASHBOARD_CACHE_ALIAS].get(sticky_key(user_id))
+
+
+async def ause_replica(user_id):
+    return replica_alias() is not None and not await caches[settings.DASHBOARD_CACHE_ALIAS].aget(sticky_key(user_id))
+
+
+@contextmanager
+def replica_reads(user_id, use=None):
+    """Send this block's reads to the replica, unless the user wrote recently."""
+    token = _replica_reads.set(use_replica(user_id) if use is None else use)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def read_from_replica(view):
+    """Decorator for @api_view functions, applied below @conditional."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with replica_reads(request.user.pk):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """Serve a viewset's list action from the replica."""
+
+    def list(self, request, *args, **kwargs):
+        with replica_reads(request.user.pk):
+            return super().list(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get():
+            return replica_alias() or DEFAULT_DB_ALIAS
+        # not the instance's database: an object loaded from the replica
+        # must not keep pulling its relations from there
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same rows as default
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # a replica is a copy of default and gets its schema from there
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,137 @@
+"""
+Per-product daily sales totals and the sales leaderboard.
+
+The order write paths fold each change into ProductSalesDaily (units,
+revenue and order count per product and order date) inside their
+transaction, so the leaderboard only reads the product-days of its window
+however many orders there are. rebuild_sales() recomputes the table from the
+orders after a bulk load.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Order, ProductSalesDaily
+
+# window parameter -> days counted back from today, None for all time
+LEADERBOARD_WINDOWS = {
+    '7d': 7,
+    '30d': 30,
+    'all': None,
+}
+
+CENT = Decimal('0.01')
+
+
+def order_sale(order, sign=1):
+    """The (product_id, user_id, day, units, revenue, orders) line an order adds, or removes with sign=-1."""
+    return (
+        order.product_id,
+        order.user_id,
+        timezone.localdate(order.date),
+        sign * order.quantity,
+        sign * order.quantity * Decimal(order.unit_price),
+        sign,
+    )
+
+
+def record_sales(sales):
+    """Fold order_sale() lines into ProductSalesDaily."""
+    totals = defaultdict(lambda: [0, Decimal(0), 0])
+    owners = {}
+    for product_id, user_id, day, units, revenue, orders in sales:
+        total = totals[(product_id, day)]
+        total[0] += units
+        total[1] += revenue
+        total[2] += orders
+        owners[product_id] = user_id
+
+    with transaction.atomic():
+        for (product_id, day), (units, revenue, orders) in sorted(totals.items()):
+            if not (units or revenue or orders):
+                continue
+            rows = ProductSalesDaily.objects.filter(product_id=product_id, date=day)
+            changes = {'units': F('units') + units, 'revenue': F('revenue') + revenue, 'orders': F('orders') + orders}
+            if rows.update(**changes):
+                continue
+            try:
+                with transaction.atomic():
+                    ProductSalesDaily.objects.create(
+                        product_id=product_id, user_id=owners[product_id], date=day,
+                        units=units, revenue=revenue, orders=orders,
+                    )
+            except IntegrityError:
+                # Another writer created the row first
+                rows.update(**changes)
+
+
+def rebuild_sales(user_ids=None):
+    """Recompute ProductSalesDaily from the orders. Returns the number of rows written."""
+    orders = Order.objects.filter(product__user__isnull=False)
+    if user_ids is not None:
+        orders = orders.filter(product__user_id__in=user_ids)
+    daily = (
+        orders.annotate(day=TruncDate('date'))
+        .values('product_id', 'product__user_id', 'day')
+        .annotate(units=Sum('quantity'), revenue=Sum(F('quantity') * F('unit_price')), orders=Count('id'))
+    )
+    rows = [
+        ProductSalesDaily(
+            product_id=row['product_id'], user_id=row['product__user_id'], date=row['day'],
+            units=row['units'], revenue=row['revenue'], orders=row['orders'],
+        )
+        for row in daily.iterator()
+    ]
+    with transaction.atomic():
+        existing = ProductSalesDaily.objects.all()
+        if user_ids is not None:
+            existing = existing.filter(product__user_id__in=user_ids)
+        existing.delete()
+        ProductSalesDaily.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def parse_leaderboard_params(params):
+    """Return dict(window, limit) from query params; raise ValueError with a message."""
+    window = params.get('window') or '30d'
+    if window not in LEADERBOARD_WINDOWS:
+        raise ValueError(f"window must be one of {', '.join(LEADERBOARD_WINDOWS)}")
+    try:
+        limit = int(params.get('limit', settings.SALES_LEADERBOARD_DEFAULT_LIMIT))
+    except ValueError:
+        limit = 0
+    if not 0 < limit <= settings.SALES_LEADERBOARD_MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {settings.SALES_LEADERBOARD_MAX_LIMIT}')
+    return {'window': window, 'limit': limit}
+
+
+def leaderboard_rows(user, window='30d', limit=10):
+    """The user's ``limit`` best-selling products by units over the window, ties broken by revenue."""
+    rows = ProductSalesDaily.objects.filter(user=user)
+    days = LEADERBOARD_WINDOWS[window]
+    if days is not None:
+        rows = rows.filter(date__gt=timezone.localdate() - timedelta(days=days))
+    top = (
+        rows.values('product_id', 'product__name', 'product__sku')
+        .annotate(units_sold=Sum('units'), revenue=Sum('revenue'), order_count=Sum('orders'))
+        .filter(units_sold__gt=0)
+        .order_by('-units_sold', '-revenue', 'product_id')[:limit]
+    )
+    return [
+        {
+            'product': row['product_id'],
+            'name': row['product__name'],
+            'sku': row['product__sku'],
+            'units_sold': row['units_sold'],
+            # formatted like the serializers' decimal fields
+            'revenue': str(Decimal(row['revenue']).quantize(CENT)),
+            'orders': row['order_count'],
+        }
+        for row in top
+    ]
@@ -0,0 +1,67 @@
+"""
+Product search for ?search= on the product list.
+
+On SQLite the query runs against the inventory_product_fts FTS5 index
+(created by migration 0006), with prefix matching on every word and bm25
+relevance. Other databases, or SQLite builds without FTS5, fall back to
+LIKE filters ranked by where the text matched.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from .models import ProductSearchIndex
+
+SEARCH_COLUMNS = ('name', 'sku', 'description')
+_fts_tables = {}
+
+FTS_TABLE = 'inventory_product_fts'
+
+# The index is kept in step with inventory_product by triggers (see migration
+# 0006). SQLite drops a table's triggers when a migration rebuilds it (adding
+# or altering a Product field), so such migrations recreate them from their
+# own copy of the trigger SQL (see 0008).
+
+
+def fts_available(using):
+    if using not in _fts_tables:
+        connection = connections[using]
+        _fts_tables[using] = (
+            connection.vendor == 'sqlite'
+            and ProductSearchIndex._meta.db_table in connection.introspection.table_names()
+        )
+    return _fts_tables[using]
+
+
+def _terms(text):
+    # "SKU-00 blue" -> [['sku', '00'], ['blue']]; punctuation only separates tokens
+    return [tokens for tokens in (re.findall(r'\w+', word) for word in text.split()) if tokens]
+
+
+def fts_query(terms):
+    # every term must match, the last token of each as a prefix
+    return ' '.join('"{}"*'.format(' '.join(tokens)) for tokens in terms)
+
+
+def search_products(queryset, text):
+    """Filter ``queryset`` to products matching ``text``, annotated with ``search_rank`` (lower is better)."""
+    terms = _terms(text)
+    if not terms:
+        return queryset.annotate(search_rank=Value(0)).none()
+    if fts_available(queryset.db):
+        return queryset.filter(search_index__document__match=fts_query(terms)).annotate(
+            search_rank=F('search_index__rank')
+        )
+
+    words = text.split()
+    for word in words:
+        queryset = queryset.filter(Q(*(Q(**{f'{column}__icontains': word}) for column in SEARCH_COLUMNS), _connector=Q.OR))
+    return queryset.annotate(search_rank=Case(
+        When(sku__iexact=text.strip(), then=Value(0)),
+        When(sku__istartswith=words[0], then=Value(1)),
+        When(name__istartswith=words[0], then=Value(2)),
+        When(name__icontains=words[0], then=Value(3)),
+        default=Value(4),
+        output_field=IntegerField(),
+    ))
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from .models import Product, Order, InventoryLog, Category
@@ -19,6 +21,24 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         )
         return user
 
+def token_lifetimes():
+    # Seconds until the tokens expire, so clients can refresh before a 401
+    return {
+        'access_expires_in': int(jwt_settings.ACCESS_TOKEN_LIFETIME.total_seconds()),
+        'refresh_expires_in': int(jwt_settings.REFRESH_TOKEN_LIFETIME.total_seconds()),
+    }
+
+
+class TokenRefreshWithLifetimesSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        lifetimes = token_lifetimes()
+        data['access_expires_in'] = lifetimes['access_expires_in']
+        # a new refresh token is only issued when ROTATE_REFRESH_TOKENS is on
+        if 'refresh' in data:
+            data['refresh_expires_in'] = lifetimes['refresh_expires_in']
+        return data
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -81,6 +101,8 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         # include all the fields from the order model
         fields = '__all__'
+        # set from the product's price when the order is placed
+        read_only_fields = ['unit_price']
 
     def validate_quantity(self, value):
         if value is None or value <= 0:
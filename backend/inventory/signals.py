@@ -0,0 +1,21 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .models import InventoryLog
+from .snapshots import record_logs
+
+
+@receiver(post_save, sender=InventoryLog)
+def update_stock_snapshots(sender, instance, created, raw=False, **kwargs):
+    # bulk_create skips this signal, bulk writers call record_logs themselves
+    if created and not raw:
+        record_logs([instance])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # covers deactivation and password changes, both saved through the model
+    user_cache.invalidate(instance.pk)
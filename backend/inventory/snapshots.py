@@ -0,0 +1,195 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .compaction import rollup_deltas
+from .models import InventoryLog, Product, ProductStockSnapshot, StockSnapshot
+
+BUCKETS = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def log_delta(change_type, quantity):
+    # Added increases the stock, Sold and Removed decrease it
+    return quantity if change_type == 'Added' else -quantity
+
+
+def _apply_delta(model, owner, day, delta):
+    rows = model.objects.filter(**owner)
+    # Backdated entries also shift every later snapshot
+    if delta:
+        rows.filter(date__gt=day).update(stock_level=F('stock_level') + delta)
+    if rows.filter(date=day).update(stock_level=F('stock_level') + delta):
+        return
+    previous = rows.filter(date__lt=day).order_by('-date').values_list('stock_level', flat=True).first() or 0
+    try:
+        with transaction.atomic():
+            model.objects.create(date=day, stock_level=previous + delta, **owner)
+    except IntegrityError:
+        # Another writer created today's row first
+        rows.filter(date=day).update(stock_level=F('stock_level') + delta)
+
+
+def record_logs(logs):
+    """Fold newly written InventoryLog rows into the daily snapshot tables."""
+    logs = list(logs)
+    if not logs:
+        return
+    owners = {
+        log.product_id: log.product.user_id
+        for log in logs
+        if InventoryLog.product.is_cached(log)
+    }
+    missing = {log.product_id for log in logs} - owners.keys()
+    if missing:
+        owners.update(Product.objects.filter(pk__in=missing).values_list('id', 'user_id'))
+
+    user_deltas = defaultdict(int)
+    product_deltas = defaultdict(int)
+    for log in logs:
+        day = timezone.localdate(log.timestamp)
+        delta = log_delta(log.change_type, log.quantity)
+        product_deltas[(log.product_id, day)] += delta
+        user_id = owners.get(log.product_id)
+        if user_id is not None:
+            user_deltas[(user_id, day)] += delta
+
+    with transaction.atomic():
+        for (product_id, day), delta in sorted(product_deltas.items()):
+            _apply_delta(ProductStockSnapshot, {'product_id': product_id}, day, delta)
+        for (user_id, day), delta in sorted(user_deltas.items()):
+            _apply_delta(StockSnapshot, {'user_id': user_id}, day, delta)
+
+
+def reversed_log(log):
+    """An unsaved copy of ``log`` that cancels it out when passed to record_logs()."""
+    return InventoryLog(
+        product_id=log.product_id, change_type=log.change_type, quantity=-log.quantity, timestamp=log.timestamp
+    )
+
+
+def record_product_removal(product):
+    """
+    Take a product that is about to be deleted out of its owner's stock
+    snapshots, leaving them as rebuild_snapshots() would without its log.
+    """
+    if product.user_id is None:
+        return
+    # its own snapshots go with it, the owner's totals count its level as of each day
+    levels = ProductStockSnapshot.objects.filter(product=product)
+    level_then = levels.filter(date__lte=OuterRef('date')).order_by('-date').values('stock_level')[:1]
+    user_rows = StockSnapshot.objects.filter(user_id=product.user_id)
+    user_rows.filter(date__gte=Subquery(levels.order_by('date').values('date')[:1])).update(
+        stock_level=F('stock_level') - Coalesce(Subquery(level_then), 0)
+    )
+    # a day only this product's log touched has no snapshot after a rebuild
+    others = ProductStockSnapshot.objects.filter(
+        product__user_id=product.user_id, date=OuterRef('date')
+    ).exclude(product=product)
+    user_rows.filter(date__in=levels.values('date')).exclude(Exists(others)).delete()
+
+
+def rebuild_snapshots(user_ids=None):
+    """
+    Recompute the snapshot tables from the full inventory log, compacted
+    days included. Returns the number of user and product snapshot rows written.
+    """
+    logs = InventoryLog.objects.filter(product__user__isnull=False)
+    if user_ids is not None:
+        logs = logs.filter(product__user_id__in=user_ids)
+    daily = (
+        logs.annotate(day=TruncDate('timestamp'))
+        .values('product_id', 'product__user_id', 'day')
+        .annotate(
+            added=Sum('quantity', filter=Q(change_type='Added')),
+            removed=Sum('quantity', filter=~Q(change_type='Added')),
+        )
+    )
+
+    deltas = defaultdict(int)
+    for row in daily.iterator():
+        deltas[(row['day'], row['product_id'], row['product__user_id'])] += (row['added'] or 0) - (row['removed'] or 0)
+    for product_id, user_id, day, delta in rollup_deltas(user_ids):
+        deltas[(day, product_id, user_id)] += delta
+
+    user_levels = defaultdict(int)
+    product_levels = defaultdict(int)
+    user_rows = {}
+    product_rows = {}
+    for (day, product_id, user_id), delta in sorted(deltas.items()):
+        product_levels[product_id] += delta
+        user_levels[user_id] += delta
+        product_rows[(product_id, day)] = product_levels[product_id]
+        user_rows[(user_id, day)] = user_levels[user_id]
+
+    with transaction.atomic():
+        user_snapshots = StockSnapshot.objects.all()
+        product_snapshots = ProductStockSnapshot.objects.all()
+        if user_ids is not None:
+            user_snapshots = user_snapshots.filter(user_id__in=user_ids)
+            product_snapshots = product_snapshots.filter(product__user_id__in=user_ids)
+        user_snapshots.delete()
+        product_snapshots.delete()
+        StockSnapshot.objects.bulk_create(
+            [StockSnapshot(user_id=u, date=d, stock_level=level) for (u, d), level in user_rows.items()],
+            batch_size=1000,
+        )
+        ProductStockSnapshot.objects.bulk_create(
+            [ProductStockSnapshot(product_id=p, date=d, stock_level=level) for (p, d), level in product_rows.items()],
+            batch_size=1000,
+        )
+    return len(user_rows), len(product_rows)
+
+
+def _bucket_label(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def choose_bucket(start, end, max_points):
+    # Pick the finest bucket that keeps the series under max_points
+    if start is None or end is None:
+        return 'day'
+    days = (end - start).days + 1
+    if days <= max_points:
+        return 'day'
+    if days <= max_points * 7:
+        return 'week'
+    return 'month'
+
+
+def stock_series(snapshots, start=None, end=None, bucket='day'):
+    """
+    Return (dates, stock_levels) for a snapshot queryset, keeping the last
+    snapshot of each bucket so a long history collapses to a few hundred rows.
+    """
+    if start:
+        snapshots = snapshots.filter(date__gte=start)
+    if end:
+        snapshots = snapshots.filter(date__lte=end)
+    trunc = BUCKETS[bucket]
+    if trunc is not None:
+        last_days = (
+            snapshots.annotate(period=trunc('date'))
+            .values('period')
+            .annotate(last=Max('date'))
+            .values('last')
+        )
+        snapshots = snapshots.filter(date__in=Subquery(last_days))
+
+    dates = []
+    stock_levels = []
+    for day, level in snapshots.order_by('date').values_list('date', 'stock_level'):
+        dates.append(_bucket_label(day, bucket).strftime('%Y-%m-%d'))
+        stock_levels.append(level)
+    return dates, stock_levels
@@ -1,8 +1,41 @@
-from django.test import TestCase
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
+from asgiref.sync import sync_to_async
 from rest_framework import status
-from .models import Product, Order, InventoryLog
+from rest_framework_simplejwt.tokens import RefreshToken
+import asyncio
+import json
+import os
+from datetime import date, timedelta
+from io import StringIO
+from unittest.mock import patch
+import tempfile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import re
+import unittest
+from .alerts import below_reorder_point, evaluate_stock_alerts, rebuild_stock_alerts
+from .changes import record_product_deletion
+from .counters import COUNTERS, compute_stats
+from .jobs import HANDLERS, check_job_settings, claim_jobs, requeue_dead, run_jobs, work
+from .authentication import user_cache
+from .dashboard import dashboard_cache_stats
+from .metrics import registry as metrics_registry
+from .notifications import get_broker
+from .routers import ReplicaRouter, replica_reads, sticky_key
+from .sales import rebuild_sales
+from .models import (
+    Product, Order, InventoryLog, Category, StockSnapshot, ProductStockSnapshot, TenantStats,
+    InventoryLogRollup, ArchivedInventoryLog, ProductSalesDaily, StockAlert, Job, Tombstone,
+)
 
 
 class UserRegistrationTest(TestCase):
@@ -55,6 +88,22 @@ class LoginTest(TestCase):
         response = self.client.post('/api/login/', data)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_login_returns_lifetimes_and_refresh_rotates(self):
+        response = self.client.post('/api/login/', {'username': 'testuser', 'password': 'Test123'})
+        self.assertEqual(response.data['access_expires_in'], 24 * 3600)
+        self.assertEqual(response.data['refresh_expires_in'], 7 * 24 * 3600)
+
+        refreshed = self.client.post('/api/token/refresh/', {'refresh': response.data['refresh']})
+        self.assertEqual(refreshed.status_code, status.HTTP_200_OK)
+        self.assertIn('access', refreshed.data)
+        self.assertNotEqual(refreshed.data['refresh'], response.data['refresh'])
+        self.assertEqual(refreshed.data['access_expires_in'], 24 * 3600)
+
+        verified = self.client.post('/api/token/verify/', {'token': refreshed.data['access']})
+        self.assertEqual(verified.status_code, status.HTTP_200_OK)
+        invalid = self.client.post('/api/token/refresh/', {'refresh': 'not-a-token'})
+        self.assertEqual(invalid.status_code, status.HTTP_401_UNAUTHORIZED)
+
 
 class ProductTest(TestCase):
     def setUp(self):
@@ -72,7 +121,7 @@ class ProductTest(TestCase):
         )
         response = self.client.get('/api/products/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_create_product(self):
         data = {
@@ -86,6 +135,14 @@ class ProductTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Product.objects.count(), 1)
     
+    def test_failed_secondary_writes_roll_back_the_create(self):
+        data = {'name': 'Test Product', 'sku': 'TEST001', 'quantity': 10, 'price': '99.99'}
+        with patch.dict(HANDLERS, stock_alerts=lambda payloads: 1 / 0):
+            response = self.client.post('/api/products/', data)
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(InventoryLog.objects.exists())
+
     def test_update_product(self):
         product = Product.objects.create(
             name='Product 1',
@@ -101,6 +158,73 @@ class ProductTest(TestCase):
         self.assertEqual(product.quantity, 15)
 
 
+    def test_import_csv_upload(self):
+        Product.objects.create(name='Existing', sku='SKU001', quantity=1, price=1, user=self.user)
+        csv_data = (
+            'name,sku,quantity,price,description,category\n'
+            'Widget,W-1,5,2.50,Small widget,Tools\n'
+            'Gadget,G-1,,3.00,,Tools\n'
+            'Dupe,SKU001,1,1.00,,\n'
+            'Broken,B-1,-2,abc,,\n'
+        ).encode()
+        upload = SimpleUploadedFile('catalog.csv', csv_data, content_type='text/csv')
+        response = self.client.post('/api/products/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['failed'], 2)
+        self.assertEqual([e['line'] for e in response.data['errors']], [4, 5])
+
+        widget = Product.objects.get(user=self.user, sku='W-1')
+        self.assertEqual(widget.category.name, 'Tools')
+        self.assertEqual(Category.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(Product.objects.get(user=self.user, sku='G-1').quantity, 0)
+        self.assertTrue(InventoryLog.objects.filter(product=widget, change_type='Added', quantity=5).exists())
+
+    def test_import_reports_undecodable_lines(self):
+        csv_data = (
+            'name,sku,quantity,price\n'
+            'Café,C-1,1,1.00\n'
+            'Plain,P-1,1,1.00\n'
+            'Nul\0,N-1,1,1.00\n'
+        ).encode('latin-1')
+        upload = SimpleUploadedFile('catalog.csv', csv_data, content_type='text/csv')
+        response = self.client.post('/api/products/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 2))
+        self.assertEqual([e['line'] for e in response.data['errors']], [2, 4])
+
+        upload = SimpleUploadedFile('catalog.csv', 'nàme,sku\n'.encode('latin-1'), content_type='text/csv')
+        response = self.client.post('/api/products/import/', {'file': upload}, format='multipart')
+        self.assertEqual([e['line'] for e in response.data['errors']], [1])
+        body = '{"name": "Café", "sku": "C-2", "price": 1}\n'.encode('latin-1')
+        response = self.client.generic('POST', '/api/products/import/', body, content_type='application/x-ndjson')
+        self.assertEqual((response.data['created'], response.data['failed']), (0, 1))
+
+    def test_import_ndjson_upsert(self):
+        product = Product.objects.create(name='Old', sku='SKU001', quantity=10, price=1, user=self.user)
+        body = (
+            '{"name": "New name", "sku": "SKU001", "quantity": 4, "price": "2.00"}\n'
+            '{"name": "Fresh", "sku": "SKU002", "quantity": 3, "price": 1.5}\n'
+            'not json\n'
+        )
+        response = self.client.generic(
+            'POST', '/api/products/import/?upsert=true', body, content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['failed']), (1, 1, 1))
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.quantity), ('New name', 4))
+        self.assertTrue(InventoryLog.objects.filter(product=product, change_type='Removed', quantity=6).exists())
+
+    def test_import_products_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write('name,sku,quantity,price\nA,A-1,1,1.00\nB,B-1,2,2.00\nA again,A-1,3,1.00\n')
+        out = StringIO()
+        call_command('import_products', handle.name, user='testuser', upsert=True, chunk_size=10, stdout=out)
+        os.unlink(handle.name)
+        self.assertIn('Created 2, updated 1, failed 0', out.getvalue())
+        self.assertEqual(Product.objects.get(user=self.user, sku='A-1').quantity, 3)
+
 
 class OrderTest(TestCase):
     def setUp(self):
@@ -126,6 +250,76 @@ class OrderTest(TestCase):
         self.assertEqual(self.product.quantity, 5)
 
     
+    def test_list_orders_paginates_by_cursor(self):
+        for _ in range(3):
+            Order.objects.create(product=self.product, quantity=1, user=self.user)
+
+        response = self.client.get('/api/orders/?page_size=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+    def test_update_order_moves_stock(self):
+        order = Order.objects.create(product=self.product, quantity=2, user=self.user)
+        self.product.quantity = 8
+        self.product.save()
+
+        response = self.client.patch(f'/api/orders/{order.id}/', {'quantity': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 5)
+
+        response = self.client.patch(f'/api/orders/{order.id}/', {'quantity': 11})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.product.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual(self.product.quantity, 5)
+        self.assertEqual(order.quantity, 5)
+
+    def test_bulk_create_orders(self):
+        other = Product.objects.create(name='Other', sku='SKU002', quantity=1, price=5.00, user=self.user)
+        data = {'orders': [
+            {'product': self.product.id, 'quantity': 4},
+            {'product': other.id, 'quantity': 2},
+            {'product': self.product.id, 'quantity': 6, 'status': 'Shipped'},
+            {'product': 999999, 'quantity': 1},
+            {'product': self.product.id, 'quantity': 1},
+        ]}
+        response = self.client.post('/api/orders/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['failed'], 3)
+        self.assertEqual(
+            [r['success'] for r in response.data['results']],
+            [True, False, True, False, False]
+        )
+        self.assertEqual(response.data['results'][2]['order']['status'], 'Shipped')
+        self.assertIn('quantity', response.data['results'][1]['errors'])
+        self.assertIn('product', response.data['results'][3]['errors'])
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 0)
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(InventoryLog.objects.filter(product=self.product, change_type='Sold').count(), 2)
+
+    def test_bulk_order_lines_with_wrong_types(self):
+        data = {'orders': [
+            {'product': self.product.id, 'quantity': 1, 'status': ['Pending']},
+            {'product': [self.product.id], 'quantity': 1},
+            {'product': {'id': self.product.id}, 'quantity': 1, 'status': {'a': 1}},
+            {'product': True, 'quantity': 1},
+            {'product': str(self.product.id), 'quantity': 1},
+        ]}
+        response = self.client.post('/api/orders/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r['success'] for r in response.data['results']], [False, False, False, False, True])
+        self.assertIn('status', response.data['results'][0]['errors'])
+        self.assertEqual(set(response.data['results'][2]['errors']), {'product', 'status'})
+
     def test_create_order_insufficient_stock(self):
         data = {
             'product': self.product.id,
@@ -136,8 +330,54 @@ class OrderTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
         
+class OrderTransitionTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='shipuser', password='Test123')
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(name='P1', sku='S1', quantity=100, price=10.0, user=self.user)
+        self.orders = [
+            Order.objects.create(product=self.product, quantity=1, status=order_status, user=self.user)
+            for order_status in ('Pending', 'Pending', 'Pending', 'Shipped')
+        ]
+
+    def transition(self, ids, from_status, to_status):
+        return self.client.post('/api/orders/transition/', {'ids': ids, 'from_status': from_status, 'status': to_status}, format='json')
+
+    def test_moves_matching_orders_in_one_update(self):
+        other = User.objects.create_user(username='shipother', password='Test123')
+        foreign = Order.objects.create(product=self.product, quantity=1, status='Pending', user=other)
+        ids = [order.id for order in self.orders] + [foreign.id]
+        with CaptureQueriesContext(connection) as queries:
+            res = self.transition(ids, 'Pending', 'Shipped')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['updated'], [order.id for order in self.orders[:3]])
+        self.assertEqual(res.data['skipped'], [self.orders[3].id, foreign.id])
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "inventory_order"') for query in queries), 1)
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.status, 'Pending')
+        self.assertEqual(TenantStats.objects.get(user=self.user).pending_orders, 0)
+
+        # already moved, so nothing changes the second time
+        res = self.transition(ids, 'Pending', 'Shipped')
+        self.assertEqual(res.data['updated'], [])
+
+    def test_rejects_invalid_transitions(self):
+        res = self.transition([self.orders[3].id], 'Shipped', 'Pending')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['error'], 'Shipped orders can only move to Completed')
+        self.assertEqual(self.transition([], 'Pending', 'Shipped').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.transition(['x'], 'Pending', 'Shipped').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.transition([1], 'Lost', 'Shipped').status_code, status.HTTP_400_BAD_REQUEST)
+        for from_status, to_status in [(['Pending'], 'Shipped'), ('Pending', ['Shipped']), ({'a': 1}, None)]:
+            res = self.transition([self.orders[0].id], from_status, to_status)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('must be one of', res.data['error'])
+
+
 class DashboardEndpointsTest(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = User.objects.create_user(username='dashuser', password='Test123')
         self.client.force_authenticate(user=self.user)
@@ -160,6 +400,759 @@ class DashboardEndpointsTest(TestCase):
         self.assertIn('dates', res.data)
         self.assertIn('stock_levels', res.data)
 
+    def test_export_inventory_summary_csv(self):
+        Product.objects.create(name='P0', sku='S0', quantity=0, price=1.0, user=self.user)
+        res = self.client.get('/api/dashboard/inventory-summary/export/')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        body = b''.join(res.streaming_content).decode()
+        self.assertEqual(body.splitlines(), [
+            'product_name,sku,in_stock,out_stock',
+            'P0,S0,0,Out of Stock',
+            'P1,S1,5,',
+        ])
+
+    def test_export_orders_and_logs_ndjson(self):
+        Order.objects.create(product=self.product, quantity=2, user=self.user)
+        res = self.client.get('/api/orders/export/?file_format=ndjson')
+        rows = [json.loads(line) for line in b''.join(res.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]['product_sku'], rows[0]['quantity'], rows[0]['status']), ('S1', 2, 'Pending'))
+
+        res = self.client.get('/api/inventory/export/?file_format=ndjson')
+        rows = [json.loads(line) for line in b''.join(res.streaming_content).decode().splitlines()]
+        self.assertEqual([(r['change_type'], r['quantity']) for r in rows], [('Added', 5)])
+
+    def test_export_rejects_unknown_format(self):
+        res = self.client.get('/api/orders/export/?file_format=xml')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get('/api/inventory/export/?product=abc')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SalesLeaderboardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='salesuser', password='Test123')
+        self.client.force_authenticate(user=self.user)
+        self.p1 = Product.objects.create(name='P1', sku='S1', quantity=100, price='2.50', user=self.user)
+        self.p2 = Product.objects.create(name='P2', sku='S2', quantity=100, price='10.00', user=self.user)
+
+    def order(self, product, quantity):
+        res = self.client.post('/api/orders/', {'product': product.id, 'quantity': quantity, 'status': 'Pending'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data['id']
+
+    def totals(self):
+        return sorted(ProductSalesDaily.objects.values_list('product_id', 'date', 'units', 'revenue', 'orders'))
+
+    def test_order_writes_keep_the_totals_in_step(self):
+        first = self.order(self.p1, 4)
+        second = self.order(self.p2, 1)
+        self.order(self.p2, 2)
+        self.client.patch(f'/api/orders/{first}/', {'quantity': 6})
+        # the product's price changes, the order keeps the one it was placed at
+        Product.objects.filter(pk=self.p2.pk).update(price='99.00')
+        self.client.delete(f'/api/orders/{second}/')
+        self.client.post('/api/orders/bulk/', {'orders': [{'product': self.p1.id, 'quantity': 1}]}, format='json')
+
+        res = self.client.get('/api/dashboard/leaderboard/')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([(r['name'], r['units_sold'], r['revenue'], r['orders']) for r in res.data], [
+            ('P1', 7, '17.50', 2),
+            ('P2', 2, '20.00', 1),
+        ])
+        self.assertEqual(self.client.get('/api/dashboard/leaderboard/?limit=1').data[0]['sku'], 'S1')
+        self.assertEqual(self.client.get('/api/dashboard/stats/').data['top_selling_products'], [
+            {'product': 'P1', 'units_sold': 7},
+            {'product': 'P2', 'units_sold': 2},
+        ])
+
+        # moving an order to another product moves its sales, at the new product's price
+        self.client.patch(f'/api/orders/{first}/', {'product': self.p2.id})
+        res = self.client.get('/api/dashboard/leaderboard/')
+        self.assertEqual([(r['name'], r['units_sold'], r['revenue']) for r in res.data], [
+            ('P2', 8, '614.00'),
+            ('P1', 1, '2.50'),
+        ])
+
+        incremental = self.totals()
+        self.assertEqual(rebuild_sales([self.user.pk]), len(incremental))
+        self.assertEqual(self.totals(), incremental)
+
+    def test_windows(self):
+        self.order(self.p1, 1)
+        today = ProductSalesDaily.objects.get().date
+        ProductSalesDaily.objects.create(
+            product=self.p2, user=self.user, date=today - timedelta(days=10), units=5, revenue='50.00', orders=1,
+        )
+        windows = {}
+        for window in ['7d', '30d', 'all']:
+            res = self.client.get(f'/api/dashboard/leaderboard/?window={window}')
+            windows[window] = [r['name'] for r in res.data]
+        self.assertEqual(windows, {'7d': ['P1'], '30d': ['P2', 'P1'], 'all': ['P2', 'P1']})
+
+        for query in ['window=1y', 'limit=0', 'limit=abc', 'limit=101']:
+            res = self.client.get(f'/api/dashboard/leaderboard/?{query}')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, query)
+            self.assertIn('error', res.data)
+
+
+class StockAlertTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='alertuser', password='Test123')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Bulk', user=self.user, default_reorder_point=50)
+
+    def create(self, **data):
+        res = self.client.post('/api/products/', {'price': '1.00', **data})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return Product.objects.get(pk=res.data['id'])
+
+    def alerts(self):
+        return {name: (stock, point) for name, stock, point in
+                StockAlert.objects.values_list('product__name', 'quantity', 'reorder_point')}
+
+    def low_stock(self):
+        return self.client.get('/api/dashboard/stats/').data['low_stock_products']
+
+    def test_reorder_points_resolve_product_then_category_then_setting(self):
+        self.create(name='Plain', sku='A', quantity=9)
+        self.create(name='Own', sku='B', quantity=9, reorder_point=5)
+        self.create(name='Inherits', sku='C', quantity=40, category=self.category.id)
+        self.create(name='Overrides', sku='D', quantity=40, category=self.category.id, reorder_point=20)
+        self.assertEqual(self.alerts(), {'Plain': (9, 10), 'Inherits': (40, 50)})
+        self.assertEqual(
+            sorted(below_reorder_point(Product.objects.filter(user=self.user)).values_list('name', flat=True)),
+            ['Inherits', 'Plain'],
+        )
+        self.assertEqual(self.low_stock(), [
+            {'name': 'Plain', 'stock': 9, 'reorder_point': 10},
+            {'name': 'Inherits', 'stock': 40, 'reorder_point': 50},
+        ])
+
+        # changing the category default re-checks its products
+        self.client.patch(f'/api/categories/{self.category.id}/', {'default_reorder_point': 30})
+        self.assertEqual(self.alerts(), {'Plain': (9, 10)})
+        self.client.delete(f'/api/categories/{self.category.id}/')
+        self.assertEqual(self.alerts(), {'Plain': (9, 10)})
+
+    def test_stock_writes_open_refresh_and_close_alerts(self):
+        product = self.create(name='P1', sku='S1', quantity=12)
+        self.assertEqual(self.alerts(), {})
+        res = self.client.post('/api/orders/', {'product': product.id, 'quantity': 4, 'status': 'Pending'})
+        opened_at = StockAlert.objects.get().opened_at
+        self.assertEqual(self.alerts(), {'P1': (8, 10)})
+        self.client.patch(f'/api/orders/{res.data["id"]}/', {'quantity': 5})
+        self.assertEqual(self.alerts(), {'P1': (7, 10)})
+        self.assertEqual(StockAlert.objects.get().opened_at, opened_at)
+        self.client.post('/api/orders/bulk/', {'orders': [{'product': product.id, 'quantity': 1}]}, format='json')
+        self.assertEqual(self.alerts(), {'P1': (6, 10)})
+
+        # the deleted order's 5 units come back: 11 is above the reorder point again
+        self.client.delete(f'/api/orders/{res.data["id"]}/')
+        self.assertEqual(self.alerts(), {})
+        self.client.patch(f'/api/products/{product.id}/', {'reorder_point': 20})
+        self.assertEqual(self.alerts(), {'P1': (11, 20)})
+        self.client.delete(f'/api/products/{product.id}/')
+        self.assertEqual(self.alerts(), {})
+
+    def test_dashboard_reads_alerts_without_scanning_products(self):
+        for n in range(5):
+            self.create(name=f'P{n}', sku=f'S{n}', quantity=n * 5)
+        self.low_stock()
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual([row['name'] for row in self.low_stock()], ['P0', 'P1'])
+        self.assertFalse([q for q in queries.captured_queries if 'FROM "inventory_product"' in q['sql']])
+
+        # rows written behind the write paths' back are picked up by a rebuild
+        Product.objects.filter(name='P4').update(quantity=1)
+        self.assertEqual(rebuild_stock_alerts([self.user.pk]), 3)
+
+
+# TransactionTestCase: the async views query from worker threads with their own
+# connections, which can't see data inside TestCase's wrapping transaction
+class AsyncDashboardTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='asyncuser', password='Test123')
+        product = Product.objects.create(name='P1', sku='S1', quantity=5, price=10.0, user=self.user)
+        InventoryLog.objects.create(product=product, change_type='Added', quantity=5)
+        # the API write paths do this for their products
+        evaluate_stock_alerts([product.pk])
+        token = RefreshToken.for_user(self.user).access_token
+        self.client = AsyncClient()
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    async def test_async_dashboard_matches_sync(self):
+        res = await self.client.get('/api/dashboard/async/stats/', headers=self.headers)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {
+            'total_stock': 5,
+            'total_products': 1,
+            'low_stock_products': [{'name': 'P1', 'stock': 5, 'reorder_point': 10}],
+            'top_selling_products': [],
+            'pending_orders_count': 0,
+            'out_of_stock_count': 0,
+        })
+
+        res = await self.client.get('/api/dashboard/async/inventory-summary/', headers=self.headers)
+        self.assertEqual(res.json(), [{'product_name': 'P1', 'sku': 'S1', 'in_stock': 5, 'out_stock': ''}])
+
+        res = await self.client.get('/api/dashboard/async/stock-chart/', headers=self.headers)
+        self.assertEqual(res.json()['stock_levels'], [5])
+        res = await self.client.get('/api/dashboard/async/stock-chart/?bucket=year', headers=self.headers)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_async_dashboard_requires_authentication(self):
+        res = await AsyncClient().get('/api/dashboard/async/stats/')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        res = await AsyncClient().get('/api/dashboard/async/stats/', headers={'Authorization': 'Bearer nope'})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class NotificationStreamTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sseuser', password='Test123')
+        self.product = Product.objects.create(name='P1', sku='S1', quantity=12, price=10.0, user=self.user)
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.user)
+
+    def ticket(self):
+        res = self.api.post('/api/notifications/ticket/')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data['ticket']
+
+    async def test_stream_pushes_committed_writes(self):
+        ticket = await sync_to_async(self.ticket)()
+        res = await AsyncClient().get(f'/api/notifications/stream/?ticket={ticket}')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/event-stream')
+        stream = aiter(res.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+
+        await sync_to_async(self.api.post)('/api/orders/', {'product': self.product.id, 'quantity': 5, 'status': 'Pending'})
+        events = [(await asyncio.wait_for(anext(stream), 5)).decode() for _ in range(3)]
+        self.assertEqual([event.split('\n')[0] for event in events], ['event: stock', 'event: low_stock', 'event: order'])
+        stock = json.loads(events[0].split('\n')[1].removeprefix('data: '))
+        self.assertEqual(stock, {'product': self.product.id, 'name': 'P1', 'quantity': 7, 'previous': 12})
+
+        # a disconnect cancels the task serving the stream
+        reader = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        reader.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await reader
+        self.assertEqual(get_broker().subscriber_count(), 0)
+
+    async def test_stream_requires_a_valid_ticket(self):
+        res = await AsyncClient().get('/api/notifications/stream/')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        res = await AsyncClient().get('/api/notifications/stream/?ticket=nope')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        # the access token is not accepted in the URL
+        res = await AsyncClient().get(f'/api/notifications/stream/?token={self.token}')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        res = await AsyncClient().get(f'/api/notifications/stream/?ticket={self.token}')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        ticket = await sync_to_async(self.ticket)()
+        with override_settings(STREAM_TICKET_SECONDS=-1):
+            res = await AsyncClient().get(f'/api/notifications/stream/?ticket={ticket}')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        res = await sync_to_async(APIClient().post)('/api/notifications/ticket/')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stream_is_refused_under_wsgi(self):
+        # runserver and other WSGI servers would buffer the endless stream
+        res = APIClient().get(f'/api/notifications/stream/?ticket={self.ticket()}')
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(get_broker().subscriber_count(), 0)
+
+
+# TransactionTestCase: in tests the replica alias is a second connection to the
+# default test database, it only sees committed rows
+@override_settings(REPLICA_DATABASE_ALIAS='replica')
+class ReplicaRoutingTest(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='replicauser', password='Test123')
+        self.product = Product.objects.create(name='P1', sku='S1', quantity=12, price=10.0, user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def replica_queries(self, url):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, url)
+        return len(replica.captured_queries)
+
+    def test_reporting_and_list_reads_use_the_replica(self):
+        for url in ['/api/products/', '/api/orders/', '/api/categories/', '/api/inventory/',
+                    '/api/dashboard/stats/', '/api/dashboard/inventory-summary/', '/api/dashboard/stock-chart/']:
+            self.assertGreater(self.replica_queries(url), 0, url)
+        # detail reads, the change feed and writes stay on the primary
+        self.assertEqual(self.replica_queries(f'/api/products/{self.product.id}/'), 0)
+        self.assertEqual(self.replica_queries('/api/products/changes/'), 0)
+
+    def test_writes_keep_the_user_on_the_primary(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            res = self.client.post('/api/orders/', {'product': self.product.id, 'quantity': 5, 'status': 'Pending'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(replica.captured_queries), 0)
+        self.assertTrue(cache.get(sticky_key(self.user.pk)))
+
+        self.assertEqual(self.replica_queries('/api/orders/'), 0)
+        self.assertEqual(self.replica_queries('/api/dashboard/stats/'), 0)
+        # other users are not affected
+        other = User.objects.create_user(username='replicaother', password='Test123')
+        self.client.force_authenticate(user=other)
+        self.assertGreater(self.replica_queries('/api/orders/'), 0)
+
+        # once the window runs out the user reads from the replica again
+        self.client.force_authenticate(user=self.user)
+        cache.delete(sticky_key(self.user.pk))
+        self.assertGreater(self.replica_queries('/api/orders/'), 0)
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Product), 'default')
+        with replica_reads(self.user.pk):
+            self.assertEqual(router.db_for_read(Product), 'replica')
+            self.assertEqual(router.db_for_write(Product), 'default')
+        with override_settings(REPLICA_DATABASE_ALIAS=None), replica_reads(self.user.pk):
+            self.assertEqual(router.db_for_read(Product), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'inventory'))
+
+
+# TransactionTestCase: the worker threads use their own connections
+@override_settings(JOBS_EAGER=False, JOB_MAX_ATTEMPTS=2, JOB_RETRY_BACKOFF_SECONDS=0)
+class JobQueueTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='jobuser', password='Test123')
+        self.product = Product.objects.create(name='P1', sku='S1', quantity=12, price=10.0, user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def data_version(self):
+        return TenantStats.objects.get(user=self.user).data_version
+
+    def test_order_writes_are_queued_and_applied_by_the_worker(self):
+        res = self.client.post('/api/orders/', {'product': self.product.id, 'quantity': 5, 'status': 'Pending'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        # the stock moved in the request, the secondary writes are queued
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 7)
+        self.assertEqual(sorted(Job.objects.values_list('kind', flat=True)), ['inventory_logs', 'sales', 'stock_alerts'])
+        self.assertFalse(InventoryLog.objects.filter(change_type='Sold').exists())
+        self.assertFalse(ProductSalesDaily.objects.exists())
+        self.assertFalse(StockAlert.objects.exists())
+        posted = timezone.now()
+        with override_settings(CHANGE_FEED_SETTLE_SECONDS=0):
+            cursor = self.client.get('/api/inventory/changes/').data['cursor']
+
+        version = self.data_version()
+        out = StringIO()
+        # one thread: writers on the in-memory test database don't wait for each other's locks
+        call_command('run_jobs', '--once', '--threads', '1', stdout=out)
+        self.assertIn('3 jobs done, 0 failed', out.getvalue())
+        self.assertFalse(Job.objects.exists())
+        sold = InventoryLog.objects.get(change_type='Sold')
+        self.assertEqual(sold.quantity, 5)
+        # the time of the request, but written after the cursor was handed out
+        self.assertLess(sold.timestamp, posted)
+        self.assertGreater(sold.updated_at, posted)
+        with override_settings(CHANGE_FEED_SETTLE_SECONDS=0):
+            feed = self.client.get('/api/inventory/changes/', {'since': cursor}).data
+        self.assertEqual([row['id'] for row in feed['results']], [sold.id])
+        self.assertEqual(ProductSalesDaily.objects.get(product=self.product).units, 5)
+        self.assertEqual(StockAlert.objects.get(product=self.product).quantity, 7)
+        self.assertGreater(self.data_version(), version)
+
+    def test_jobs_of_a_kind_run_as_one_batch(self):
+        for _ in range(3):
+            self.client.post('/api/orders/', {'product': self.product.id, 'quantity': 1, 'status': 'Pending'})
+        calls = []
+        with patch.dict(HANDLERS, sales=lambda payloads: calls.append(len(payloads))):
+            totals = work(once=True)
+        self.assertEqual(totals['done'], 9)
+        self.assertEqual(calls, [3])
+
+    def test_failing_jobs_are_retried_then_dead_lettered(self):
+        self.client.post('/api/orders/', {'product': self.product.id, 'quantity': 1, 'status': 'Pending'})
+        self.client.post('/api/orders/', {'product': self.product.id, 'quantity': 2, 'status': 'Pending'})
+
+        def write_sales(payloads):
+            if any(row[3] == 2 for payload in payloads for row in payload['sales']):
+                raise ValueError('bad payload')
+            HANDLERS_BEFORE['sales'](payloads)
+
+        HANDLERS_BEFORE = dict(HANDLERS)
+        with patch.dict(HANDLERS, sales=write_sales):
+            # the bad job doesn't hold back the rest of its batch
+            self.assertEqual(run_jobs(claim_jobs(100)), {'done': 5, 'failed': 1})
+            job = Job.objects.get()
+            self.assertEqual((job.state, job.attempts), ('queued', 1))
+            self.assertIn('bad payload', job.last_error)
+
+            self.assertEqual(run_jobs(claim_jobs(100)), {'failed': 1})
+            self.assertEqual(Job.objects.get().state, 'dead')
+            self.assertEqual(claim_jobs(100), [])
+        self.assertEqual(ProductSalesDaily.objects.get().units, 1)
+
+        self.assertEqual(requeue_dead(), 1)
+        self.assertEqual(work(once=True)['done'], 1)
+        self.assertEqual(ProductSalesDaily.objects.get().units, 3)
+
+    def test_queued_jobs_need_a_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            check_job_settings()
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            check_job_settings()
+        with override_settings(JOBS_EAGER=True):
+            check_job_settings()
+
+    def test_backoff_and_expired_leases(self):
+        self.client.post('/api/orders/', {'product': self.product.id, 'quantity': 1, 'status': 'Pending'})
+        with override_settings(JOB_RETRY_BACKOFF_SECONDS=60), patch.dict(HANDLERS, sales=lambda payloads: 1 / 0):
+            run_jobs(claim_jobs(100))
+        self.assertEqual(claim_jobs(100), [])
+        job = Job.objects.get()
+        self.assertGreater(job.run_after, job.created_at + timedelta(seconds=59))
+
+        # a job leased by a worker that died is claimed again once the lease runs out
+        Job.objects.update(run_after=job.created_at)
+        (job,) = claim_jobs(100)
+        self.assertEqual(claim_jobs(100), [])
+        later = job.locked_until + timedelta(seconds=1)
+        (again,) = claim_jobs(100, now=later)
+        self.assertEqual(again.attempts, 3)
+        # the first worker lost the job, so it is applied once
+        self.assertEqual(run_jobs([job]), {})
+        self.assertEqual(run_jobs([again]), {'done': 1})
+        self.assertEqual(ProductSalesDaily.objects.get().units, 1)
+
+
+class DashboardCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='cacheuser', password='Test123')
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(name='P1', sku='S1', quantity=5, price=10.0, user=self.user)
+
+    def test_repeated_loads_skip_the_database(self):
+        before = dashboard_cache_stats()
+        self.client.get('/api/dashboard/stats/')
+        # only the data version lookup
+        with self.assertNumQueries(1):
+            res = self.client.get('/api/dashboard/stats/')
+        self.assertEqual(res.data['total_stock'], 5)
+        after = dashboard_cache_stats()
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+
+    def test_writes_invalidate_the_cache(self):
+        self.client.get('/api/dashboard/stats/')
+        self.client.post('/api/orders/', {'product': self.product.id, 'quantity': 2, 'status': 'Pending'})
+        res = self.client.get('/api/dashboard/stats/')
+        self.assertEqual(res.data['total_stock'], 3)
+        self.assertEqual(res.data['pending_orders_count'], 1)
+
+        self.client.patch(f'/api/products/{self.product.id}/', {'quantity': 20})
+        res = self.client.get('/api/dashboard/stats/')
+        self.assertEqual(res.data['total_stock'], 20)
+
+
+class TenantStatsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='statsuser', password='Test123')
+        self.client.force_authenticate(user=self.user)
+
+    def stored(self):
+        stats = TenantStats.objects.get(user=self.user)
+        return {name: getattr(stats, name) for name in COUNTERS}
+
+    def test_counters_follow_writes(self):
+        p1 = self.client.post('/api/products/', {'name': 'P1', 'sku': 'S1', 'quantity': 5, 'price': '1.00'}).data['id']
+        p2 = self.client.post('/api/products/', {'name': 'P2', 'sku': 'S2', 'quantity': 0, 'price': '1.00'}).data['id']
+        order = self.client.post('/api/orders/', {'product': p1, 'quantity': 5, 'status': 'Pending'}).data['id']
+        self.client.patch(f'/api/products/{p2}/', {'quantity': 3})
+        self.client.patch(f'/api/orders/{order}/', {'quantity': 2, 'status': 'Pending'})
+        self.client.post('/api/orders/bulk/', {'orders': [{'product': p2, 'quantity': 3, 'status': 'Shipped'}]}, format='json')
+        self.assertEqual(self.stored(), {'total_stock': 3, 'product_count': 2, 'pending_orders': 1, 'out_of_stock_count': 1})
+        self.assertEqual(self.stored(), compute_stats([self.user.id])[self.user.id])
+
+        self.client.delete(f'/api/orders/{order}/')
+        self.client.delete(f'/api/products/{p2}/')
+        self.assertEqual(self.stored(), {'total_stock': 5, 'product_count': 1, 'pending_orders': 0, 'out_of_stock_count': 0})
+
+    def test_rebuild_and_verify_command(self):
+        Product.objects.create(name='P1', sku='S1', quantity=4, price=1, user=self.user)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_tenant_stats', verify=True, stdout=StringIO(), stderr=StringIO())
+        call_command('rebuild_tenant_stats', stdout=StringIO())
+        self.assertEqual(self.stored()['total_stock'], 4)
+        call_command('rebuild_tenant_stats', verify=True, stdout=StringIO())
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='etaguser', password='Test123')
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(name='P1', sku='S1', quantity=5, price=10.0, user=self.user)
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_data_answers_304_after_the_version_lookup(self):
+        for url in ['/api/products/', f'/api/products/{self.product.id}/', '/api/orders/',
+                    '/api/categories/', '/api/dashboard/stats/', '/api/dashboard/stock-chart/']:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK, url)
+            self.assertTrue(res['ETag'].startswith('W/"'), url)
+            self.assertIn('Last-Modified', res)
+            with self.assertNumQueries(1):
+                res = self.revalidate(url, res['ETag'])
+            self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED, url)
+        # each URL has its own tag
+        first = self.client.get('/api/products/')['ETag']
+        self.assertNotEqual(first, self.client.get('/api/products/?category=1')['ETag'])
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get('/api/products/')['ETag']
+        self.client.patch(f'/api/products/{self.product.id}/', {'name': 'Renamed'})
+        res = self.revalidate('/api/products/', etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['name'], 'Renamed')
+
+        etag = res['ETag']
+        self.client.post('/api/categories/', {'name': 'Tools'})
+        self.assertEqual(self.revalidate('/api/products/', etag).status_code, status.HTTP_200_OK)
+
+        etag = self.client.get('/api/dashboard/stats/')['ETag']
+        self.client.post('/api/orders/', {'product': self.product.id, 'quantity': 2, 'status': 'Pending'})
+        res = self.revalidate('/api/dashboard/stats/', etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['total_stock'], 3)
+
+    def test_writes_from_another_process_change_the_etag(self):
+        etag = self.client.get('/api/products/')['ETag']
+        # as if another worker committed a write: nothing in this process's cache changes
+        TenantStats.objects.filter(user=self.user).update(data_version=F('data_version') + 1)
+        self.assertEqual(self.revalidate('/api/products/', etag).status_code, status.HTTP_200_OK)
+
+    def test_other_users_writes_keep_the_etag(self):
+        other = User.objects.create_user(username='etagother', password='Test123')
+        etag = self.client.get('/api/products/')['ETag']
+        client = APIClient()
+        client.force_authenticate(user=other)
+        client.post('/api/categories/', {'name': 'Tools'})
+        self.assertEqual(self.revalidate('/api/products/', etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(VERSIONED_RESPONSE_CACHE_TIMEOUT=60)
+    def test_response_cache_is_keyed_by_version(self):
+        first = self.client.get('/api/dashboard/inventory-summary/')
+        with self.assertNumQueries(1):
+            res = self.client.get('/api/dashboard/inventory-summary/')
+        self.assertEqual(res.data, first.data)
+        self.client.patch(f'/api/products/{self.product.id}/', {'quantity': 8})
+        self.assertEqual(self.client.get('/api/dashboard/inventory-summary/').data[0]['in_stock'], 8)
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class ChangeFeedTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='feeduser', password='Test123')
+        self.client.force_authenticate(user=self.user)
+        self.p1 = self.client.post('/api/products/', {'name': 'P1', 'sku': 'S1', 'quantity': 5, 'price': '1.00'}).data['id']
+        self.p2 = self.client.post('/api/products/', {'name': 'P2', 'sku': 'S2', 'quantity': 5, 'price': '1.00'}).data['id']
+
+    def changes(self, collection, since=None, **params):
+        if since:
+            params['since'] = since
+        res = self.client.get(f'/api/{collection}/changes/', params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        return res.data
+
+    def test_feed_returns_changes_and_deletions_since_cursor(self):
+        feed = self.changes('products')
+        self.assertEqual([row['id'] for row in feed['results']], [self.p1, self.p2])
+        self.assertFalse(feed['has_more'])
+        cursor = feed['cursor']
+        self.assertEqual(self.changes('products', cursor)['results'], [])
+
+        # orders touch the product stock as well
+        order = self.client.post('/api/orders/', {'product': self.p1, 'quantity': 2, 'status': 'Pending'}).data['id']
+        feed = self.changes('products', cursor)
+        self.assertEqual([(row['id'], row['quantity']) for row in feed['results']], [(self.p1, 3)])
+        orders = self.changes('orders')
+        self.assertEqual([row['id'] for row in orders['results']], [order])
+
+        self.client.delete(f'/api/products/{self.p1}/')
+        feed = self.changes('products', feed['cursor'])
+        self.assertEqual((feed['results'], feed['deleted']), ([], [self.p1]))
+        # one product tombstone stands for its orders and log entries
+        self.assertEqual(Tombstone.objects.filter(user=self.user).count(), 1)
+        orders = self.changes('orders', orders['cursor'])
+        self.assertEqual((orders['deleted'], orders['deleted_products']), ([], [self.p1]))
+        logs = self.changes('inventory')
+        self.assertEqual(len(logs['results']), 1)
+        self.assertEqual(logs['deleted_products'], [self.p1])
+        self.assertNotIn('deleted_products', feed)
+
+    def test_paging_and_invalid_cursors(self):
+        first = self.changes('products', limit=1)
+        self.assertEqual([row['id'] for row in first['results']], [self.p1])
+        self.assertTrue(first['has_more'])
+        second = self.changes('products', first['cursor'], limit=1)
+        self.assertEqual([row['id'] for row in second['results']], [self.p2])
+
+        res = self.client.get('/api/products/changes/', {'since': 'garbage'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(TOMBSTONE_RETENTION_DAYS=-1):
+            res = self.client.get('/api/products/changes/', {'since': first['cursor']})
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+
+    def test_edited_log_entries_are_reported(self):
+        logs = self.changes('inventory')
+        log = logs['results'][0]
+        res = self.client.patch(f"/api/inventory/{log['id']}/", {'quantity': 7})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        logs = self.changes('inventory', logs['cursor'])
+        self.assertEqual([(row['id'], row['quantity']) for row in logs['results']], [(log['id'], 7)])
+
+    def test_prune_tombstones_command(self):
+        self.client.delete(f'/api/products/{self.p1}/')
+        call_command('prune_tombstones', stdout=StringIO())
+        self.assertEqual(Tombstone.objects.filter(user=self.user).count(), 1)
+        with override_settings(TOMBSTONE_RETENTION_DAYS=-1):
+            call_command('prune_tombstones', stdout=StringIO())
+        self.assertEqual(Tombstone.objects.filter(user=self.user).count(), 0)
+
+    def test_other_users_changes_are_hidden(self):
+        other = User.objects.create_user(username='feedother', password='Test123')
+        kept = Product.objects.create(name='Y', sku='Y', quantity=1, price=1, user=other)
+        product = Product.objects.create(name='X', sku='X', quantity=1, price=1, user=other)
+        with transaction.atomic():
+            record_product_deletion(product)
+            product.delete()
+        feed = self.changes('products')
+        self.assertEqual(feed['deleted'], [])
+        self.assertNotIn(kept.id, [row['id'] for row in feed['results']])
+
+
+class StockSnapshotTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='snapuser', password='Test123')
+        self.client.force_authenticate(user=self.user)
+
+    def test_snapshots_follow_log_writes(self):
+        res = self.client.post('/api/products/', {'name': 'P1', 'sku': 'S1', 'quantity': 20, 'price': '5.00'})
+        product_id = res.data['id']
+        self.client.post('/api/orders/', {'product': product_id, 'quantity': 3, 'status': 'Pending'})
+
+        self.assertEqual(StockSnapshot.objects.get(user=self.user).stock_level, 17)
+        self.assertEqual(ProductStockSnapshot.objects.get(product_id=product_id).stock_level, 17)
+
+        res = self.client.get('/api/dashboard/stock-chart/')
+        self.assertEqual(res.data['stock_levels'], [17])
+        res = self.client.get(f'/api/dashboard/stock-chart/?product={product_id}')
+        self.assertEqual(res.data['stock_levels'], [17])
+
+    def stock_chart(self):
+        return self.client.get('/api/dashboard/stock-chart/').data['stock_levels']
+
+    def test_deleting_a_product_takes_it_out_of_the_snapshots(self):
+        first = self.client.post('/api/products/', {'name': 'P1', 'sku': 'S1', 'quantity': 10, 'price': '5.00'}).data['id']
+        self.client.post('/api/products/', {'name': 'P2', 'sku': 'S2', 'quantity': 5, 'price': '5.00'})
+        self.assertEqual(self.stock_chart(), [15])
+
+        self.client.delete(f'/api/products/{first}/')
+        self.assertEqual(self.stock_chart(), [5])
+        self.assertEqual(self.client.get('/api/dashboard/stats/').data['total_stock'], 5)
+        call_command('rebuild_stock_snapshots', stdout=StringIO())
+        self.assertEqual(StockSnapshot.objects.get(user=self.user).stock_level, 5)
+
+    def test_deleting_a_product_matches_a_rebuild(self):
+        first = Product.objects.create(name='P1', sku='S1', quantity=0, price=1, user=self.user)
+        second = Product.objects.create(name='P2', sku='S2', quantity=0, price=1, user=self.user)
+        now = timezone.now()
+        for product, days_ago, change_type, quantity in [
+            (first, 5, 'Added', 10), (second, 3, 'Added', 5), (first, 1, 'Sold', 2), (second, 0, 'Added', 1),
+        ]:
+            InventoryLog.objects.create(product=product, change_type=change_type, quantity=quantity,
+                                        timestamp=now - timedelta(days=days_ago))
+        call_command('rebuild_stock_snapshots', stdout=StringIO())
+
+        self.client.delete(f'/api/products/{first.id}/')
+        incremental = list(StockSnapshot.objects.filter(user=self.user).order_by('date').values_list('date', 'stock_level'))
+        call_command('rebuild_stock_snapshots', stdout=StringIO())
+        rebuilt = list(StockSnapshot.objects.filter(user=self.user).order_by('date').values_list('date', 'stock_level'))
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual([level for _, level in rebuilt], [5, 6])
+
+    def test_log_updates_and_deletes_move_the_snapshots(self):
+        product_id = self.client.post('/api/products/', {'name': 'P1', 'sku': 'S1', 'quantity': 10, 'price': '5.00'}).data['id']
+        log = InventoryLog.objects.get(product_id=product_id)
+
+        res = self.client.patch(f'/api/inventory/{log.id}/', {'quantity': 3})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.stock_chart(), [3])
+        self.assertEqual(ProductStockSnapshot.objects.get(product_id=product_id).stock_level, 3)
+
+        res = self.client.patch(f'/api/inventory/{log.id}/', {'change_type': 'Removed'})
+        self.assertEqual(self.stock_chart(), [-3])
+
+        res = self.client.delete(f'/api/inventory/{log.id}/')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.stock_chart(), [0])
+        self.assertEqual(ProductStockSnapshot.objects.get(product_id=product_id).stock_level, 0)
+
+    def test_month_bucket_keeps_last_snapshot(self):
+        for day, level in [(date(2025, 1, 3), 5), (date(2025, 1, 20), 8), (date(2025, 2, 2), 4)]:
+            StockSnapshot.objects.create(user=self.user, date=day, stock_level=level)
+
+        res = self.client.get('/api/dashboard/stock-chart/?bucket=month&start=2025-01-01&end=2025-02-28')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['dates'], ['2025-01-01', '2025-02-01'])
+        self.assertEqual(res.data['stock_levels'], [8, 4])
+
+        res = self.client.get('/api/dashboard/stock-chart/?start=2025-01-10')
+        self.assertEqual(res.data['stock_levels'], [8, 4])
+
+    def test_invalid_parameters(self):
+        res = self.client.get('/api/dashboard/stock-chart/?bucket=year')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get('/api/dashboard/stock-chart/?start=2025-13-01')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get('/api/dashboard/stock-chart/?product=abc')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_matches_incremental(self):
+        product = Product.objects.create(name='P1', sku='S1', quantity=0, price=1, user=self.user)
+        InventoryLog.objects.create(product=product, change_type='Added', quantity=10)
+        InventoryLog.objects.create(product=product, change_type='Sold', quantity=4)
+        StockSnapshot.objects.all().delete()
+
+        call_command('rebuild_stock_snapshots', stdout=StringIO())
+        self.assertEqual(StockSnapshot.objects.get(user=self.user).stock_level, 6)
+        self.assertEqual(ProductStockSnapshot.objects.get(product=product).stock_level, 6)
+
 
 class CategoryTest(TestCase):
     def setUp(self):
@@ -173,7 +1166,7 @@ class CategoryTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
         list_res = self.client.get('/api/categories/')
         self.assertEqual(list_res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(list_res.data), 1)
+        self.assertEqual(len(list_res.data['results']), 1)
 
     
     def test_delete_pending_order(self):
@@ -202,3 +1195,355 @@ class CategoryTest(TestCase):
         response = self.client.delete(f'/api/orders/{order.id}/')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite specific')
+class QueryPlanTest(TestCase):
+    # A plan line like "SCAN inventory_order" (no USING INDEX) is a full table scan
+    FULL_SCAN = re.compile(r'^SCAN (?!\(|CONSTANT)(\S+)(?: AS \S+)?$')
+
+    ENDPOINTS = [
+        '/api/dashboard/stats/',
+        '/api/dashboard/inventory-summary/',
+        '/api/dashboard/stock-chart/',
+        '/api/dashboard/stock-chart/?bucket=week',
+        '/api/products/',
+        '/api/products/?search=p1',
+        '/api/orders/',
+        '/api/inventory/',
+        '/api/categories/',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='planuser', password='Test123')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='C1', user=self.user)
+        product = Product.objects.create(name='P1', sku='S1', quantity=5, price=10.0, user=self.user, category=category)
+        self.client.post('/api/orders/', {'product': product.id, 'quantity': 1, 'status': 'Pending'})
+        self.endpoints = self.ENDPOINTS + [
+            f'/api/products/?category={category.id}',
+            f'/api/orders/?category={category.id}',
+            f'/api/dashboard/stock-chart/?product={product.id}',
+        ]
+
+    def test_no_full_table_scans(self):
+        for url in self.endpoints:
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK, url)
+            selects = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+            self.assertTrue(selects, url)
+            for sql in selects:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                    plan = [row[-1] for row in cursor.fetchall()]
+                scans = [line for line in plan if self.FULL_SCAN.match(line)]
+                self.assertEqual(scans, [], f'{url}\n{sql}\n' + '\n'.join(plan))
+
+
+class LogCompactionTest(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        self.user = User.objects.create_user(username='compactuser', password='Test123')
+        self.product = Product.objects.create(name='P1', sku='S1', quantity=0, price=1, user=self.user)
+        now = timezone.now()
+        for days_ago, change_type, quantity in [(200, 'Added', 10), (200, 'Sold', 3), (150, 'Removed', 2), (1, 'Added', 4)]:
+            log = InventoryLog.objects.create(product=self.product, change_type=change_type, quantity=quantity)
+            InventoryLog.objects.filter(pk=log.pk).update(timestamp=now - timedelta(days=days_ago))
+        call_command('rebuild_stock_snapshots', stdout=StringIO())
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def history(self):
+        res = self.client.get('/api/inventory/history/', {'start': '2000-01-01'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.json()
+
+    def test_compaction_keeps_history_and_snapshots(self):
+        before = self.history()
+        snapshots = list(StockSnapshot.objects.values_list('date', 'stock_level'))
+
+        call_command('compact_inventory_logs', retention_days=90, batch_size=2, stdout=StringIO())
+        self.assertEqual(InventoryLog.objects.count(), 1)
+        self.assertEqual(ArchivedInventoryLog.objects.count(), 3)
+        self.assertEqual(InventoryLogRollup.objects.count(), 2)
+        self.assertEqual(self.history(), before)
+        self.assertEqual([row['sold'] for row in before], [0, 0, 3])
+
+        call_command('rebuild_stock_snapshots', stdout=StringIO())
+        self.assertEqual(list(StockSnapshot.objects.values_list('date', 'stock_level')), snapshots)
+
+    def test_raw_log_responses_include_compacted_days(self):
+        res = self.client.get('/api/inventory/')
+        self.assertIsNone(res.data['next'])
+        call_command('compact_inventory_logs', retention_days=90, stdout=StringIO())
+
+        res = self.client.get('/api/inventory/', {'page_size': 1})
+        self.assertEqual([row['quantity'] for row in res.data['results']], [4])
+        rows = []
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            rows += res.data['results']
+        # newest day first, Added before Sold within a day
+        self.assertEqual([(row['change_type'], row['quantity']) for row in rows], [('Removed', 2), ('Added', 10), ('Sold', 3)])
+        self.assertTrue(all(row['id'] is None and row['compacted'] for row in rows))
+        self.assertEqual(rows[0]['product_name'], 'P1')
+        res = self.client.get('/api/inventory/', {'compacted': 'nope'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get('/api/inventory/export/', {'file_format': 'ndjson'})
+        exported = [json.loads(line) for line in b''.join(res.streaming_content).decode().splitlines()]
+        self.assertEqual([(row['change_type'], row['quantity']) for row in exported],
+                         [('Added', 10), ('Sold', 3), ('Removed', 2), ('Added', 4)])
+        self.assertEqual([row['id'] is None for row in exported], [True, True, True, False])
+        other = Product.objects.create(name='P2', sku='S2', quantity=0, price=1, user=self.user)
+        res = self.client.get('/api/inventory/export/', {'file_format': 'csv', 'product': other.id})
+        self.assertEqual(len(b''.join(res.streaming_content).decode().splitlines()), 1)
+
+    def test_compaction_to_file(self):
+        import gzip
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'logs.ndjson.gz')
+            call_command('compact_inventory_logs', retention_days=90, archive='file', archive_file=path, stdout=StringIO())
+            with gzip.open(path, 'rt') as f:
+                rows = [json.loads(line) for line in f]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(ArchivedInventoryLog.objects.count(), 0)
+        with self.assertRaises(CommandError):
+            call_command('compact_inventory_logs', archive='file', stdout=StringIO())
+
+    def test_history_defaults_to_recent_days(self):
+        res = self.client.get('/api/inventory/history/')
+        self.assertEqual([row['added'] for row in res.json()], [4])
+        res = self.client.get('/api/inventory/history/', {'start': 'nope'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get('/api/inventory/history/', {'product': 'abc'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get('/api/inventory/history/', {'product': self.product.id, 'start': '2000-01-01'})
+        self.assertEqual(len(res.json()), 3)
+
+
+class ProductSearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='searchuser', password='Test123')
+        other = User.objects.create_user(username='otheruser', password='Test123')
+        Product.objects.create(name='Claw hammer', sku='HAM-0001', price=1, user=self.user)
+        Product.objects.create(name='Nail box', sku='NB-1', price=1, description='for any hammer', user=self.user)
+        Product.objects.create(name='Sledge hammer', sku='HAM-0002', price=1, user=self.user)
+        Product.objects.create(name='Claw hammer', sku='HAM-0001', price=1, user=other)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def search(self, text, **params):
+        res = self.client.get('/api/products/', {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def skus(self, text):
+        return [row['sku'] for row in self.search(text)['results']]
+
+    def test_prefix_and_relevance(self):
+        self.assertEqual(self.skus('HAM-000'), ['HAM-0001', 'HAM-0002'])
+        self.assertEqual(self.skus('sledge ham'), ['HAM-0002'])
+        # name matches rank above description matches
+        self.assertEqual(self.skus('hammer')[-1], 'NB-1')
+        self.assertEqual(self.skus('---'), [])
+
+    def test_index_follows_writes_and_paginates(self):
+        product = Product.objects.get(user=self.user, sku='NB-1')
+        self.client.patch(f'/api/products/{product.id}/', {'name': 'Screw box', 'description': ''})
+        self.assertEqual(self.skus('nail'), [])
+        self.assertEqual(self.skus('screw'), ['NB-1'])
+        product.delete()
+        self.assertEqual(self.skus('screw'), [])
+
+        first = self.search('hammer', page_size=1)
+        second = self.client.get(first['next']).data
+        self.assertEqual([r['sku'] for r in first['results'] + second['results']], ['HAM-0001', 'HAM-0002'])
+
+    def test_like_fallback(self):
+        from . import search
+        from django.db import DEFAULT_DB_ALIAS
+
+        search._fts_tables[DEFAULT_DB_ALIAS] = False
+        try:
+            self.assertEqual(self.skus('ham-0002'), ['HAM-0002'])
+            self.assertEqual(self.skus('hammer')[-1], 'NB-1')
+        finally:
+            search._fts_tables.clear()
+
+
+class LeanReadTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='leanuser', password='Test123')
+        category = Category.objects.create(name='Tools', user=self.user)
+        product = Product.objects.create(name='Hammer \u2028', sku='H1', quantity=5, price='10.50', user=self.user, category=category)
+        Product.objects.create(name='Nail', sku='N1', quantity=0, price=0.1, user=self.user)
+        Order.objects.create(product=product, quantity=2, user=self.user)
+        InventoryLog.objects.create(product=product, change_type='Added', quantity=5)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_lean_responses_match_the_serializers(self):
+        from rest_framework.renderers import JSONRenderer
+        from .serializers import InventoryLogSerializer, OrderSerializer, ProductSerializer
+
+        cases = [
+            ('/api/products/', ProductSerializer, Product.objects.order_by('-date_added', '-id')),
+            ('/api/orders/', OrderSerializer, Order.objects.order_by('-date', '-id')),
+            ('/api/inventory/', InventoryLogSerializer, InventoryLog.objects.order_by('-timestamp', '-id')),
+        ]
+        for url, serializer_class, queryset in cases:
+            expected = serializer_class(queryset, many=True).data
+            res = self.client.get(url)
+            page = JSONRenderer().render({'next': None, 'previous': None, 'results': expected})
+            self.assertEqual(res.content, page, url)
+
+            res = self.client.get(f'{url}{queryset[0].pk}/')
+            self.assertEqual(res.content, JSONRenderer().render(expected[0]), url)
+
+        self.assertEqual(self.client.get('/api/products/999999/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_fast_renderer_falls_back_for_indented_output(self):
+        res = self.client.get('/api/products/', HTTP_ACCEPT='application/json; indent=2')
+        self.assertIn(b'\n  "next"', res.content)
+
+
+class CachedAuthenticationTest(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(username='cacheduser', password='Test123')
+        token = RefreshToken.for_user(self.user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get('/api/categories/')
+        return res, [q['sql'] for q in queries.captured_queries if 'auth_user' in q['sql']]
+
+    def test_second_request_skips_user_query(self):
+        res, first = self.user_queries()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(first), 1)
+        res, second = self.user_queries()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(second, [])
+
+    def test_deactivation_evicts_cached_user(self):
+        self.user_queries()
+        self.user.is_active = False
+        self.user.save()
+        res, _ = self.user_queries()
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cache_is_bounded_and_expires(self):
+        from .authentication import UserCache
+        cache_ = UserCache(maxsize=2, ttl=60)
+        for user_id in (1, 2, 3):
+            cache_.set(user_id, self.user)
+        self.assertIsNone(cache_.get(1))
+        self.assertIsNotNone(cache_.get('3'))
+        expired = UserCache(maxsize=2, ttl=0)
+        expired.set(1, self.user)
+        self.assertIsNone(expired.get(1))
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        metrics_registry.reset()
+        self.user = User.objects.create_user(username='metricsuser', password='Test123')
+        Product.objects.create(name='P1', sku='S1', quantity=5, price=10.0, user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def staff_token(self):
+        staff = User.objects.create_user(username='metricsstaff', password='Test123', is_staff=True)
+        return RefreshToken.for_user(staff).access_token
+
+    def sample(self, text, prefix):
+        values = [float(line.rsplit(' ', 1)[1]) for line in text.splitlines() if line.startswith(prefix)]
+        self.assertEqual(len(values), 1, prefix)
+        return values[0]
+
+    def test_requests_are_recorded_per_route(self):
+        for product in Product.objects.all():
+            self.client.get(f'/api/products/{product.pk}/')
+        self.client.get('/api/products/')
+        self.client.get('/api/products/999999/')
+
+        res = self.client.get('/api/metrics/', HTTP_AUTHORIZATION=f'Bearer {self.staff_token()}')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = res.content.decode()
+        detail = 'route="product-detail",method="GET"'
+        self.assertEqual(self.sample(text, f'inventory_http_requests_total{{{detail},status="200"}}'), 1)
+        self.assertEqual(self.sample(text, f'inventory_http_requests_total{{{detail},status="404"}}'), 1)
+        self.assertEqual(self.sample(text, f'inventory_http_request_duration_seconds_count{{{detail}}}'), 2)
+        self.assertEqual(self.sample(text, f'inventory_http_request_duration_seconds_bucket{{{detail},le="+Inf"}}'), 2)
+        self.assertGreater(self.sample(text, f'inventory_db_queries_per_request_sum{{{detail}}}'), 0)
+        self.assertGreater(self.sample(text, f'inventory_http_response_bytes_total{{{detail}}}'), 0)
+        self.assertIn('inventory_dashboard_cache_hits_total ', text)
+
+    @override_settings(METRICS_AUTH_TOKEN='scrape-secret')
+    def test_metrics_token(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/metrics/').status_code, status.HTTP_401_UNAUTHORIZED)
+        res = client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_metrics_are_staff_only_without_a_token(self):
+        client = APIClient()
+        self.assertEqual(client.get('/api/metrics/').status_code, status.HTTP_401_UNAUTHORIZED)
+        token = RefreshToken.for_user(self.user).access_token
+        res = client.get('/api/metrics/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        res = client.get('/api/metrics/', HTTP_AUTHORIZATION=f'Bearer {self.staff_token()}')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class BenchmarkTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_demo_data_and_benchmark_cover_every_route(self):
+        call_command('generate_demo_data', products=20, orders=30, logs=40, categories=2, stdout=StringIO())
+        user = User.objects.get(username='bench_0')
+        self.assertEqual(Product.objects.filter(user=user).count(), 20)
+        self.assertEqual(Order.objects.filter(user=user).count(), 30)
+        self.assertEqual(TenantStats.objects.get(user=user).product_count, 20)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'bench.json')
+            err = StringIO()
+            call_command('benchmark_api', iterations=1, serializers=True, output=output, stdout=StringIO(), stderr=err)
+            with open(output) as f:
+                report = json.load(f)
+        self.assertEqual(err.getvalue(), '')
+        self.assertEqual(report['missing_routes'], [])
+        for name, result in report['results'].items():
+            self.assertLess(result['status'], 400, name)
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+        for name, result in report['serializers'].items():
+            self.assertTrue(result['identical_output'], name)
+        # writes were rolled back
+        self.assertEqual(Product.objects.filter(user=user).count(), 20)
+        self.assertFalse(User.objects.filter(username__startswith='bench-register').exists())
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'SQLite profile')
+    def test_sqlite_profile_and_contention_benchmark(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+        out = StringIO()
+        call_command('benchmark_sqlite', writers=2, readers=2, seconds=0.3, products=20, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report['profiles']), {'baseline', 'production'})
+        production = report['profiles']['production']
+        self.assertGreater(production['write']['ops'], 0)
+        self.assertEqual(production['write']['errors'], 0)
@@ -1,5 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
+from . import async_views
 from .views import (
     register,
     login,
@@ -9,7 +11,13 @@ from .views import (
     dashboard_stats,
     inventory_summary,
     stock_chart_data,
+    sales_leaderboard,
     CategoryViewSet,
+    export_inventory_summary,
+    export_orders,
+    export_inventory_logs,
+    notification_ticket,
+    metrics,
 )
 
 router = DefaultRouter()
@@ -21,9 +29,21 @@ router.register(r'categories', CategoryViewSet, basename='category')
 urlpatterns = [
     path('register/', register, name='register'),
     path('login/', login, name='login'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
     path('dashboard/stats/', dashboard_stats, name='dashboard_stats'),
     path('dashboard/inventory-summary/', inventory_summary, name='inventory_summary'),
     path('dashboard/stock-chart/', stock_chart_data, name='stock_chart_data'),
+    path('dashboard/leaderboard/', sales_leaderboard, name='sales_leaderboard'),
+    path('dashboard/async/stats/', async_views.dashboard_stats, name='dashboard_stats_async'),
+    path('dashboard/async/inventory-summary/', async_views.inventory_summary, name='inventory_summary_async'),
+    path('dashboard/async/stock-chart/', async_views.stock_chart_data, name='stock_chart_data_async'),
+    path('dashboard/inventory-summary/export/', export_inventory_summary, name='export_inventory_summary'),
+    path('orders/export/', export_orders, name='export_orders'),
+    path('inventory/export/', export_inventory_logs, name='export_inventory_logs'),
+    path('notifications/ticket/', notification_ticket, name='notification_ticket'),
+    path('notifications/stream/', async_views.notification_stream, name='notification_stream'),
+    path('metrics/', metrics, name='metrics'),
     path('', include(router.urls)),
 ]
 
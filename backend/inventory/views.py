@@ -1,18 +1,54 @@
+from collections import Counter
+from datetime import timedelta
+from itertools import chain, islice
+
 from rest_framework import viewsets, status, serializers as drf_serializers
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, action
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
-from django.db.models import Sum, Count, Q
-from .models import Product, Order, InventoryLog, Category
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.db import transaction
+from django.db.models import F
+from .models import Product, Order, InventoryLog, InventoryLogRollup, Category
+from .authentication import CachedJWTAuthentication, issue_stream_ticket
+from .changes import ChangeFeedMixin, record_deletions, record_product_deletion
+from .compaction import compacted_entries, compacted_position, daily_history, parse_compacted_position
+from .conditional import ConditionalReadMixin, conditional, conditional_response
+from .counters import apply_deltas, bump_data_version, pending_delta, quantity_deltas
+from .dashboard import (
+    get_dashboard_stats,
+    invalidate_dashboard,
+    inventory_summary_rows,
+    parse_chart_params,
+    parse_date_range,
+    parse_product_param,
+    stock_chart,
+)
+from .exports import EXPORT_FORMATS, export_response
+from .lean import LeanReadMixin, lean_rows
+from .importers import FORMATS as IMPORT_FORMATS, import_products, iter_rows
+from .jobs import enqueue_secondary_writes
+from .metrics import registry as metrics_registry
+from .notifications import notify, notify_order, notify_stock
+from .routers import ReplicaReadMixin, read_from_replica, replica_reads
+from .sales import leaderboard_rows, order_sale, parse_leaderboard_params
+from .search import search_products
+from .snapshots import record_logs, record_product_removal, reversed_log
 from .serializers import (
     UserRegistrationSerializer,
     ProductSerializer,
     CategorySerializer,
     OrderSerializer,
-    InventoryLogSerializer
+    InventoryLogSerializer,
+    token_lifetimes,
 )
 
 
@@ -27,6 +63,7 @@ def register(request):
             'user': serializer.data,
             'refresh': str(refresh),
             'access': str(refresh.access_token),
+            **token_lifetimes(),
         }, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -50,6 +87,7 @@ def login(request):
         return Response({
             'refresh': str(refresh),
             'access': str(refresh.access_token),
+            **token_lifetimes(),
             'user': {
                 'id': user.id,
                 'username': user.username,
@@ -62,19 +100,45 @@ def login(request):
         status=status.HTTP_401_UNAUTHORIZED
     )
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalReadMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ('name', 'id')
 
     def get_queryset(self):
         return Category.objects.filter(user=self.request.user).order_by('name')
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            serializer.save(user=self.request.user)
+            bump_data_version(self.request.user.pk)
+
+    def perform_update(self, serializer):
+        old_default = serializer.instance.default_reorder_point
+        with transaction.atomic():
+            category = serializer.save()
+            if category.default_reorder_point != old_default:
+                enqueue_secondary_writes(self.request.user.pk, stock_checks=category.products.values_list('id', flat=True))
+            bump_data_version(self.request.user.pk)
+        invalidate_dashboard(self.request.user.pk)
 
-class ProductViewSet(viewsets.ModelViewSet):
+    def perform_destroy(self, instance):
+        # products of the category show up with it in their category_name
+        with transaction.atomic():
+            product_ids = list(instance.products.values_list('id', flat=True))
+            # SET_NULL clears their category with a plain UPDATE, stamp them for the change feed
+            instance.products.update(updated_at=timezone.now())
+            instance.delete()
+            # and they lose its default reorder point
+            enqueue_secondary_writes(self.request.user.pk, stock_checks=product_ids)
+            bump_data_version(self.request.user.pk)
+        invalidate_dashboard(self.request.user.pk)
+
+class ProductViewSet(ChangeFeedMixin, ConditionalReadMixin, ReplicaReadMixin, LeanReadMixin, viewsets.ModelViewSet):
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-date_added', '-id')
+    change_kind = 'product'
     
     def get_queryset(self):
         # Only return products for the current user
@@ -82,7 +146,18 @@ class ProductViewSet(viewsets.ModelViewSet):
         category_id = self.request.query_params.get('category')
         if category_id:
             qs = qs.filter(category_id=category_id)
+        if self.search_text() and self.action == 'list':
+            qs = search_products(qs, self.search_text())
         return qs
+
+    def search_text(self):
+        return self.request.query_params.get('search', '').strip()
+
+    def get_cursor_ordering(self):
+        # search results come best match first
+        if self.search_text() and self.action == 'list':
+            return ('search_rank', 'id')
+        return self.cursor_ordering
     
     def get_serializer_context(self):
         # Pass request to serializer for validation
@@ -91,36 +166,88 @@ class ProductViewSet(viewsets.ModelViewSet):
         return context
     
     def perform_create(self, serializer):
-        product = serializer.save(user=self.request.user)
-        # Creating inventory log entry for the initial quantity
-        try:
-            InventoryLog.objects.create(
-                product=product,
-                change_type='Added',
-                quantity=product.quantity if product.quantity > 0 else 0
+        with transaction.atomic():
+            product = serializer.save(user=self.request.user)
+            apply_deltas(self.request.user.pk, quantity_deltas(None, product.quantity))
+            notify_stock(self.request.user.pk, product, None)
+            # Creating inventory log entry for the initial quantity
+            enqueue_secondary_writes(
+                self.request.user.pk,
+                logs=[(product.pk, 'Added', product.quantity if product.quantity > 0 else 0)],
+                stock_checks=[product.pk],
             )
-        except Exception:
-            pass
+        invalidate_dashboard(self.request.user.pk)
     
     def perform_update(self, serializer):
-        old_product = self.get_object()
-        old_quantity = old_product.quantity
-        product = serializer.save()
-        new_quantity = product.quantity
-        
-        if new_quantity != old_quantity:
-            change = new_quantity - old_quantity
-            change_type = 'Added' if change > 0 else 'Removed'
-            InventoryLog.objects.create(
-                product=product,
-                change_type=change_type,
-                quantity=abs(change)
-            )
+        old_quantity = serializer.instance.quantity
+        with transaction.atomic():
+            product = serializer.save()
+            new_quantity = product.quantity
+            
+            logs = []
+            if new_quantity != old_quantity:
+                change = new_quantity - old_quantity
+                change_type = 'Added' if change > 0 else 'Removed'
+                logs.append((product.pk, change_type, abs(change)))
+            # also bumps the data version when only the details changed
+            apply_deltas(self.request.user.pk, quantity_deltas(old_quantity, new_quantity))
+            notify_stock(self.request.user.pk, product, old_quantity)
+            # the reorder point or category may have changed too
+            enqueue_secondary_writes(self.request.user.pk, logs=logs, stock_checks=[product.pk])
+        invalidate_dashboard(self.request.user.pk)
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # pending orders of the product are deleted with it
+            deltas = quantity_deltas(instance.quantity, None)
+            deltas['pending_orders'] -= Order.objects.filter(product=instance, status='Pending').count()
+            record_product_deletion(instance)
+            record_product_removal(instance)
+            instance.delete()
+            apply_deltas(self.request.user.pk, deltas)
+        invalidate_dashboard(self.request.user.pk)
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_products(self, request):
+        """
+        Import a CSV or NDJSON catalog, either as a multipart ``file`` upload
+        or as the raw request body. ``?upsert=true`` updates products whose
+        SKU already exists instead of reporting them as duplicates.
+        """
+        file_format = request.query_params.get('file_format')
+        if request.content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+            file_format = file_format or ('ndjson' if upload.name.endswith(('.ndjson', '.jsonl')) else 'csv')
+            lines = upload
+        else:
+            # stream the raw body line by line
+            file_format = file_format or ('csv' if request.content_type == 'text/csv' else 'ndjson')
+            lines = request._request
+        if file_format not in IMPORT_FORMATS:
+            return Response({'error': f"file_format must be one of {', '.join(IMPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        upsert = request.query_params.get('upsert', '').lower() in ('1', 'true', 'yes')
+        report = import_products(
+            request.user,
+            iter_rows(lines, file_format),
+            upsert=upsert,
+            chunk_size=settings.PRODUCT_IMPORT_CHUNK_SIZE,
+        )
+        # one event for the whole file rather than one per product
+        if report['created'] or report['updated']:
+            notify(request.user.pk, 'import', {'created': report['created'], 'updated': report['updated']})
+        invalidate_dashboard(request.user.pk)
+        return Response(report, status=status.HTTP_200_OK)
 
 # creating orderviewset
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ChangeFeedMixin, ConditionalReadMixin, ReplicaReadMixin, LeanReadMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-date', '-id')
+    change_kind = 'order'
+    change_product_rows = True
     
     def get_queryset(self):
         # Only return orders for the current user
@@ -138,165 +265,522 @@ class OrderViewSet(viewsets.ModelViewSet):
         if product.user != self.request.user:
             raise drf_serializers.ValidationError({'product': 'You can only create orders for your own products'})
         
-        if product.quantity < quantity:
-            raise drf_serializers.ValidationError({'quantity': 'Insufficient stock'})
-        
-        product.quantity -= quantity
-        product.save()
-        
-        order = serializer.save(user=self.request.user)
-        
-        InventoryLog.objects.create(
-            product=product,
-            change_type='Sold',
-            quantity=quantity
-        )
+        with transaction.atomic():
+            if not _take_stock(product, quantity):
+                raise drf_serializers.ValidationError({'quantity': 'Insufficient stock'})
+            
+            order = serializer.save(user=self.request.user, unit_price=product.price)
+            
+            deltas = quantity_deltas(product.quantity + quantity, product.quantity)
+            deltas.update(pending_delta(None, order.status))
+            apply_deltas(self.request.user.pk, deltas)
+            notify_stock(self.request.user.pk, product, product.quantity + quantity)
+            enqueue_secondary_writes(
+                self.request.user.pk,
+                logs=[(product.pk, 'Sold', quantity)],
+                sales=[order_sale(order)],
+                stock_checks=[product.pk],
+            )
+            notify_order(self.request.user.pk, 'created', order, product.name)
+        invalidate_dashboard(self.request.user.pk)
     
     def perform_update(self, serializer):
-        old_order = Order.objects.get(pk=self.get_object().pk)
-        old_product = old_order.product
-        old_quantity = old_order.quantity
-        
-        order = serializer.save()
-        new_product = order.product
-        new_quantity = order.quantity
+        old_product = serializer.instance.product
+        old_quantity = serializer.instance.quantity
+        new_product = serializer.validated_data.get('product', old_product)
+        new_quantity = serializer.validated_data.get('quantity', old_quantity)
+        old_status = serializer.instance.status
         
         # make sure the new product belongs to the current user
         if new_product.user != self.request.user:
             raise drf_serializers.ValidationError({'product': 'You can only update orders with your own products'})
         
-        if old_product != new_product or old_quantity != new_quantity:
-            old_product.quantity += old_quantity
-            old_product.save()
-            
-            if new_product.quantity < new_quantity:
-                old_product.quantity -= old_quantity
-                old_product.save()
-                raise drf_serializers.ValidationError({'quantity': 'Insufficient stock'})
+        # stock of the products involved, before the change
+        stock_before = {old_product.pk: old_product.quantity, new_product.pk: new_product.quantity}
+        # taken before save() changes the instance
+        old_sale = order_sale(serializer.instance, -1)
+        with transaction.atomic():
+            deltas = Counter()
+            logs = []
+            if old_product.pk != new_product.pk or old_quantity != new_quantity:
+                # put the old quantity back first so an unchanged product can reuse it,
+                # the transaction rolls it back again if the new quantity doesn't fit
+                _return_stock(old_product, old_quantity)
+                deltas.update(quantity_deltas(old_product.quantity - old_quantity, old_product.quantity))
+                if not _take_stock(new_product, new_quantity):
+                    raise drf_serializers.ValidationError({'quantity': 'Insufficient stock'})
+                deltas.update(quantity_deltas(new_product.quantity + new_quantity, new_product.quantity))
+                logs.append((new_product.pk, 'Sold', new_quantity))
             
-            new_product.quantity -= new_quantity
-            new_product.save()
-            
-            InventoryLog.objects.create(
-                product=new_product,
-                change_type='Sold',
-                quantity=new_quantity
+            # an order moved to another product is priced like a new one
+            order = serializer.save(**({'unit_price': new_product.price} if old_product.pk != new_product.pk else {}))
+            deltas.update(pending_delta(old_status, order.status))
+            apply_deltas(self.request.user.pk, deltas)
+            for product in {old_product.pk: old_product, new_product.pk: new_product}.values():
+                notify_stock(self.request.user.pk, product, stock_before[product.pk])
+            enqueue_secondary_writes(
+                self.request.user.pk,
+                logs=logs,
+                sales=[old_sale, order_sale(order)],
+                stock_checks=stock_before,
             )
+            notify_order(self.request.user.pk, 'updated', order, new_product.name)
+        invalidate_dashboard(self.request.user.pk)
     
     def perform_destroy(self, instance):
         if instance.status != 'Pending':
             raise drf_serializers.ValidationError({'error': 'Can only delete pending orders'})
         
-        product = instance.product
-        product.quantity += instance.quantity
-        product.save()
+        with transaction.atomic():
+            product = instance.product
+            _return_stock(product, instance.quantity)
+            
+            record_deletions(self.request.user.pk, 'order', [instance.pk])
+            notify_order(self.request.user.pk, 'deleted', instance, product.name)
+            sale = order_sale(instance, -1)
+            instance.delete()
+            
+            deltas = quantity_deltas(product.quantity - instance.quantity, product.quantity)
+            deltas.update(pending_delta(instance.status, None))
+            apply_deltas(self.request.user.pk, deltas)
+            notify_stock(self.request.user.pk, product, product.quantity - instance.quantity)
+            enqueue_secondary_writes(
+                self.request.user.pk,
+                logs=[(product.pk, 'Added', instance.quantity)],
+                sales=[sale],
+                stock_checks=[product.pk],
+            )
+        invalidate_dashboard(self.request.user.pk)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Create many orders in one transaction. Every line is accepted or
+        rejected on its own and the response reports the outcome per line.
+        """
+        lines = request.data.get('orders') if isinstance(request.data, dict) else request.data
+        if not isinstance(lines, list) or not lines:
+            return Response({'error': 'orders must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(lines) > settings.BULK_ORDER_MAX_LINES:
+            return Response(
+                {'error': f'At most {settings.BULK_ORDER_MAX_LINES} orders per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # load every referenced product with one query
+        product_ids = set()
+        for line in lines:
+            try:
+                product_ids.add(int(line.get('product')))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        products = Product.objects.filter(user=request.user, pk__in=product_ids).select_related('category').in_bulk()
         
-        InventoryLog.objects.create(
-            product=product,
-            change_type='Added',
-            quantity=instance.quantity
-        )
+        results = []
+        orders = []
+        logs = []
+        deltas = Counter()
+        stock_before = {pk: product.quantity for pk, product in products.items()}
+        with transaction.atomic():
+            for index, line in enumerate(lines):
+                product, quantity, order_status, errors = _parse_order_line(line, products)
+                if not errors and not _take_stock(product, quantity):
+                    errors = {'quantity': 'Insufficient stock'}
+                if errors:
+                    results.append({'index': index, 'success': False, 'errors': errors})
+                    continue
+                orders.append(Order(
+                    product=product, quantity=quantity, status=order_status, unit_price=product.price, user=request.user
+                ))
+                logs.append((product.pk, 'Sold', quantity))
+                results.append({'index': index, 'success': True})
+                deltas.update(quantity_deltas(product.quantity + quantity, product.quantity))
+                deltas.update(pending_delta(None, order_status))
+            
+            Order.objects.bulk_create(orders)
+            apply_deltas(request.user.pk, deltas)
+            for pk, product in products.items():
+                notify_stock(request.user.pk, product, stock_before[pk])
+            enqueue_secondary_writes(
+                request.user.pk,
+                logs=logs,
+                sales=[order_sale(order) for order in orders],
+                stock_checks=[pk for pk, product in products.items() if product.quantity != stock_before[pk]],
+            )
+            for order in orders:
+                notify_order(request.user.pk, 'created', order, order.product.name)
+        invalidate_dashboard(request.user.pk)
         
-        instance.delete()
+        created = iter(OrderSerializer(orders, many=True).data)
+        for result in results:
+            if result['success']:
+                result['order'] = next(created)
+        
+        return Response({
+            'created': len(orders),
+            'failed': len(results) - len(orders),
+            'results': results,
+        }, status=status.HTTP_201_CREATED if orders else status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post'], url_path='transition')
+    def transition(self, request):
+        """
+        Move many orders from ``from_status`` to ``status`` with one UPDATE.
+        Orders that aren't the user's or aren't in ``from_status`` are left
+        alone and reported as skipped.
+        """
+        try:
+            data = request.data if isinstance(request.data, dict) else {}
+            ids = data.get('ids')
+            from_status = data.get('from_status')
+            to_status = data.get('status')
+            if not isinstance(ids, list) or not ids:
+                return Response({'error': 'ids must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+            if len(ids) > settings.ORDER_TRANSITION_MAX_IDS:
+                return Response(
+                    {'error': f'At most {settings.ORDER_TRANSITION_MAX_IDS} orders per request'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            try:
+                ids = {int(pk) for pk in ids}
+            except (TypeError, ValueError):
+                return Response({'error': 'ids must be order ids'}, status=status.HTTP_400_BAD_REQUEST)
+            statuses = dict(Order.STATUS_CHOICES)
+            if not all(isinstance(value, str) and value in statuses for value in (from_status, to_status)):
+                return Response(
+                    {'error': f"from_status and status must be one of {', '.join(statuses)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if to_status not in Order.STATUS_TRANSITIONS[from_status]:
+                allowed = ', '.join(Order.STATUS_TRANSITIONS[from_status]) or 'nothing'
+                return Response(
+                    {'error': f'{from_status} orders can only move to {allowed}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # the stamp marks the rows this UPDATE changed, so no row is read before it
+            now = timezone.now()
+            with transaction.atomic():
+                count = Order.objects.filter(user=request.user, pk__in=ids, status=from_status).update(
+                    status=to_status, updated_at=now
+                )
+                changed = []
+                if count:
+                    changed = sorted(
+                        Order.objects.filter(user=request.user, pk__in=ids, status=to_status, updated_at=now)
+                        .values_list('id', flat=True)
+                    )
+                    deltas = pending_delta(from_status, to_status)
+                    apply_deltas(request.user.pk, {name: value * count for name, value in deltas.items()})
+                    notify(request.user.pk, 'order_status', {'ids': changed, 'status': to_status})
+            if count:
+                invalidate_dashboard(request.user.pk)
+            return Response({
+                'updated': changed,
+                'skipped': sorted(ids.difference(changed)),
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _take_stock(product, quantity):
+    # Conditional decrement in a single UPDATE, so concurrent orders can't oversell
+    if not Product.objects.filter(pk=product.pk, quantity__gte=quantity).update(
+        quantity=F('quantity') - quantity, updated_at=timezone.now()
+    ):
+        return False
+    # the row is locked by our UPDATE until commit, so this reads our own result
+    product.refresh_from_db(fields=['quantity'])
+    return True
+
+
+def _return_stock(product, quantity):
+    Product.objects.filter(pk=product.pk).update(quantity=F('quantity') + quantity, updated_at=timezone.now())
+    product.refresh_from_db(fields=['quantity'])
+
 
+def _parse_order_line(line, products):
+    # Returns (product, quantity, status, errors) for one line of a bulk order
+    if not isinstance(line, dict):
+        return None, None, None, {'non_field_errors': 'Each order must be an object'}
+    
+    errors = {}
+    product_id = line.get('product')
+    # a JSON number or numeric string, not a list, object or boolean
+    if isinstance(product_id, (int, str)) and not isinstance(product_id, bool):
+        try:
+            product = products.get(int(product_id))
+        except ValueError:
+            product = None
+    else:
+        product = None
+    if product is None:
+        errors['product'] = 'You can only create orders for your own products'
+    
+    quantity = line.get('quantity')
+    try:
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        quantity = None
+    if quantity is None or quantity <= 0:
+        errors['quantity'] = 'Quantity must be greater than 0'
+    
+    order_status = line.get('status') or 'Pending'
+    if not isinstance(order_status, str):
+        errors['status'] = 'Status must be a string.'
+    elif order_status not in dict(Order.STATUS_CHOICES):
+        errors['status'] = f'"{order_status}" is not a valid choice.'
+    
+    return product, quantity, order_status, errors
 
-class InventoryLogViewSet(viewsets.ModelViewSet):
+
+class InventoryLogViewSet(ChangeFeedMixin, ConditionalReadMixin, ReplicaReadMixin, LeanReadMixin, viewsets.ModelViewSet):
     serializer_class = InventoryLogSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-timestamp', '-id')
+    change_kind = 'log'
+    change_product_rows = True
     
     def get_queryset(self):
         # Only return inventory logs for products belonging to the current user
         return InventoryLog.objects.filter(product__user=self.request.user).select_related('product')
 
+    def list(self, request, *args, **kwargs):
+        # past the raw entries, ?compacted= pages through the daily rollups
+        if 'compacted' in request.query_params:
+            return conditional_response(request, lambda: self.list_compacted(request))
+        return super().list(request, *args, **kwargs)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if response.data['next'] is None and InventoryLogRollup.objects.filter(product__user=self.request.user).exists():
+            response.data['next'] = self.compacted_link('')
+        return response
+
+    def compacted_link(self, position):
+        url = remove_query_param(self.request.build_absolute_uri(), self.paginator.cursor_query_param)
+        return replace_query_param(url, 'compacted', position)
+
+    def list_compacted(self, request):
+        """
+        The compacted days, newest first, as entries with no id: one per
+        product, day and change type holding the day's total.
+        """
+        try:
+            position = request.query_params['compacted']
+            after = parse_compacted_position(position) if position else None
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        page_size = self.paginator.get_page_size(request)
+        entries = list(islice(compacted_entries(request.user, after=after), page_size + 1))
+        following = None
+        if len(entries) > page_size:
+            entries = entries[:page_size]
+            following = self.compacted_link(compacted_position(entries[-1]))
+        rows = lean_rows(entries, self.lean_columns())
+        for row in rows:
+            row['compacted'] = True
+        return Response({'next': following, 'previous': None, 'results': rows})
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+            bump_data_version(self.request.user.pk)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            # the snapshots swap the old entry for the new one
+            old = reversed_log(serializer.instance)
+            log = serializer.save()
+            record_logs([old, log])
+            bump_data_version(self.request.user.pk)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            record_deletions(self.request.user.pk, 'log', [instance.pk])
+            record_logs([reversed_log(instance)])
+            instance.delete()
+            bump_data_version(self.request.user.pk)
+
+    @action(detail=False, methods=['get'], url_path='history')
+    def history(self, request):
+        """
+        Daily added/removed/sold totals per product, newest first. Days that
+        compact_inventory_logs has rolled up are included, so this covers the
+        whole history even after the raw rows are archived.
+        """
+        try:
+            try:
+                start, end = parse_date_range(request.query_params)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if start is None:
+                start = (end or timezone.localdate()) - timedelta(days=settings.INVENTORY_HISTORY_DEFAULT_DAYS - 1)
+            try:
+                product_id = parse_product_param(request.query_params)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            def build():
+                with replica_reads(request.user.pk):
+                    return Response(daily_history(request.user, product_id, start, end))
+            return conditional_response(request, build)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional
+@read_from_replica
 def dashboard_stats(request):
     try:
-        # Filter all queries by current user
-        user_products = Product.objects.filter(user=request.user)
-        user_orders = Order.objects.filter(user=request.user)
-        
-        total_stock = user_products.aggregate(total=Sum('quantity'))['total'] or 0
-        total_products = user_products.count()
-        
-        low_stock_products = user_products.filter(quantity__lt=10)
-        low_stock_data = [
-            {'name': p.name, 'stock': p.quantity}
-            for p in low_stock_products
-        ]
-        
-        top_selling = user_orders.values('product__name').annotate(
-            total_orders=Count('id')
-        ).order_by('-total_orders')[:5]
-        
-        top_selling_data = [
-            {'product': item['product__name'] if item['product__name'] else 'N/A'}
-            for item in top_selling
-        ]
-        
-        pending_orders_count = user_orders.filter(status='Pending').count()
-        
-        return Response({
-            'total_stock': total_stock,
-            'total_products': total_products,
-            'low_stock_products': low_stock_data,
-            'top_selling_products': top_selling_data,
-            'pending_orders_count': pending_orders_count,
-        })
+        # Served from the per-user dashboard cache, write paths invalidate it
+        return Response(get_dashboard_stats(request.user))
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional
+@read_from_replica
 def inventory_summary(request):
     try:
-        # Filter products by current user
-        products = Product.objects.filter(user=request.user).order_by('name')
-        summary = []
-        
-        for product in products:
-            # stock shows current product quantity (from Product model, updated after orders)
-            current_quantity = product.quantity
-            
-            # OutStock shows Out of Stock if quantity is 0, else blank
-            out_stock = 'Out of Stock' if current_quantity == 0 else ''
-            
-            summary.append({
-                'product_name': product.name,
-                'sku': product.sku,
-                'in_stock': current_quantity,  
-                'out_stock': out_stock,  
-            })
-        
-        return Response(summary)
+        return Response(inventory_summary_rows(request.user))
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional
+@read_from_replica
 def stock_chart_data(request):
     try:
-        # filter inventory logs by products belonging to the current user
-        logs = InventoryLog.objects.filter(product__user=request.user).order_by('timestamp')
-        
-        dates = []
-        stock_levels = []
-        
-        current_stock = 0
-        for log in logs:
-            dates.append(log.timestamp.strftime('%Y-%m-%d'))
-            if log.change_type == 'Added':
-                current_stock += log.quantity
-            elif log.change_type in ['Sold', 'Removed']:
-                current_stock -= log.quantity
-            stock_levels.append(current_stock)
-        
-        return Response({
-            'dates': dates,
-            'stock_levels': stock_levels,
-        })
+        try:
+            params = parse_chart_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(stock_chart(request.user, **params))
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@conditional
+@read_from_replica
+def sales_leaderboard(request):
+    try:
+        try:
+            params = parse_leaderboard_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(leaderboard_rows(request.user, **params))
     except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def _export_format(request):
+    file_format = request.query_params.get('file_format', 'csv')
+    return file_format if file_format in EXPORT_FORMATS else None
+
+
+def _export_format_error():
+    return Response(
+        {'error': f"file_format must be one of {', '.join(EXPORT_FORMATS)}"},
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_inventory_summary(request):
+    file_format = _export_format(request)
+    if file_format is None:
+        return _export_format_error()
+    
+    products = Product.objects.filter(user=request.user).order_by('name').values_list('name', 'sku', 'quantity')
+    rows = (
+        (name, sku, quantity, 'Out of Stock' if quantity == 0 else '')
+        for name, sku, quantity in products.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    )
+    return export_response(
+        'inventory-summary',
+        ['product_name', 'sku', 'in_stock', 'out_stock'],
+        rows,
+        file_format
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_orders(request):
+    file_format = _export_format(request)
+    if file_format is None:
+        return _export_format_error()
+    
+    orders = Order.objects.filter(user=request.user)
+    category_id = request.query_params.get('category')
+    if category_id:
+        orders = orders.filter(product__category_id=category_id)
+    header = ['id', 'product', 'product_name', 'product_sku', 'product_category_name', 'quantity', 'status', 'date']
+    rows = orders.order_by('date', 'id').values_list(
+        'id', 'product_id', 'product__name', 'product__sku', 'product__category__name', 'quantity', 'status', 'date'
+    ).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    return export_response('orders', header, rows, file_format)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_inventory_logs(request):
+    file_format = _export_format(request)
+    if file_format is None:
+        return _export_format_error()
+    
+    try:
+        product_id = parse_product_param(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    logs = InventoryLog.objects.filter(product__user=request.user)
+    if product_id:
+        logs = logs.filter(product_id=product_id)
+    header = ['id', 'product', 'product_name', 'product_sku', 'change_type', 'quantity', 'timestamp']
+    # the compacted days come first, as one row per product, day and change type
+    compacted = (
+        tuple(entry[column] for column in ('id', 'product', 'product__name', 'product__sku', 'change_type', 'quantity', 'timestamp'))
+        for entry in compacted_entries(request.user, product_id, descending=False)
+    )
+    rows = logs.order_by('timestamp', 'id').values_list(
+        'id', 'product_id', 'product__name', 'product__sku', 'change_type', 'quantity', 'timestamp'
+    ).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    return export_response('inventory-logs', header, chain(compacted, rows), file_format)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def notification_ticket(request):
+    """A short-lived ticket for opening the notification stream with EventSource."""
+    return Response({'ticket': issue_stream_ticket(request.user), 'expires_in': settings.STREAM_TICKET_SECONDS})
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def metrics(request):
+    # Scraped by Prometheus with the static METRICS_AUTH_TOKEN; without one
+    # configured, only staff users (by JWT) can read it
+    token = settings.METRICS_AUTH_TOKEN
+    if token:
+        if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return Response({'error': 'Invalid metrics token'}, status=status.HTTP_401_UNAUTHORIZED)
+    else:
+        try:
+            authenticated = CachedJWTAuthentication().authenticate(request)
+        except AuthenticationFailed as e:
+            return Response({'error': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+        if authenticated is None:
+            return Response({'error': 'Metrics require METRICS_AUTH_TOKEN or a staff user'}, status=status.HTTP_401_UNAUTHORIZED)
+        if not authenticated[0].is_staff:
+            return Response({'error': 'Metrics are only available to staff users'}, status=status.HTTP_403_FORBIDDEN)
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
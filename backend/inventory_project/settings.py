@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'inventory.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -78,13 +79,78 @@ WSGI_APPLICATION = 'inventory_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Production profile for SQLite, applied to every new connection. WAL lets
+# readers run while a write commits, NORMAL sync is durable in WAL mode short
+# of a power loss, and writers wait up to busy_timeout ms for the write lock
+# instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # negative is KiB: a 64 MiB page cache per connection
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # reuse connections (and their page cache) across requests
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            # take the write lock at BEGIN, so a transaction that reads first
+            # waits for busy_timeout rather than failing when it tries to write
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Read replica, only used when REPLICA_DATABASE_ALIAS names it. Locally it
+    # can be a copy of db.sqlite3; tests point it at the default test database.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['inventory.routers.ReplicaRouter']
+
+# Dashboard, reporting and list reads go to this DATABASES alias (None keeps
+# them on default). After a write the user's reads stay on default for
+# REPLICA_STICKINESS_SECONDS, keep it above the replica's lag.
+REPLICA_DATABASE_ALIAS = None
+REPLICA_STICKINESS_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inventory',
     }
 }
 
+# Dashboard payloads are cached per user and invalidated by the write paths.
+# LocMemCache is per process: with several workers (uvicorn --workers, run_jobs)
+# point this alias at a shared backend (Redis, Memcached), or a write only
+# clears the copy of the process that handled it. ETags don't depend on it,
+# the data version is read from the database on every request.
+DASHBOARD_CACHE_ALIAS = 'default'
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Seconds to cache GET response data under its ETag (0 disables), in the dashboard cache
+VERSIONED_RESPONSE_CACHE_TIMEOUT = 0
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -130,19 +196,98 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'inventory.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'EXCEPTION_HANDLER': 'inventory.exceptions.custom_exception_handler',
+    'DEFAULT_RENDERER_CLASSES': (
+        'inventory.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'inventory.pagination.InventoryCursorPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Upper bound for the ?page_size= query parameter on list endpoints
+MAX_PAGE_SIZE = 500
+
+# Largest number of order lines accepted by POST /api/orders/bulk/
+BULK_ORDER_MAX_LINES = 1000
+
+# Largest number of order ids accepted by POST /api/orders/transition/
+ORDER_TRANSITION_MAX_IDS = 10000
+
+# Rows written per transaction by the product import endpoint and command
+PRODUCT_IMPORT_CHUNK_SIZE = 1000
+
+# Rows fetched per database round trip by the streaming export endpoints
+EXPORT_CHUNK_SIZE = 2000
+
+# compact_inventory_logs keeps this many days of raw inventory log rows
+INVENTORY_LOG_RETENTION_DAYS = 90
+
+# Days returned by /api/inventory/history/ when no start date is given
+INVENTORY_HISTORY_DEFAULT_DAYS = 30
+
+# Change feed (/api/<collection>/changes/): rows per page, and how many seconds
+# a change waits before it's served so concurrent commits can't be skipped
+CHANGE_FEED_MAX_ROWS = 1000
+CHANGE_FEED_SETTLE_SECONDS = 2
+
+# Deletions are remembered for the change feed this long, older cursors must resync
+TOMBSTONE_RETENTION_DAYS = 30
+
+# Reorder point of products and categories that don't set one: stock below it opens a low stock alert
+LOW_STOCK_THRESHOLD = 10
+
+# Server-sent event notifications (/api/notifications/stream/): the broker class,
+# events buffered per open stream, and seconds between keepalive comments
+NOTIFICATION_BROKER = 'inventory.notifications.InProcessBroker'
+NOTIFICATION_QUEUE_SIZE = 100
+NOTIFICATION_HEARTBEAT_SECONDS = 15
+# Seconds a ticket from POST /api/notifications/ticket/ can be used to open a stream
+STREAM_TICKET_SECONDS = 30
+
+# Sales leaderboard (/api/dashboard/leaderboard/): rows returned by default and at most
+SALES_LEADERBOARD_DEFAULT_LIMIT = 10
+SALES_LEADERBOARD_MAX_LIMIT = 100
+
+# Background jobs for the secondary writes of orders and products (inventory/jobs.py).
+# Eager runs them inside the writing request; set JOBS_EAGER = False in production
+# and keep `python manage.py run_jobs` running to take them off the request path.
+# Queued jobs need DASHBOARD_CACHE_ALIAS on a shared backend, startup fails otherwise.
+JOBS_EAGER = True
+# Worker threads of run_jobs, and jobs claimed per round by each thread
+JOB_WORKER_THREADS = 4
+JOB_BATCH_SIZE = 200
+# Seconds an idle worker waits before looking for jobs again
+JOB_POLL_SECONDS = 1
+# A job that fails this many times is left in the dead state; retries wait
+# JOB_RETRY_BACKOFF_SECONDS, doubled after every failed attempt
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF_SECONDS = 5
+# A running job whose worker hasn't finished it after this many seconds is claimed again
+JOB_LEASE_SECONDS = 300
+
+# Stock chart: the series is downsampled to week/month buckets past this many points
+STOCK_CHART_MAX_POINTS = 366
+
+# When set, GET /api/metrics/ requires "Authorization: Bearer <token>" (for the
+# scraper); when None it is only served to staff users authenticated by JWT
+METRICS_AUTH_TOKEN = None
+
+# Authenticated users are cached per process for this many seconds (saving a user evicts it)
+AUTH_USER_CACHE_TTL = 60
+AUTH_USER_CACHE_SIZE = 1024
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
+    'TOKEN_REFRESH_SERIALIZER': 'inventory.serializers.TokenRefreshWithLifetimesSerializer',
 }
 
 # CORS settings
@@ -66,6 +66,8 @@ const NavBar = () => {
 
   const logout = () => {
     localStorage.removeItem('access');
+    localStorage.removeItem('refresh');
+    localStorage.removeItem('access_expires_at');
     navigate('/login');
   };
 
@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
-import API from '../../services/api.jsx';
+import API, { storeTokens } from '../../services/api.jsx';
 import styled from 'styled-components';
 
 const Wrap = styled.div`max-width:480px;margin:40px auto;padding:20px;background:${p=>p.theme.colors.card};border-radius:8px;`;
@@ -61,10 +61,7 @@ const Login = () => {
     try {
       const res = await API.post('/login/', { username: username.trim(), password });
       if (res.data.access || res.data.token) {
-        localStorage.setItem('access', res.data.access || res.data.token);
-        if (res.data.refresh) {
-          localStorage.setItem('refresh', res.data.refresh);
-        }
+        storeTokens({ ...res.data, access: res.data.access || res.data.token });
         setUsername('');
         setPassword('');
         navigate('/dashboard');
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from "react";
-import API from "../../services/api";
+import API, { getAllPages } from "../../services/api";
 import styled from "styled-components";
 
 const Wrap = styled.div`
@@ -55,7 +55,7 @@ const Category = () => {
 
   const load = async () => {
     try {
-      const res = await API.get("categories/");
+      const res = await getAllPages("categories/");
       setCategories(res.data);
     } catch (err) {
       console.error(err);
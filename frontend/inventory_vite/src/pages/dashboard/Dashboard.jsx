@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from "react";
-import API from "../../services/api";
+import API, { getAllPages } from "../../services/api";
 import styled from "styled-components";
 import {
   LineChart,
@@ -181,7 +181,7 @@ const Dashboard = () => {
   useEffect(() => {
     (async () => {
       try {
-        const res = await API.get("categories/");
+        const res = await getAllPages("categories/");
         setDashCatList(res.data || []);
       } catch (e) {
         /* noop */
@@ -198,8 +198,8 @@ const Dashboard = () => {
       }
       try {
         const [prodRes, orderRes] = await Promise.all([
-          API.get(`products/?category=${dashCat}`),
-          API.get(`orders/?category=${dashCat}`),
+          getAllPages(`products/?category=${dashCat}`),
+          getAllPages(`orders/?category=${dashCat}`),
         ]);
 
         const products = prodRes.data || [];
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import API from '../../services/api';
+import API, { BASE_URL, getAllPages } from '../../services/api';
 import styled from 'styled-components';
 
 const SPACING = {
@@ -117,49 +117,129 @@ const Icon = styled.span`
   font-size: ${FONT_SIZES.lg};
 `;
 
+// Quantities below this count as low stock on this card
+const LOW_STOCK_LIMIT = 20;
+// Give up on a stream that hasn't opened by then, e.g. behind a buffering proxy
+const STREAM_OPEN_TIMEOUT = 10000;
+
 const DashboardNotifications = () => {
-  const [lowStock, setLowStock] = useState([]);
-  const [outOfStock, setOutOfStock] = useState([]);
-  const [pendingOrders, setPendingOrders] = useState([]);
+  const [products, setProducts] = useState([]);
+  const [orders, setOrders] = useState([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
+    let source = null;
+    let interval = null;
+    let reopen = null;
+    let openTimeout = null;
+    let closed = false;
+
     const loadNotifications = async () => {
       try {
-        setLoading(true);
         const [productsRes, ordersRes] = await Promise.all([
-          API.get('products/'),
-          API.get('orders/'),
+          getAllPages('products/'),
+          getAllPages('orders/'),
         ]);
+        setProducts(productsRes.data || []);
+        setOrders(ordersRes.data || []);
+      } catch (error) {
+        console.error('Error loading notifications:', error);
+      } finally {
+        setLoading(false);
+      }
+    };
 
-        const products = productsRes.data || [];
-        const orders = ordersRes.data || [];
+    // Without a stream (no EventSource, refused, or never opened) poll every 30 seconds
+    const startPolling = () => {
+      if (!interval) interval = setInterval(loadNotifications, 30000);
+    };
 
-        // Filter low stock (quantity < 20)
-        const lowStockProducts = products.filter(p => p.quantity > 0 && p.quantity < 20);
-        setLowStock(lowStockProducts);
+    const onStock = event => {
+      const data = JSON.parse(event.data);
+      setProducts(prev => prev.map(p => (p.id === data.product ? { ...p, quantity: data.quantity } : p)));
+    };
 
-        // Filter out of stock (quantity = 0)
-        const outOfStockProducts = products.filter(p => p.quantity === 0);
-        setOutOfStock(outOfStockProducts);
+    const onOrder = event => {
+      const data = JSON.parse(event.data);
+      const order = { id: data.id, product: data.product, product_name: data.product_name, quantity: data.quantity, status: data.status };
+      setOrders(prev => {
+        const rest = prev.filter(o => o.id !== data.id);
+        return data.action === 'deleted' ? rest : [order, ...rest];
+      });
+    };
 
-        // Filter pending orders
-        const pending = orders.filter(o => o.status?.toLowerCase() === 'pending');
-        setPendingOrders(pending);
+    const onOrderStatus = event => {
+      const data = JSON.parse(event.data);
+      const ids = new Set(data.ids);
+      setOrders(prev => prev.map(o => (ids.has(o.id) ? { ...o, status: data.status } : o)));
+    };
 
-      } catch (error) {
-        console.error('Error loading notifications:', error);
-      } finally {
-        setLoading(false);
+    // The server pushes stock and order changes as they are committed. EventSource
+    // can't send the token, so each connection opens with a short-lived ticket.
+    const openStream = async () => {
+      let ticket;
+      try {
+        ticket = (await API.post('notifications/ticket/')).data.ticket;
+      } catch {
+        startPolling();
+        return;
       }
+      if (closed) return;
+      let opened = false;
+      source = new EventSource(`${BASE_URL}notifications/stream/?ticket=${encodeURIComponent(ticket)}`);
+      source.onopen = () => {
+        opened = true;
+        clearTimeout(openTimeout);
+      };
+      openTimeout = setTimeout(() => {
+        if (opened || !source) return;
+        source.close();
+        source = null;
+        startPolling();
+      }, STREAM_OPEN_TIMEOUT);
+      source.addEventListener('stock', onStock);
+      source.addEventListener('order', onOrder);
+      source.addEventListener('order_status', onOrderStatus);
+      // a catalog import touches too many products for single events
+      source.addEventListener('import', loadNotifications);
+      source.onerror = () => {
+        // the browser would reconnect with the same, expired ticket
+        clearTimeout(openTimeout);
+        source.close();
+        source = null;
+        if (!opened) {
+          // the server refused the stream
+          startPolling();
+          return;
+        }
+        loadNotifications();
+        reopen = setTimeout(openStream, 5000);
+      };
     };
 
     loadNotifications();
-    // Refresh every 30 seconds
-    const interval = setInterval(loadNotifications, 30000);
-    return () => clearInterval(interval);
+    if (window.EventSource && localStorage.getItem('access')) {
+      openStream();
+    } else {
+      startPolling();
+    }
+
+    return () => {
+      closed = true;
+      if (source) source.close();
+      if (interval) clearInterval(interval);
+      if (reopen) clearTimeout(reopen);
+      if (openTimeout) clearTimeout(openTimeout);
+    };
   }, []);
 
+  // Filter low stock (quantity < 20)
+  const lowStock = products.filter(p => p.quantity > 0 && p.quantity < LOW_STOCK_LIMIT);
+  // Filter out of stock (quantity = 0)
+  const outOfStock = products.filter(p => p.quantity === 0);
+  // Filter pending orders
+  const pendingOrders = orders.filter(o => o.status?.toLowerCase() === 'pending');
+
   if (loading) {
     return (
       <NotificationsContainer>
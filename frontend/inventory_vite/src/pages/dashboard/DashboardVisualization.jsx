@@ -11,7 +11,7 @@ import {
   CartesianGrid,
   Cell,
 } from 'recharts';
-import API from '../../services/api';
+import { getAllPages } from '../../services/api';
 
 
 const Section = styled.div`
@@ -92,7 +92,7 @@ const DashboardVisualization = () => {
 
   // Fetch categories
   useEffect(() => {
-    API.get('categories/')
+    getAllPages('categories/')
       .then((res) => setCategories(res.data))
       .catch((err) => console.error('Category fetch error:', err));
   }, []);
@@ -104,7 +104,7 @@ const DashboardVisualization = () => {
       return;
     }
     try {
-      const res = await API.get(`products/?category=${catId}`);
+      const res = await getAllPages(`products/?category=${catId}`);
       const formatted = res.data.map((p) => ({
         name: p.name,
         quantity: p.quantity,
@@ -125,11 +125,11 @@ const fetchOutwardData = async (catId) => {
 
   try {
     // Step 1: Fetch products for selected category
-    const prodRes = await API.get(`products/?category=${catId}`);
+    const prodRes = await getAllPages(`products/?category=${catId}`);
     const products = prodRes.data;
 
     // Step 2: Fetch orders filtered by selected category
-    const orderRes = await API.get(`orders/?category=${catId}`);
+    const orderRes = await getAllPages(`orders/?category=${catId}`);
     const orders = orderRes.data;
 
     // Step 3: Build a set/map of product ids in this category
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import API from '../../services/api';
+import { getAllPages } from '../../services/api';
 import styled from 'styled-components';
 
 const Wrap = styled.div`
@@ -60,7 +60,7 @@ const Inventory = () => {
 
   const load = async () => {
     try {
-      const res = await API.get('products/');
+      const res = await getAllPages('products/');
       const data = res.data;
       setProducts(data);
       setFiltered(data);
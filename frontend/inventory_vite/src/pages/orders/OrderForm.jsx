@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate, useParams } from 'react-router-dom';
-import API from '../../services/api';
+import API, { getAllPages } from '../../services/api';
 import styled from 'styled-components';
 
 const Container = styled.div`
@@ -111,7 +111,7 @@ const OrderForm = () => {
 
   // Load categories
   useEffect(() => {
-    API.get('categories/')
+    getAllPages('categories/')
       .then((res) => setCategories(res.data))
       .catch((err) => console.error('Category fetch error:', err));
   }, []);
@@ -154,7 +154,7 @@ const OrderForm = () => {
   // Fetch products based on category
   useEffect(() => {
     if (formCategory) {
-      API.get(`products/?category=${formCategory}`)
+      getAllPages(`products/?category=${formCategory}`)
         .then((res) => setProducts(res.data))
         .catch((err) => console.error('Product fetch error:', err));
     } else {
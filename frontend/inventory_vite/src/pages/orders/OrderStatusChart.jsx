@@ -11,7 +11,7 @@ import {
   ResponsiveContainer,
   Cell,
 } from "recharts";
-import API from "../../services/api";
+import { getAllPages } from "../../services/api";
 
 
 const Container = styled.div`
@@ -81,7 +81,7 @@ const OrderStatusChart = () => {
   const [chartData, setChartData] = useState([]);
 
   useEffect(() => {
-    API.get("categories/")
+    getAllPages("categories/")
       .then((res) => setCategories(res.data || []))
       .catch(() => {});
   }, []);
@@ -91,7 +91,7 @@ const OrderStatusChart = () => {
     const fetchOrders = async () => {
        // If category selected then filter by category 
       const url = selectedCat ? `orders/?category=${selectedCat}` : "orders/";
-      const res = await API.get(url);
+      const res = await getAllPages(url);
       const orders = res.data || [];
 
       
@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from "react";
 import { Link } from "react-router-dom";
 import styled from "styled-components";
-import API from "../../services/api";
+import API, { getAllPages } from "../../services/api";
 import OrderStatusChart from "./OrderStatusChart";
 
 
@@ -71,7 +71,7 @@ const Orders = () => {
   const fetchOrders = async (category = '') => {
     try {
       const url = category ? `orders/?category=${category}` : 'orders/';
-      const res = await API.get(url);
+      const res = await getAllPages(url);
       setOrders(res.data);
       setPage(1);
     } catch (err) {
@@ -82,7 +82,7 @@ const Orders = () => {
 // Fetch orders and categories when page loads first time
   useEffect(() => {
     fetchOrders();
-    API.get('categories/').then(res => setCategories(res.data || [])).catch(() => {});
+    getAllPages('categories/').then(res => setCategories(res.data || [])).catch(() => {});
   }, []);
 
   // Triggered when user selects a category from dropdown
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate, useParams } from 'react-router-dom';
-import API from '../../services/api';
+import API, { getAllPages } from '../../services/api';
 import styled from 'styled-components';
 
 const Wrap = styled.div`
@@ -48,7 +48,7 @@ const ProductForm = () => {
 
   useEffect(() => {
     // Fetch categories
-    API.get('/categories/')
+    getAllPages('/categories/')
       .then(res => setCategories(res.data))
       .catch(() => {});
 
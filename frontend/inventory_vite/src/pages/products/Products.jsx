@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
-import API from '../../services/api';
+import API, { getAllPages } from '../../services/api';
 import styled from 'styled-components';
 
 // Consistent styling constants
@@ -164,14 +164,14 @@ const Products = () => {
   
   const load = async (category = '') => {
     const url = category ? `products/?category=${category}` : 'products/';
-    const res = await API.get(url);
+    const res = await getAllPages(url);
     setProducts(res.data);
     setPage(1);
   };
   
   const loadCategories = async () => {
     try {
-      const res = await API.get('categories/');
+      const res = await getAllPages('categories/');
       setCategories(res.data || []);
     } catch (e) {
       console.error(e);
@@ -191,7 +191,8 @@ const Products = () => {
   const remove = async (id) => {
     if (!window.confirm('Delete product?')) return;
     await API.delete(`products/${id}/`);
-    load();
+    // drop the row locally instead of refetching the whole list
+    setProducts(prev => prev.filter(p => p.id !== id));
   };
 
   return (
@@ -1,28 +1,118 @@
 import axios from 'axios';
 import ErrorHandler from '../utils/errorHandler';
+export const BASE_URL = 'http://localhost:8000/api/';
 const API = axios.create({
-  baseURL: 'http://localhost:8000/api/',
+  baseURL: BASE_URL,
   headers: {
     'Content-Type': 'application/json'
   }
 });
 
-// Attach the token if available
-API.interceptors.request.use(config => {
-  const token = localStorage.getItem('access');
+// Refresh this long before the access token expires
+const REFRESH_MARGIN_MS = 60 * 1000;
+
+// Store the tokens from login, register or refresh along with their expiry
+export const storeTokens = data => {
+  localStorage.setItem('access', data.access);
+  if (data.access_expires_in) {
+    localStorage.setItem('access_expires_at', String(Date.now() + data.access_expires_in * 1000));
+  }
+  if (data.refresh) {
+    localStorage.setItem('refresh', data.refresh);
+  }
+};
+
+// One refresh at a time, concurrent requests wait for the same promise
+let pendingRefresh = null;
+const refreshAccessToken = () => {
+  const refresh = localStorage.getItem('refresh');
+  if (!refresh) {
+    return Promise.reject(new Error('No refresh token'));
+  }
+  if (!pendingRefresh) {
+    pendingRefresh = axios.post(`${BASE_URL}token/refresh/`, { refresh })
+      .then(res => {
+        storeTokens(res.data);
+        return res.data.access;
+      })
+      .finally(() => {
+        pendingRefresh = null;
+      });
+  }
+  return pendingRefresh;
+};
+
+const accessExpiresSoon = () => {
+  const expiresAt = Number(localStorage.getItem('access_expires_at'));
+  return expiresAt > 0 && expiresAt - Date.now() < REFRESH_MARGIN_MS;
+};
+
+// Attach the token if available, refreshing it first when it is about to expire
+API.interceptors.request.use(async config => {
+  let token = localStorage.getItem('access');
+  if (token && accessExpiresSoon() && localStorage.getItem('refresh')) {
+    try {
+      token = await refreshAccessToken();
+    } catch {
+      // keep the old token, a 401 sends the user back to login
+    }
+  }
   if (token) {
     config.headers.Authorization = `Bearer ${token}`;
   }
   return config;
 }, error => Promise.reject(error));
 
+// List endpoints are cursor-paginated ({ next, previous, results });
+// unwrap the page so callers keep receiving an array and expose the cursors.
+const unwrapPage = response => {
+  const data = response.data;
+  if (data && Array.isArray(data.results) && 'next' in data) {
+    response.pagination = { next: data.next, previous: data.previous };
+    response.data = data.results;
+  }
+  return response;
+};
+
 // Response interceptor for global error handling
 API.interceptors.response.use(
-  response => response,
-  error => {
+  unwrapPage,
+  async error => {
+    // An expired access token gets one refresh and retry before logging out
+    const original = error.config;
+    const isLogin = original?.url?.includes('login/');
+    if (error.response?.status === 401 && original && !original._retried && !isLogin && localStorage.getItem('refresh')) {
+      original._retried = true;
+      try {
+        const token = await refreshAccessToken();
+        original.headers.Authorization = `Bearer ${token}`;
+        return API(original);
+      } catch {
+        // fall through to the global handler
+      }
+    }
     ErrorHandler.handle(error, 'API Request');
     return Promise.reject(error);
   }
 );
 
+// Largest page the API serves (MAX_PAGE_SIZE in the backend settings)
+const MAX_PAGE_SIZE = 500;
+
+// Fetch every page of a list endpoint by following the `next` cursor, for
+// pages that filter, count or page through the whole list on the client.
+// Resolves like API.get, with all the rows in `data`.
+export const getAllPages = async (url, config) => {
+  const separator = url.includes('?') ? '&' : '?';
+  const first = await API.get(`${url}${separator}page_size=${MAX_PAGE_SIZE}`, config);
+  const rows = [...(first.data || [])];
+  let next = first.pagination?.next;
+  while (next) {
+    const res = await API.get(next, config);
+    rows.push(...(res.data || []));
+    next = res.pagination?.next;
+  }
+  return { ...first, data: rows, pagination: null };
+};
+
 export default API;
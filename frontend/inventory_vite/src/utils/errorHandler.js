@@ -24,6 +24,7 @@ class ErrorHandler {
           errorInfo.message = 'Unauthorized. Please login again.';
           localStorage.removeItem('access');
           localStorage.removeItem('refresh');
+          localStorage.removeItem('access_expires_at');
           window.location.href = '/login';
           break;
         case 403: